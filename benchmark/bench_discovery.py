@@ -0,0 +1,77 @@
+"""Benchmark the scandir-based module discovery against the previous glob.
+
+Generates a synthetic project with an in-tree virtualenv (`.venv`) that
+contains many more files than the project itself, as on a typical
+developer machine. The previous glob descends into the virtualenv and
+filters the hidden paths afterwards, the scandir walker prunes it.
+
+Run with `python benchmark/bench_discovery.py`.
+"""
+
+from __future__ import annotations
+
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+from synthetic_project import ProjectSpec, generate_project
+
+from pytest_imports.discovery import walk_module_files
+
+N_VENV_PACKAGES = 300
+N_VENV_FILES_PER_PACKAGE = 100
+REPEATS = 5
+
+
+def glob_module_paths(base_path: Path) -> list[Path]:
+    """The previous discovery, with the filter after the glob."""
+    return [
+        path
+        for path in base_path.glob('**/*.py')
+        if not any(part.startswith('.') for part in path.parts)
+    ]
+
+
+def scandir_module_paths(base_path: Path) -> list[Path]:
+    return [Path(entry.path) for entry in walk_module_files(base_path)]
+
+
+def generate_venv(venv_path: Path) -> None:
+    site_packages = venv_path / 'lib' / 'python3' / 'site-packages'
+    for i in range(N_VENV_PACKAGES):
+        package_path = site_packages / f'dist{i}' / 'sub'
+        package_path.mkdir(parents=True)
+        for j in range(N_VENV_FILES_PER_PACKAGE):
+            (package_path / f'm{j}.py').write_text('')
+
+
+def measure(func: Callable[[Path], list[Path]], base_path: Path) -> float:
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func(base_path)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as project_dir:
+        base_path = Path(project_dir)
+        generate_project(base_path, ProjectSpec(modules=2000, body_lines=0))
+        generate_venv(base_path / '.venv')
+        assert sorted(glob_module_paths(base_path)) == sorted(
+            scandir_module_paths(base_path)
+        )
+        n_modules = len(scandir_module_paths(base_path))
+        n_venv_files = N_VENV_PACKAGES * N_VENV_FILES_PER_PACKAGE
+        print(f'{n_modules} modules, {n_venv_files} files in .venv')
+        for name, func in [
+            ('glob', glob_module_paths),
+            ('scandir', scandir_module_paths),
+        ]:
+            print(f'{name:>8} {measure(func, base_path) * 1000:>9.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark the interned DotPath against the previous tuple-based class.
+
+Measures the memory for holding many import paths (with repetitions,
+as in a real project) and the throughput of `is_relative_to`.
+
+Run with `python benchmark/bench_dotpath.py`.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+import tracemalloc
+from collections.abc import Callable
+
+from pytest_imports.model import DotPath
+
+N_UNIQUE_PATHS = 20_000
+N_PATHS = 1_000_000
+N_CHECKS = 1_000_000
+
+
+class TupleDotPath:
+    """The previous DotPath implementation, with a tuple per instance."""
+
+    def __init__(self, path: str):
+        self._parts = tuple(path.split('.'))
+        self._hash: int | None = None
+
+    def is_relative_to(self, other: TupleDotPath) -> bool:
+        if len(other._parts) > len(self._parts):
+            return False
+        return other._parts == self._parts[: len(other._parts)]
+
+
+def path_strings(seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    unique = [
+        '.'.join(f'p{rng.randrange(30)}' for _ in range(rng.randint(1, 6)))
+        for _ in range(N_UNIQUE_PATHS)
+    ]
+    return [rng.choice(unique) for _ in range(N_PATHS)]
+
+
+def measure_memory(factory: Callable[[str], object], strings: list[str]) -> float:
+    tracemalloc.start()
+    paths = [factory(s) for s in strings]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del paths
+    return size / 1e6
+
+
+def measure_is_relative_to(factory: Callable[[str], object], strings: list[str]):
+    paths = [factory(s) for s in strings[:N_CHECKS]]
+    others = [factory(s.rsplit('.', 1)[0]) for s in strings[-N_CHECKS:]]
+    start = time.perf_counter()
+    for path, other in zip(paths, others, strict=True):
+        path.is_relative_to(other)  # type: ignore[attr-defined]
+    return N_CHECKS / (time.perf_counter() - start) / 1e6
+
+
+def main() -> None:
+    strings = path_strings()
+    print(f'{N_PATHS} paths ({N_UNIQUE_PATHS} unique), {N_CHECKS} checks')
+    print(f'{"class":>14} {"memory":>10} {"is_relative_to":>16}')
+    for name, factory in [('TupleDotPath', TupleDotPath), ('DotPath', DotPath)]:
+        memory = measure_memory(factory, strings)
+        throughput = measure_is_relative_to(factory, strings)
+        print(f'{name:>14} {memory:>8.1f}MB {throughput:>11.2f}M/s')
+
+
+if __name__ == '__main__':
+    main()
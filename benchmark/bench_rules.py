@@ -0,0 +1,84 @@
+"""Benchmark rule evaluation against the number of rules.
+
+Compares the compiled rule plan (used by the `imports` fixture) walking
+the modules of the scopes (as for a lazily loaded tree), looking up each
+predicate in the import index, and choosing between both (the default,
+see `MAX_INDEXED_PREDICATES`).
+
+Run with `python benchmark/bench_rules.py`.
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+from pytest_imports import query
+from pytest_imports.model import DotPath, ImportInModule, RootNode
+from pytest_imports.query import compile_rules, must_not_import
+
+N_PACKAGES = 20
+N_MODULES_PER_PACKAGE = 100
+N_IMPORTS_PER_MODULE = 10
+RULE_COUNTS = [1, 10, 50, 200]
+
+
+def build_tree(seed: int = 0, lazy: bool = False) -> RootNode:
+    rng = random.Random(seed)
+    root_node = RootNode()
+    targets = [f'ext{i}.sub{j}' for i in range(50) for j in range(5)]
+    for p in range(N_PACKAGES):
+        for m in range(N_MODULES_PER_PACKAGE):
+            node = root_node.get_or_add(
+                DotPath(f'app.pkg{p}.mod{m}'), Path('app', f'pkg{p}', f'mod{m}.py')
+            )
+            node.add_imports(
+                ImportInModule(DotPath(rng.choice(targets)), line_no=i + 1)
+                for i in range(N_IMPORTS_PER_MODULE)
+            )
+    if lazy:
+        # A module outside of the rule scopes, which is never loaded,
+        # so the rule plan doesn't use the import index.
+        node = root_node.get_or_add(DotPath('other'), Path('other.py'))
+        node.set_import_loader(list)
+    return root_node
+
+
+def compile_with_index(rules):
+    max_indexed_predicates = query.MAX_INDEXED_PREDICATES
+    query.MAX_INDEXED_PREDICATES = sys.maxsize
+    try:
+        return compile_rules(rules)
+    finally:
+        query.MAX_INDEXED_PREDICATES = max_indexed_predicates
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def main() -> None:
+    root_node = build_tree()
+    root_node.import_index()  # built once per session in the plugin
+    lazy_root_node = build_tree(lazy=True)
+    print(f'{"rules":>6} {"walk":>8} {"index":>8} {"plan":>8}')
+    for n_rules in RULE_COUNTS:
+        # Half of the forbidden paths are imported somewhere, half are not.
+        rules = {
+            'app': [
+                must_not_import(f'ext{i % 100}' if i % 2 else f'forbidden{i}')
+                for i in range(n_rules)
+            ]
+        }
+        plan = compile_rules(rules)
+        t_walk, walk_failures = timed(plan.evaluate, lazy_root_node)
+        t_index, index_failures = timed(compile_with_index(rules).evaluate, root_node)
+        t_plan, plan_failures = timed(plan.evaluate, root_node)
+        assert walk_failures == index_failures == plan_failures
+        print(f'{n_rules:>6} {t_walk:>7.3f}s {t_index:>7.3f}s {t_plan:>7.3f}s')
+
+
+if __name__ == '__main__':
+    main()
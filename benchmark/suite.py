@@ -0,0 +1,205 @@
+"""Benchmark suite for parsing, model building and rule evaluation.
+
+Generates a synthetic project (see `synthetic_project.py`), runs the
+benchmarks on it and writes the results as JSON, so that they can be
+compared over releases.
+
+Run with `nox -s benchmark -- --modules 5000 --output results.json`
+or `python benchmark/suite.py --help`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import dataclasses
+import gc
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from importlib.metadata import version
+from pathlib import Path
+from typing import Any
+
+from synthetic_project import TOP_LEVEL_PACKAGE, ProjectSpec, generate_project
+
+from pytest_imports import (
+    layers,
+    may_only_import,
+    must_import,
+    must_import_transitively,
+    must_not_have_cycles,
+    must_not_import,
+    must_not_import_private,
+    must_not_import_transitively,
+    must_not_import_within_parent,
+    project,
+    scope,
+)
+from pytest_imports.cache import ImportCache
+from pytest_imports.model import DotPath, FlatTree, ModuleGraph, RootNode
+from pytest_imports.parser import _parse_module, build_import_model
+from pytest_imports.plugin import ImportsFixture
+from pytest_imports.query import Rules, evaluate_rules
+
+PREDICATE_RULES: dict[str, Rules] = {
+    'must_import': {project(): must_import('ext0')},
+    'must_not_import': {project(): must_not_import('ext1.sub1')},
+    'must_not_import_private': {project(): must_not_import_private()},
+    'must_not_import_within_parent': {
+        project(): must_not_import_within_parent(via='absolute')
+    },
+    'must_import_transitively': {project(): must_import_transitively('ext0')},
+    'must_not_import_transitively': {
+        f'{TOP_LEVEL_PACKAGE}.pkg0': must_not_import_transitively('ext1.sub1')
+    },
+    'must_not_have_cycles': {project(): must_not_have_cycles()},
+    'layers': {project(): layers([f'{TOP_LEVEL_PACKAGE}.pkg{i}' for i in range(5)])},
+    'wildcards': {f'{TOP_LEVEL_PACKAGE}.*.*': must_not_import('ext1.*')},
+    'may_only_import': {
+        project(): may_only_import([TOP_LEVEL_PACKAGE, 'ext0', 'ext1'], stdlib=True)
+    },
+}
+
+CHECK_RULES: Rules = {
+    scope(TOP_LEVEL_PACKAGE, without=['pkg0']): [
+        must_not_import(f'ext{i}') for i in range(10)
+    ],
+    f'{TOP_LEVEL_PACKAGE}.pkg0': [must_import('ext0'), must_not_import_private()],
+    project(): must_not_import_within_parent(via='relative'),
+}
+
+
+def measure(
+    func: Callable[[], object], repeats: int, memory: bool = True
+) -> dict[str, Any]:
+    """Return the best time of the repeats and the peak memory of one run."""
+    times = []
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    result: dict[str, Any] = {'seconds': min(times), 'repeats': repeats}
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        func()
+        result['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def run_benchmarks(base_path: Path, repeats: int) -> dict[str, dict[str, Any]]:
+    module_paths = sorted(base_path.glob('**/*.py'))
+    sources = [(path, path.read_bytes()) for path in module_paths]
+    results: dict[str, dict[str, Any]] = {}
+    parsed = {}
+    for engine in ('ast', 'fast'):
+
+        def parse(engine=engine):
+            return [
+                (path, _parse_module(source, path, base_path, engine))
+                for path, source in sources
+            ]
+
+        results[f'parse[{engine}]'] = measure(parse, repeats)
+        parsed[engine] = parse()
+
+    def build_tree() -> RootNode:
+        root_node = RootNode()
+        root_node.add_module_files(base_path, parsed['ast'])
+        return root_node
+
+    results['build_tree'] = measure(build_tree, repeats)
+    for engine in ('ast', 'fast'):
+        results[f'build_import_model[{engine}]'] = measure(
+            lambda engine=engine: build_import_model(base_path, engine=engine),
+            repeats,
+        )
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache_file = Path(cache_dir) / 'imports.json'
+        build_import_model(base_path, cache=ImportCache(cache_file))
+        results['build_import_model[cached]'] = measure(
+            lambda: build_import_model(base_path, cache=ImportCache(cache_file)),
+            repeats,
+        )
+    root_node = build_tree()
+    results['walk'] = measure(lambda: list(root_node.walk()), repeats)
+    dot_paths = [node.dot_path for node in root_node.walk()]
+    results['get'] = measure(
+        lambda: [root_node.get(dot_path) for dot_path in dot_paths], repeats
+    )
+    results['build_flat_tree'] = measure(lambda: FlatTree(root_node), repeats)
+    flat_tree = root_node.flat_tree()
+    top_node = root_node.children()[0]
+    results['walk[flat]'] = measure(lambda: list(flat_tree.select(top_node)), repeats)
+    exclude = [DotPath(f'pkg{i}.pkg{j}') for i in range(8) for j in range(5)]
+    results['walk[exclude]'] = measure(
+        lambda: list(top_node.walk(exclude=exclude)), repeats
+    )
+    with tempfile.TemporaryDirectory() as model_dir:
+        model_file = Path(model_dir) / 'model.bin'
+        results['dump'] = measure(lambda: root_node.dump(model_file), repeats)
+        results['dump']['file_bytes'] = model_file.stat().st_size
+        results['load'] = measure(lambda: RootNode.load(model_file), repeats)
+    root_node.import_index()  # built once per session in the plugin
+    results['module_graph'] = measure(
+        lambda: ModuleGraph(root_node, root_node.import_index()), repeats
+    )
+    root_node.module_graph()  # built once per session as well
+    for name, rules in PREDICATE_RULES.items():
+        results[f'evaluate_rules[{name}]'] = measure(
+            lambda rules=rules: evaluate_rules(root_node, rules), repeats
+        )
+    fixture = ImportsFixture(root_node)
+
+    def check() -> None:
+        # Note: The synthetic project violates some of the rules.
+        with contextlib.suppress(AssertionError):
+            fixture.check(CHECK_RULES)
+
+    results['check'] = measure(check, repeats)
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    defaults = ProjectSpec()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    for field in dataclasses.fields(ProjectSpec):
+        parser.add_argument(
+            f'--{field.name.replace("_", "-")}',
+            type=type(getattr(defaults, field.name)),
+            default=getattr(defaults, field.name),
+        )
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', type=Path, help='JSON file (default: stdout)')
+    args = parser.parse_args(argv)
+    spec = ProjectSpec(
+        **{
+            field.name: getattr(args, field.name)
+            for field in dataclasses.fields(ProjectSpec)
+        }
+    )
+    with tempfile.TemporaryDirectory() as project_dir:
+        generate_project(Path(project_dir), spec)
+        results = run_benchmarks(Path(project_dir), args.repeats)
+    report = {
+        'pytest_imports': version('pytest-imports'),
+        'python': platform.python_version(),
+        'spec': dataclasses.asdict(spec),
+        'results': results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output + '\n')
+    else:
+        sys.stdout.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Deterministic generator for synthetic Python projects of configurable size.
+
+The same spec (including the seed) always results in the same files.
+"""
+
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from pathlib import Path
+
+TOP_LEVEL_PACKAGE = 'proj'
+
+
+@dataclass(frozen=True)
+class ProjectSpec:
+    modules: int = 1000
+    # Maximum number of package levels below the top-level package.
+    depth: int = 3
+    # Number of subpackages per package.
+    fanout: int = 5
+    imports_per_module: int = 10
+    relative_import_ratio: float = 0.3
+    # Ratio of the absolute imports that import external packages.
+    external_import_ratio: float = 0.5
+    # Number of lines of other code per module, to make parsing realistic.
+    body_lines: int = 40
+    seed: int = 0
+
+
+def generate_project(base_path: Path, spec: ProjectSpec) -> list[Path]:
+    """Write the project files below the base path and return the module paths."""
+    rng = random.Random(spec.seed)
+    module_parts = [_module_parts(rng, spec, i) for i in range(spec.modules)]
+    package_parts = sorted(
+        {parts[:level] for parts in module_parts for level in range(1, len(parts))}
+    )
+    module_paths: list[Path] = []
+    for parts in package_parts:
+        package_path = base_path.joinpath(*parts)
+        package_path.mkdir(parents=True, exist_ok=True)
+        module_paths.append(package_path / '__init__.py')
+        module_paths[-1].write_text('')
+    for parts in module_parts:
+        module_path = base_path.joinpath(*parts[:-1], f'{parts[-1]}.py')
+        module_path.write_text(_module_source(rng, spec, parts, module_parts))
+        module_paths.append(module_path)
+    return module_paths
+
+
+def _module_parts(rng: random.Random, spec: ProjectSpec, index: int) -> tuple[str, ...]:
+    package_depth = rng.randint(0, spec.depth)
+    packages = tuple(f'pkg{rng.randrange(spec.fanout)}' for _ in range(package_depth))
+    return (TOP_LEVEL_PACKAGE, *packages, f'mod{index}')
+
+
+def _module_source(
+    rng: random.Random,
+    spec: ProjectSpec,
+    parts: tuple[str, ...],
+    module_parts: list[tuple[str, ...]],
+) -> str:
+    lines = ['"""Generated module."""', '']
+    for _ in range(spec.imports_per_module):
+        if rng.random() < spec.relative_import_ratio:
+            level = rng.randint(1, len(parts) - 1)
+            lines.append(f'from {"." * level} import name{rng.randrange(10)}')
+        elif rng.random() < spec.external_import_ratio:
+            lines.append(f'import ext{rng.randrange(50)}.sub{rng.randrange(5)}')
+        else:
+            target = rng.choice(module_parts)
+            lines.append(f'from {".".join(target[:-1])} import {target[-1]}')
+    lines.append('')
+    for i in range(spec.body_lines // 4):
+        lines += [
+            f'def function{i}(value, factor={i}):',
+            '    """Generated function."""',
+            f'    return [value * factor for _ in range({i})]',
+            '',
+        ]
+    return '\n'.join(lines) + '\n'
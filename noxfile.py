@@ -4,7 +4,7 @@ from pathlib import Path
 import nox
 
 src_path = 'src'
-code_paths = [src_path, 'test', 'noxfile.py']
+code_paths = [src_path, 'test', 'benchmark', 'noxfile.py']
 
 nox.options.default_venv_backend = 'uv'
 nox.options.reuse_existing_virtualenvs = True
@@ -110,6 +110,12 @@ def coverage(session):
             webbrowser.open((Path.cwd() / 'htmlcov' / 'index.html').as_uri())
 
 
+@nox.session
+def benchmark(session):
+    _sync(session, include_project=True)
+    session.run('python', 'benchmark/suite.py', *session.posargs)
+
+
 @nox.session
 def audit(session: nox.Session) -> None:
     session.run(
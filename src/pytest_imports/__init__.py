@@ -1,16 +1,26 @@
 from .query import (
+    layers,
+    may_only_import,
     must_import,
+    must_import_transitively,
+    must_not_have_cycles,
     must_not_import,
     must_not_import_private,
+    must_not_import_transitively,
     must_not_import_within_parent,
     project,
     scope,
 )
 
 __all__ = [
+    'layers',
+    'may_only_import',
     'must_import',
+    'must_import_transitively',
+    'must_not_have_cycles',
     'must_not_import',
     'must_not_import_private',
+    'must_not_import_transitively',
     'must_not_import_within_parent',
     'project',
     'scope',
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from collections.abc import Sequence
+from dataclasses import dataclass
+from pathlib import Path, PurePath
+
+from .model import DotPath, ImportInModule
+
+log = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+
+
+@dataclass(frozen=True)
+class FileSignature:
+    """Identifies the state of a module file on disk."""
+
+    mtime_ns: int
+    size: int
+    digest: str | None = None
+
+    @classmethod
+    def from_stat(
+        cls, stat: os.stat_result, content: bytes | None = None
+    ) -> FileSignature:
+        """Create the signature, including the content hash if content is given."""
+        digest = content_digest(content) if content is not None else None
+        return cls(mtime_ns=stat.st_mtime_ns, size=stat.st_size, digest=digest)
+
+
+def content_digest(content: bytes) -> str:
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+@dataclass
+class _CacheEntry:
+    signature: FileSignature
+    imports: Sequence[ImportInModule]
+
+
+class ImportCache:
+    """Persistent store for the imports of each module file.
+
+    Entries are keyed by the module path relative to the project path.
+    By default an entry is valid as long as modification time and size of
+    the file are unchanged. With `verify_hash` the content hash is compared
+    instead, which also works for fresh checkouts that reset modification
+    times (e.g., in CI).
+
+    Only entries that were used or added since loading are saved,
+    so entries for deleted files are dropped. With `prune=False` the other
+    loaded entries are kept as well (e.g., if only some of the modules
+    were looked at).
+    """
+
+    def __init__(self, cache_file: Path, verify_hash: bool = False):
+        self._cache_file = cache_file
+        self._verify_hash = verify_hash
+        self._loaded: dict[str, _CacheEntry] = {}
+        self._current: dict[str, _CacheEntry] = {}
+        self._load()
+
+    @property
+    def verify_hash(self) -> bool:
+        return self._verify_hash
+
+    def get(
+        self, file_path: PurePath, signature: FileSignature
+    ) -> Sequence[ImportInModule] | None:
+        """Return the cached imports, or None if the entry is missing or stale."""
+        key = file_path.as_posix()
+        entry = self._loaded.get(key)
+        if entry is None or not self._matches(entry.signature, signature):
+            return None
+        self._current[key] = _CacheEntry(signature, entry.imports)
+        return entry.imports
+
+    def put(
+        self,
+        file_path: PurePath,
+        signature: FileSignature,
+        imports: Sequence[ImportInModule],
+    ) -> None:
+        self._current[file_path.as_posix()] = _CacheEntry(signature, imports)
+
+    def save(self, prune: bool = True) -> None:
+        entries = self._current if prune else {**self._loaded, **self._current}
+        data = {
+            'version': CACHE_VERSION,
+            'entries': {
+                key: [
+                    entry.signature.mtime_ns,
+                    entry.signature.size,
+                    entry.signature.digest,
+                    [
+                        [list(import_by.import_path.parts), import_by.line_no]
+                        + ([import_by.level] if import_by.level else [])
+                        for import_by in entry.imports
+                    ],
+                ]
+                for key, entry in entries.items()
+            },
+        }
+        self._cache_file.parent.mkdir(parents=True, exist_ok=True)
+        # Note: Each save writes its own temporary file, since several
+        #   processes (e.g., pytest-xdist workers) may save the cache at once.
+        tmp_fd, tmp_name = tempfile.mkstemp(
+            dir=self._cache_file.parent, prefix=self._cache_file.name, suffix='.tmp'
+        )
+        try:
+            with os.fdopen(tmp_fd, 'w') as tmp_file:
+                tmp_file.write(json.dumps(data, separators=(',', ':')))
+            os.replace(tmp_name, self._cache_file)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+
+    def _matches(self, cached: FileSignature, current: FileSignature) -> bool:
+        if self._verify_hash:
+            return cached.digest is not None and cached.digest == current.digest
+        return cached.mtime_ns == current.mtime_ns and cached.size == current.size
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self._cache_file.read_text())
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            log.warning(f'Ignoring unreadable import cache {self._cache_file}: {e}')
+            return
+        if not isinstance(data, dict) or data.get('version') != CACHE_VERSION:
+            log.info(f'Ignoring import cache {self._cache_file} of other version.')
+            return
+        for key, (mtime_ns, size, digest, imports) in data['entries'].items():
+            self._loaded[key] = _CacheEntry(
+                signature=FileSignature(mtime_ns, size, digest),
+                imports=[
+                    ImportInModule(DotPath(parts), line_no, *level)
+                    for parts, line_no, *level in imports
+                ],
+            )
@@ -0,0 +1,215 @@
+"""Discovery of the module files below a project path."""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from pathlib import Path, PurePosixPath
+
+log = logging.getLogger(__name__)
+
+# Directories that never contain project modules. Hidden directories
+#   (e.g., `.venv` or `.git`) are always excluded.
+DEFAULT_EXCLUDE_DIRS = ('__pycache__', 'node_modules')
+
+GITIGNORE_FILE_NAME = '.gitignore'
+
+
+def walk_module_files(
+    base_path: Path,
+    exclude_dirs: Sequence[str] = DEFAULT_EXCLUDE_DIRS,
+    use_gitignore: bool = False,
+) -> Iterator[os.DirEntry[str]]:
+    """Return the directory entries of all module files below the base path.
+
+    Excluded directories are skipped without descending into them. These are
+    hidden directories, directories matching one of the `exclude_dirs` glob
+    patterns (matched against the directory name, or against the path
+    relative to the base path if the pattern contains a `/`), and with
+    `use_gitignore` the directories ignored by `.gitignore` files.
+    Hidden files and files ignored by `.gitignore` are skipped as well.
+
+    The files of each directory come first, sorted by name, followed by
+    the files of its subdirectories.
+
+    Symbolic links to directories are not followed. The entries cache
+    their `stat` result, so it can be reused (e.g., for the import cache).
+    """
+    gitignore = _Gitignore.for_base_path(base_path) if use_gitignore else None
+    yield from _walk(
+        base_path, PurePosixPath(), _DirectoryFilter(exclude_dirs), gitignore
+    )
+
+
+def _walk(
+    dir_path: Path,
+    relative_path: PurePosixPath,
+    dir_filter: _DirectoryFilter,
+    gitignore: _Gitignore | None,
+) -> Iterator[os.DirEntry[str]]:
+    if gitignore is not None:
+        gitignore = gitignore.with_directory(dir_path, relative_path)
+    try:
+        entries = sorted(os.scandir(dir_path), key=lambda entry: entry.name)
+    except OSError as e:
+        log.warning(f'Skipping unreadable directory {dir_path}: {e}')
+        return
+    # Note: The files of a directory come before its subdirectories, so a
+    #   module (e.g., `util.py`) is added before a directory of the same name.
+    sub_dirs: list[tuple[os.DirEntry[str], PurePosixPath]] = []
+    for entry in entries:
+        if entry.name.startswith('.'):
+            continue
+        entry_path = relative_path / entry.name
+        if entry.is_dir(follow_symlinks=False):
+            if dir_filter.excludes(entry_path) or (
+                gitignore is not None and gitignore.ignores(entry_path, is_dir=True)
+            ):
+                continue
+            sub_dirs.append((entry, entry_path))
+        elif entry.name.endswith('.py') and not (
+            gitignore is not None and gitignore.ignores(entry_path, is_dir=False)
+        ):
+            yield entry
+    for entry, entry_path in sub_dirs:
+        yield from _walk(Path(entry.path), entry_path, dir_filter, gitignore)
+
+
+class _DirectoryFilter:
+    def __init__(self, patterns: Sequence[str]):
+        self._name_patterns = [p for p in patterns if '/' not in p.strip('/')]
+        self._path_patterns = [p.strip('/') for p in patterns if '/' in p.strip('/')]
+
+    def excludes(self, relative_path: PurePosixPath) -> bool:
+        if any(fnmatchcase(relative_path.name, p) for p in self._name_patterns):
+            return True
+        return any(fnmatchcase(str(relative_path), p) for p in self._path_patterns)
+
+
+@dataclass(frozen=True)
+class _GitignorePattern:
+    regex: re.Pattern[str]
+    negated: bool
+    dir_only: bool
+
+    @classmethod
+    def parse(cls, line: str) -> _GitignorePattern | None:
+        """Parse a line of a `.gitignore` file, None for blank lines and comments."""
+        if not line.endswith('\\ '):
+            line = line.rstrip(' ')
+        if not line or line.startswith('#'):
+            return None
+        negated = line.startswith('!')
+        if negated:
+            line = line[1:]
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        # Note: A pattern with a slash (except at the end) is relative to
+        #   the directory of the .gitignore file, otherwise it matches a
+        #   name on any level.
+        anchored = '/' in line
+        prefix = '' if anchored else '(?:.*/)?'
+        regex = re.compile(f'{prefix}{_translate(line.lstrip("/"))}')
+        return cls(regex=regex, negated=negated, dir_only=dir_only)
+
+    def matches(self, relative_path: str, is_dir: bool) -> bool:
+        if self.dir_only and not is_dir:
+            return False
+        return self.regex.fullmatch(relative_path) is not None
+
+
+def _translate(pattern: str) -> str:
+    """Translate a gitignore glob pattern into a regular expression."""
+    parts: list[str] = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            parts.append('[^/]')
+            i += 1
+        elif pattern[i] == '[' and (end := pattern.find(']', i + 2)) != -1:
+            char_class = pattern[i + 1 : end].replace('\\', '\\\\')
+            if char_class.startswith('!'):
+                char_class = '^' + char_class[1:]
+            parts.append(f'[{char_class}]')
+            i = end + 1
+        elif pattern[i] == '\\' and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return ''.join(parts)
+
+
+class _Gitignore:
+    """The `.gitignore` patterns that apply in a directory.
+
+    Patterns are relative to the directory of their `.gitignore` file,
+    so each one is stored with the prefix and the number of leading
+    characters to strip, to get from a path relative to the base path
+    to a path relative to that directory.
+    """
+
+    def __init__(self, patterns: list[tuple[str, int, _GitignorePattern]]):
+        self._patterns = patterns
+
+    @classmethod
+    def for_base_path(cls, base_path: Path) -> _Gitignore | None:
+        """Return the patterns from the `.gitignore` files in the base path
+        and its parents up to the root of the git repository, or None if the
+        base path is not in a git repository."""
+        patterns: list[tuple[str, int, _GitignorePattern]] = []
+        for path in (base_path, *base_path.parents):
+            prefix = base_path.relative_to(path).as_posix() + '/'
+            # Note: Patterns in parent directories come first,
+            #   since later patterns take precedence.
+            patterns[:0] = [
+                ('' if prefix == './' else prefix, 0, pattern)
+                for pattern in _read_gitignore(path)
+            ]
+            if (path / '.git').exists():
+                return cls(patterns)
+        return None
+
+    def with_directory(
+        self, dir_path: Path, relative_path: PurePosixPath
+    ) -> _Gitignore:
+        """Add the patterns from the `.gitignore` file in the directory, if any."""
+        if relative_path == PurePosixPath():
+            return self  # already included by `for_base_path`
+        if not (dir_patterns := _read_gitignore(dir_path)):
+            return self
+        strip_length = len(str(relative_path)) + 1
+        return _Gitignore(
+            self._patterns + [('', strip_length, pattern) for pattern in dir_patterns]
+        )
+
+    def ignores(self, relative_path: PurePosixPath, is_dir: bool) -> bool:
+        """Check if the path (relative to the base path) is ignored."""
+        path = str(relative_path)
+        ignored = False
+        for prefix, strip_length, pattern in self._patterns:
+            if pattern.matches(prefix + path[strip_length:], is_dir):
+                ignored = not pattern.negated
+        return ignored
+
+
+def _read_gitignore(dir_path: Path) -> list[_GitignorePattern]:
+    try:
+        lines = (dir_path / GITIGNORE_FILE_NAME).read_text().splitlines()
+    except OSError:
+        return []
+    return [pattern for line in lines if (pattern := _GitignorePattern.parse(line))]
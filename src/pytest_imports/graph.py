@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+from array import array
+from collections import deque
+from collections.abc import Iterable
+
+
+class Digraph:
+    """Directed graph with the vertices 0 to n-1, stored as successor lists.
+
+    All algorithms are iterative, so deep graphs don't hit the recursion limit.
+    """
+
+    def __init__(self, successors: list[list[int]]):
+        self._successors = successors
+
+    def __len__(self) -> int:
+        return len(self._successors)
+
+    def successors(self, vertex: int) -> list[int]:
+        return self._successors[vertex]
+
+    def strongly_connected_components(self) -> list[list[int]]:
+        """Return the strongly connected components (Tarjan's algorithm).
+
+        The components are in reverse topological order, i.e., each
+        component comes after all components that it has edges to.
+        Runs in linear time in the number of vertices and edges.
+        """
+        successors = self._successors
+        n_vertices = len(successors)
+        indexes = [-1] * n_vertices
+        lowlinks = [0] * n_vertices
+        on_stack = [False] * n_vertices
+        stack: list[int] = []
+        components: list[list[int]] = []
+        counter = 0
+        for root in range(n_vertices):
+            if indexes[root] != -1:
+                continue
+            indexes[root] = lowlinks[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            # The vertices on the current DFS path, with their next successor.
+            work = [(root, 0)]
+            while work:
+                vertex, position = work[-1]
+                if position < len(successors[vertex]):
+                    work[-1] = (vertex, position + 1)
+                    successor = successors[vertex][position]
+                    if indexes[successor] == -1:
+                        indexes[successor] = lowlinks[successor] = counter
+                        counter += 1
+                        stack.append(successor)
+                        on_stack[successor] = True
+                        work.append((successor, 0))
+                    elif on_stack[successor]:
+                        lowlinks[vertex] = min(lowlinks[vertex], indexes[successor])
+                    continue
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlinks[parent] = min(lowlinks[parent], lowlinks[vertex])
+                if lowlinks[vertex] == indexes[vertex]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == vertex:
+                            break
+                    components.append(component)
+        return components
+
+    def reachability(self) -> Reachability:
+        """Compute which vertices can reach which other vertices.
+
+        The graph is condensed into its strongly connected components,
+        and the reachable components are collected as bitsets in reverse
+        topological order, so each edge of the condensation is only
+        looked at once.
+        """
+        successors = self._successors
+        component_of = array('i', [0] * len(successors))
+        masks: list[int] = []
+        for component_index, component in enumerate(
+            self.strongly_connected_components()
+        ):
+            for vertex in component:
+                component_of[vertex] = component_index
+            mask = 1 << component_index
+            for vertex in component:
+                for successor in successors[vertex]:
+                    # Note: Successors in other components were handled before.
+                    if (successor_index := component_of[successor]) != component_index:
+                        mask |= masks[successor_index]
+            masks.append(mask)
+        return Reachability(component_of, masks)
+
+    def shortest_cycle(self, component: list[int]) -> list[int]:
+        """Return a shortest cycle through the smallest vertex of a strongly
+        connected component (with more than one vertex), starting with it.
+
+        Only the vertices of the component are visited.
+        """
+        start = min(component)
+        members = set(component)
+        previous = {start: start}
+        queue = deque([start])
+        while queue:
+            vertex = queue.popleft()
+            for successor in self._successors[vertex]:
+                if successor == start:
+                    cycle = [vertex]
+                    while vertex != start:
+                        vertex = previous[vertex]
+                        cycle.append(vertex)
+                    return cycle[::-1]
+                if successor in members and successor not in previous:
+                    previous[successor] = vertex
+                    queue.append(successor)
+        raise ValueError('The vertices are not a strongly connected component.')
+
+    def next_hops(self, targets: Iterable[int]) -> array[int]:
+        """Return the next vertex on a shortest path to any of the targets.
+
+        The result contains the target itself for each target,
+        and -1 for vertices without a path to a target.
+        """
+        predecessors: list[list[int]] = [[] for _ in self._successors]
+        for vertex, successors in enumerate(self._successors):
+            for successor in successors:
+                predecessors[successor].append(vertex)
+        hops = array('i', [-1] * len(self._successors))
+        queue: deque[int] = deque()
+        for target in targets:
+            if hops[target] == -1:
+                hops[target] = target
+                queue.append(target)
+        while queue:
+            vertex = queue.popleft()
+            for predecessor in predecessors[vertex]:
+                if hops[predecessor] == -1:
+                    hops[predecessor] = vertex
+                    queue.append(predecessor)
+        return hops
+
+
+class Reachability:
+    """The vertices reachable from each vertex of a graph (including itself),
+    as bitsets over the strongly connected components."""
+
+    def __init__(self, component_of: array[int], masks: list[int]):
+        self._component_of = component_of
+        self._masks = masks
+
+    def mask(self, vertices: Iterable[int]) -> int:
+        """Return the bitset of the components of the vertices."""
+        mask = 0
+        for vertex in vertices:
+            mask |= 1 << self._component_of[vertex]
+        return mask
+
+    def reaches(self, vertex: int, mask: int) -> bool:
+        """Check if the vertex reaches any of the vertices of the bitset."""
+        return bool(self._masks[self._component_of[vertex]] & mask)
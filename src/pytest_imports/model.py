@@ -1,30 +1,78 @@
 from __future__ import annotations
 
-from collections.abc import Iterable, Iterator, Sequence
+import re
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from collections.abc import Callable, Iterable, Iterator, Sequence
 from dataclasses import dataclass
+from fnmatch import translate
 from pathlib import Path, PurePath
+from typing import Any, final, overload
 
+from .graph import Digraph, Reachability
 
+
+@final
 class DotPath:
     """
     Represent a 'path' with dot as the separator,
     as it is used for imports in Python.
 
     Largely follows the Path interface from pathlib.
+
+    Instances are interned in a global prefix tree, with a parent pointer
+    per path. So equal paths are the same object, equality is identity,
+    and `is_relative_to` only compares one ancestor by identity.
     """
 
-    def __init__(self, path: str | Iterable[str] | DotPath | None = None):
-        self._parts: tuple[str, ...]
-        self._hash: int | None = None
+    __slots__ = ('_ancestors', '_children', '_id', '_parent', '_parts')
+
+    _parent: DotPath
+    _parts: tuple[str, ...]
+    _children: dict[str, DotPath]
+    _ancestors: tuple[DotPath, ...]
+    _id: int
+
+    def __new__(cls, path: str | Iterable[str] | DotPath | None = None) -> DotPath:
         match path:
+            case DotPath():
+                return path
             case None | '' | []:
-                self._parts = ()
+                return _ROOT_PATH
             case str():
-                self._parts = tuple(path.split('.'))
-            case DotPath():
-                self._parts = path.parts
+                parts: Iterable[str] = path.split('.')
             case _:
-                self._parts = tuple(path)
+                parts = path
+        dot_path = _ROOT_PATH
+        for part in parts:
+            dot_path = dot_path._child(part)
+        return dot_path
+
+    @classmethod
+    def _create(cls, parent: DotPath | None, parts: tuple[str, ...]) -> DotPath:
+        dot_path = object.__new__(cls)
+        dot_path._parent = parent or dot_path  # the root is its own parent
+        dot_path._parts = parts
+        dot_path._children = {}
+        # Note: The ancestors from the root down to the path itself,
+        #   so `is_relative_to` only needs a single index lookup.
+        dot_path._ancestors = (*(parent._ancestors if parent else ()), dot_path)
+        dot_path._id = len(_PATHS_BY_ID)
+        _PATHS_BY_ID.append(dot_path)
+        return dot_path
+
+    def _child(self, name: str) -> DotPath:
+        if (child := self._children.get(name)) is None:
+            with _INTERN_LOCK:
+                # Note: Another thread might have added the child in the meantime.
+                child = self._children.get(name) or self._add_child(name)
+        return child
+
+    def _add_child(self, name: str) -> DotPath:
+        child = self._children[name] = DotPath._create(self, (*self._parts, name))
+        return child
 
     @classmethod
     def from_path(cls, path: PurePath) -> DotPath:
@@ -37,10 +85,20 @@ class DotPath:
             parts[-1] = parts[-1].removesuffix('.py')
         return cls(parts)
 
+    @classmethod
+    def from_id(cls, path_id: int) -> DotPath:
+        """Return the path for an id from the `id` property."""
+        return _PATHS_BY_ID[path_id]
+
     def is_relative_to(self, other: DotPath) -> bool:
-        if len(other.parts) > len(self.parts):
-            return False
-        return other.parts == self.parts[: len(other.parts)]
+        ancestors = self._ancestors
+        depth = len(other._ancestors) - 1
+        return depth < len(ancestors) and ancestors[depth] is other
+
+    @property
+    def id(self) -> int:
+        """Unique number of the path, valid for the lifetime of the process."""
+        return self._id
 
     @property
     def parts(self) -> tuple[str, ...]:
@@ -52,7 +110,7 @@ class DotPath:
 
     @property
     def parent(self) -> DotPath:
-        return DotPath(self._parts[:-1])
+        return self._parent
 
     def __str__(self) -> str:
         return '.'.join(self._parts)
@@ -60,21 +118,99 @@ class DotPath:
     def __repr__(self) -> str:
         return f'{type(self).__name__}({self.parts})'
 
-    def __hash__(self) -> int:
-        if self._hash is None:
-            self._hash = hash(tuple(self._parts))
-        return self._hash
-
-    def __eq__(self, other: object) -> bool:
-        if not isinstance(other, DotPath):
-            return NotImplemented
-        return self._parts == other._parts
+    def __reduce__(self) -> tuple[type[DotPath], tuple[tuple[str, ...]]]:
+        return DotPath, (self._parts,)
 
     def __truediv__(self, other: DotPath | str) -> DotPath:
-        return DotPath(self.parts + DotPath(other).parts)
+        dot_path = self
+        for part in DotPath(other)._parts:
+            dot_path = dot_path._child(part)
+        return dot_path
 
     def __rtruediv__(self, other: DotPath | str) -> DotPath:
-        return DotPath(DotPath(other).parts + self.parts)
+        return DotPath(other) / self
+
+
+_PATHS_BY_ID: list[DotPath] = []
+_INTERN_LOCK = threading.Lock()
+_ROOT_PATH = DotPath._create(None, ())
+
+
+class PathPattern:
+    """Pattern for dot paths with wildcards.
+
+    The part `*` matches any single part, and `**` matches any number of
+    parts (including none). Other parts can contain `*`, `?` and `[...]`
+    wildcards, as in `fnmatch`.
+
+    The pattern is compiled into an automaton over the path parts, with a
+    set of pattern positions as state. The transitions are computed on
+    first use and then reused, so following a path (e.g., down a tree)
+    only takes one dict lookup per part.
+    """
+
+    __slots__ = ('_accept', '_parts', '_regexes', '_steps', 'pattern', 'start')
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self._parts = tuple(pattern.split('.'))
+        self._regexes = [
+            re.compile(translate(part))
+            if part != '**' and PathPattern.is_pattern(part)
+            else None
+            for part in self._parts
+        ]
+        self._accept = 1 << len(self._parts)
+        self._steps: dict[tuple[int, str], int] = {}
+        self.start = self._closure(1)
+
+    @staticmethod
+    def is_pattern(path: str) -> bool:
+        """Check if the path contains any wildcards."""
+        return any(char in path for char in '*?[')
+
+    def _closure(self, state: int) -> int:
+        """Add the positions after `**` parts, which can match no parts."""
+        for position, part in enumerate(self._parts):
+            if part == '**' and state >> position & 1:
+                state |= 1 << (position + 1)
+        return state
+
+    def step(self, state: int, part: str) -> int:
+        """Return the state after the path part, 0 if nothing can match anymore."""
+        if (next_state := self._steps.get((state, part))) is None:
+            next_state = 0
+            for position, pattern_part in enumerate(self._parts):
+                if not state >> position & 1:
+                    continue
+                if pattern_part == '**':
+                    next_state |= 1 << position
+                elif (regex := self._regexes[position]) is not None:
+                    if regex.match(part):
+                        next_state |= 1 << (position + 1)
+                elif pattern_part == part:
+                    next_state |= 1 << (position + 1)
+            next_state = self._steps[state, part] = self._closure(next_state)
+        return next_state
+
+    def is_match(self, state: int) -> bool:
+        """Check if the path parts up to this state match the pattern."""
+        return bool(state & self._accept)
+
+    def match_depth(self, path: DotPath) -> int | None:
+        """Return the number of parts of the shortest prefix of the path
+        that matches the pattern, or None if there is no such prefix."""
+        state = self.start
+        for depth, part in enumerate(path.parts, 1):
+            state = self.step(state, part)
+            if self.is_match(state):
+                return depth
+            if not state:
+                return None
+        return None
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.pattern!r})'
 
 
 @dataclass
@@ -86,43 +222,447 @@ class ImportInModule:
     level: int = 0
 
 
+class ImportStore:
+    """Columnar storage for the imports of all modules in a tree.
+
+    Each import is a row in parallel integer arrays, with the id of the
+    importing module, the id of the imported path (see `DotPath.id`),
+    the line number and the level. The imports of a module are stored
+    in consecutive rows.
+    """
+
+    def __init__(self) -> None:
+        self._module_ids = array('i')
+        self._path_ids = array('i')
+        self._line_nos = array('i')
+        self._levels = array('i')
+        self._modules: list[ModuleNode] = []
+
+    def __len__(self) -> int:
+        return len(self._path_ids)
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Note: Path ids are only valid in this process, so the distinct
+        #   paths are pickled instead, with an index into them per row.
+        state = self.__dict__.copy()
+        path_ids = sorted(set(self._path_ids))
+        positions = {path_id: i for i, path_id in enumerate(path_ids)}
+        state['_path_ids'] = (
+            [DotPath.from_id(path_id) for path_id in path_ids],
+            array('i', [positions[path_id] for path_id in self._path_ids]),
+        )
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        paths, positions = state.pop('_path_ids')
+        path_ids = [path.id for path in paths]
+        state['_path_ids'] = array('i', [path_ids[i] for i in positions])
+        self.__dict__.update(state)
+
+    @property
+    def module_ids(self) -> array[int]:
+        """Id of the importing module for each row, -1 for unused rows."""
+        return self._module_ids
+
+    @property
+    def path_ids(self) -> array[int]:
+        return self._path_ids
+
+    @property
+    def line_nos(self) -> array[int]:
+        return self._line_nos
+
+    @property
+    def levels(self) -> array[int]:
+        return self._levels
+
+    def add_module(self, module_node: ModuleNode) -> int:
+        """Register the module and return its id."""
+        self._modules.append(module_node)
+        return len(self._modules) - 1
+
+    def module(self, module_id: int) -> ModuleNode:
+        return self._modules[module_id]
+
+    def add_imports(
+        self, module_id: int, rows: range, imports: Iterable[ImportInModule]
+    ) -> range:
+        """Add imports to the existing rows of the module and return all its rows.
+
+        If the existing rows are not at the end of the store then they are
+        first copied to the end, and the old rows are marked as unused.
+        """
+        start = len(self)
+        if rows and rows.stop != start:
+            for column in self._columns():
+                column.extend(column[rows.start : rows.stop])
+            self.remove_imports(rows)
+        elif rows:
+            start = rows.start
+        for import_by in imports:
+            self._module_ids.append(module_id)
+            self._path_ids.append(import_by.import_path.id)
+            self._line_nos.append(import_by.line_no)
+            self._levels.append(import_by.level)
+        return range(start, len(self))
+
+    def remove_imports(self, rows: range) -> None:
+        """Mark the rows as unused."""
+        self._module_ids[rows.start : rows.stop] = array('i', [-1] * len(rows))
+
+    def get(self, row: int) -> ImportInModule:
+        """Create the import object for a row."""
+        return ImportInModule(
+            import_path=DotPath.from_id(self._path_ids[row]),
+            line_no=self._line_nos[row],
+            level=self._levels[row],
+        )
+
+    def _columns(self) -> tuple[array[int], ...]:
+        return self._module_ids, self._path_ids, self._line_nos, self._levels
+
+
+class ModuleImports(Sequence[ImportInModule]):
+    """Read-only view of the imports of a module in an import store.
+
+    Indexing creates the import objects on the fly, while `columns`
+    iterates over the stored values without creating them.
+    """
+
+    __slots__ = ('_rows', '_store')
+
+    def __init__(self, store: ImportStore, rows: range):
+        self._store = store
+        self._rows = rows
+
+    @property
+    def rows(self) -> range:
+        """The rows of the imports in the store."""
+        return self._rows
+
+    def columns(self) -> Iterator[tuple[int, int, int]]:
+        """Return path id, line number and level of each import."""
+        start, stop = self._rows.start, self._rows.stop
+        return zip(
+            self._store.path_ids[start:stop],
+            self._store.line_nos[start:stop],
+            self._store.levels[start:stop],
+            strict=True,
+        )
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @overload
+    def __getitem__(self, index: int) -> ImportInModule: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> ModuleImports: ...
+
+    def __getitem__(self, index: int | slice) -> ImportInModule | ModuleImports:
+        if isinstance(index, slice):
+            return ModuleImports(self._store, self._rows[index])
+        return self._store.get(self._rows[index])
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({list(self)})'
+
+
+# Returns the imports of a module, for loading them on first access.
+ImportLoader = Callable[[], Iterable[ImportInModule]]
+
+# Kinds of module nodes (also used in the model file).
+_NODE_DIRECTORY = 0
+_NODE_MODULE = 1
+_NODE_PACKAGE = 2
+
+
 class RootNode:
     """Represents the root of a tree of module nodes."""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        store: ImportStore | None = None,
+        nodes_by_path: dict[DotPath, ModuleNode] | None = None,
+    ) -> None:
+        self._store = store if store is not None else ImportStore()
         self._children: dict[str, ModuleNode] = {}
+        # Note: All nodes of a tree share this index of the nodes below the root.
+        self._nodes_by_path = nodes_by_path if nodes_by_path is not None else {}
+        self._import_index: ImportIndex | None = None
+        self._module_graph: ModuleGraph | None = None
+        self._flat_tree: FlatTree | None = None
+
+    @classmethod
+    def merge(cls, root_nodes: Iterable[RootNode]) -> RootNode:
+        """Combine the trees below multiple root nodes into a new tree.
+
+        The top-level nodes are taken over in the order of the root nodes,
+        without copying them, so the merged tree should not be modified.
+        Raises ValueError if a top-level name exists in more than one tree.
+        """
+        merged_node = cls()
+        for root_node in root_nodes:
+            for name, child in root_node._children.items():
+                if (existing := merged_node._children.get(name)) is not None:
+                    raise ValueError(
+                        f'Conflicting top-level name {name!r} in the project '
+                        f'paths: {existing.file_path} and {child.file_path}'
+                    )
+                merged_node._children[name] = child
+            merged_node._nodes_by_path.update(root_node._nodes_by_path)
+        return merged_node
+
+    def dump(self, file_path: Path) -> None:
+        """Write the tree with all imports to a file in a compact binary format.
+
+        Lazily loaded imports are loaded first.
+        """
+        file_path.write_bytes(_ModelWriter().write(self))
+
+    @classmethod
+    def load(cls, file_path: Path) -> RootNode:
+        """Read a tree from a file that was written with `dump`.
+
+        The imports are read into the columns of the import store in bulk,
+        import objects are only created when the imports are accessed.
+        Raises ValueError if the file has another format or version.
+        """
+        return _ModelReader(file_path.read_bytes()).read()
 
     def children(self) -> list[ModuleNode]:
         """Return the direct children of this node."""
         return list(self._children.values())
 
+    def walk(
+        self, exclude: Iterable[DotPath] | ExcludedPaths | None = None
+    ) -> Iterator[ModuleNode]:
+        """Return all nodes below this node.
+
+        If the exclude argument is used then the given paths are
+        expected to be relative to this node.
+        """
+        if exclude is not None and not isinstance(exclude, ExcludedPaths):
+            exclude = ExcludedPaths(exclude)
+        for child in self._children.values():
+            relative_exclude = None
+            if exclude is not None:
+                relative_exclude = exclude.child(child.name)
+                if relative_exclude is not None and relative_exclude.is_excluded:
+                    continue
+            yield from child.walk(exclude=relative_exclude)
+
+    def is_loaded(self) -> bool:
+        """Check if the imports of all modules in this tree are loaded,
+        i.e., there is no module with a pending import loader."""
+        return all(node._import_loader is None for node in self.walk())
+
+    def import_index(self) -> ImportIndex:
+        """Return the inverted index for the imports in this tree.
+
+        The index is created on first use and then reused,
+        so the tree should not be modified afterwards.
+        Creating the index loads the imports of all modules.
+        """
+        if self._import_index is None:
+            self._import_index = ImportIndex(self.walk())
+        return self._import_index
+
+    def flat_tree(self) -> FlatTree:
+        """Return the flat representation of this tree.
+
+        Like the import index, it is created on first use and then reused,
+        so the tree should not be modified afterwards.
+        """
+        if self._flat_tree is None:
+            self._flat_tree = FlatTree(self)
+        return self._flat_tree
+
+    def module_graph(self) -> ModuleGraph:
+        """Return the dependency graph between the modules in this tree.
+
+        Like the import index, the graph is created on first use and
+        then reused (and creating it loads the imports of all modules).
+        """
+        if self._module_graph is None:
+            self._module_graph = ModuleGraph(self, self.import_index())
+        return self._module_graph
+
+    def add_module_file(
+        self,
+        base_path: Path,
+        module_path: Path,
+        imports: Iterable[ImportInModule],
+    ) -> ModuleNode:
+        """Add the node for a module file below the base path.
+
+        If the node already exists then its imports are replaced.
+        A module file and a package of the same name (e.g., `x.py` and
+        `x/__init__.py`) can't both be added, this raises a ValueError.
+        """
+        dot_path = DotPath.from_path(module_path.relative_to(base_path))
+        return self._add_module_file(dot_path, module_path, imports)
+
+    def add_module_files(
+        self,
+        base_path: Path,
+        module_files: Iterable[tuple[Path, Iterable[ImportInModule]]],
+    ) -> None:
+        """Add the nodes for many module files below the base path,
+        like `add_module_file`.
+
+        This is meant for loading a whole tree, with the files sorted by
+        directory (as from `walk_module_files`): the dot path of each
+        directory is only computed once, and new nodes are added below
+        their parent from the index, without descending from the root.
+        """
+        directory = None
+        directory_dot_path = DotPath()
+        for module_path, imports in module_files:
+            if (parent_path := module_path.parent) != directory:
+                directory = parent_path
+                directory_dot_path = DotPath(parent_path.relative_to(base_path).parts)
+            if module_path.name == '__init__.py':
+                dot_path = directory_dot_path
+            else:
+                dot_path = directory_dot_path._child(
+                    module_path.name.removesuffix('.py')
+                )
+            self._add_module_file(dot_path, module_path, imports)
+
+    def _add_module_file(
+        self,
+        dot_path: DotPath,
+        module_path: Path,
+        imports: Iterable[ImportInModule],
+    ) -> ModuleNode:
+        if module_path.name == '__init__.py':
+            # Note: The node of a new package starts as a directory node,
+            #   so its parents get the right directories.
+            node = self.get_or_add(dot_path, module_path.parent)
+            if node._kind == _NODE_PACKAGE:
+                node.clear_imports()
+            node.add_data_for_init_file(imports)
+        else:
+            node = self.get_or_add(dot_path, module_path)
+            if node._kind == _NODE_PACKAGE:
+                raise _name_conflict(module_path, node._file_path)
+            if node._kind == _NODE_DIRECTORY:
+                # Note: A directory of the same name may have been added first
+                #   (e.g., `util/` for `util/helper.py`), the module replaces it.
+                node._file_path = module_path
+                node._kind = _NODE_MODULE
+            node.clear_imports()
+            node.add_imports(imports)
+        return node
+
+    def update_paths(
+        self,
+        base_path: Path,
+        changed: Iterable[tuple[Path, Iterable[ImportInModule]]],
+        deleted: Iterable[Path],
+    ) -> None:
+        """Update the tree for changed and deleted module files below the base path.
+
+        The nodes of deleted files are removed, together with parent
+        directory nodes that become empty. Packages with a deleted
+        `__init__.py` file, and modules with a directory of the same name,
+        turn back into directory nodes. Then changed files are added or get
+        their imports replaced.
+
+        A module file and a package of the same name (e.g., `x.py` and
+        `x/__init__.py`) raise a ValueError, like in `add_module_file`.
+
+        The import index, the module graph and the flat tree of this node
+        are reset and created again on next use.
+        """
+        for module_path in deleted:
+            self._remove_module_file(base_path, module_path)
+        for module_path, imports in changed:
+            self.add_module_file(base_path, module_path, imports)
+        self._import_index = None
+        self._module_graph = None
+        self._flat_tree = None
+
+    def _remove_module_file(self, base_path: Path, module_path: Path) -> None:
+        dot_path = DotPath.from_path(module_path.relative_to(base_path))
+        if (node := self.get(dot_path)) is None or node.file_path != module_path:
+            return
+        node.clear_imports()
+        if module_path.name == '__init__.py':
+            node._file_path = module_path.parent
+        else:
+            node._file_path = module_path.with_suffix('')
+        node._kind = _NODE_DIRECTORY
+        self._remove_empty_directories(dot_path.parts)
+
+    def _remove_empty_directories(self, parts: tuple[str, ...]) -> None:
+        """Remove the node for the path parts and its parents,
+        as long as they are directory nodes without children."""
+        child = self._children[parts[0]]
+        if len(parts) > 1:
+            child._remove_empty_directories(parts[1:])
+        if not child._children and child._kind == _NODE_DIRECTORY:
+            del self._children[parts[0]]
+            del self._nodes_by_path[child.dot_path]
+
     def get(self, dot_path: DotPath) -> ModuleNode | None:
+        """Return the node from this tree corresponding to the dot path.
+
+        The node is looked up in the index of the tree, so this takes
+        constant time.
+        """
         if not dot_path.parts:
             raise KeyError('Empty path is not supported on root node.')
-        if child := self._children.get(dot_path.parts[0]):
-            return child.get(DotPath(dot_path.parts[1:]))
-        return None
+        return self._nodes_by_path.get(self._full_dotpath(dot_path))
+
+    def _full_dotpath(self, dot_path: DotPath) -> DotPath:
+        return dot_path
 
     def _child_dotpath(self, name: str) -> DotPath:
         return DotPath(name)
 
+    def _add_child(self, name: str, file_path: Path) -> ModuleNode:
+        child = ModuleNode(
+            name=name,
+            full_dotpath=self._child_dotpath(name),
+            file_path=file_path,
+            store=self._store,
+            nodes_by_path=self._nodes_by_path,
+        )
+        self._children[name] = child
+        self._nodes_by_path[child.dot_path] = child
+        return child
+
     def get_or_add(self, dot_path: DotPath, file_path: Path) -> ModuleNode:
+        """Return the node for this dot_path.
+
+        If the node and any of its parents are missing then they are
+        first added to the tree. The file paths of the missing parents
+        are the parent directories of the file path.
+        """
         if not dot_path.parts:
             raise KeyError('Empty path is not supported on root node.')
-        name = dot_path.parts[0]
-        remaining_path = DotPath(dot_path.parts[1:])
-        if not (child := self._children.get(name)):
-            if remaining_path.parts:
-                child_file_path = Path(*file_path.parts[: -len(remaining_path.parts)])
-            else:
-                child_file_path = file_path
-            child = ModuleNode(
-                name=name,
-                full_dotpath=self._child_dotpath(name),
-                file_path=child_file_path,
-            )
-            self._children[name] = child
-        return child.get_or_add(remaining_path, file_path)
+        full_dotpath = self._full_dotpath(dot_path)
+        if (node := self._nodes_by_path.get(full_dotpath)) is not None:
+            return node
+        # Note: Find the nearest existing parent, then add the missing nodes below it.
+        missing = [(full_dotpath, file_path)]
+        parent: RootNode = self
+        for _ in range(len(dot_path.parts) - 1):
+            parent_path = missing[-1][0].parent
+            if (parent_node := self._nodes_by_path.get(parent_path)) is not None:
+                parent = parent_node
+                break
+            missing.append((parent_path, missing[-1][1].parent))
+        for missing_path, missing_file_path in reversed(missing[1:]):
+            parent = parent._add_child(missing_path.name, missing_file_path)
+        return parent._add_child(full_dotpath.name, file_path)
 
 
 class ModuleNode(RootNode):
@@ -136,12 +676,24 @@ class ModuleNode(RootNode):
     node for the __init__.py file).
     """
 
-    def __init__(self, name: str, full_dotpath: DotPath, file_path: Path):
-        super().__init__()
+    def __init__(
+        self,
+        name: str,
+        full_dotpath: DotPath,
+        file_path: Path,
+        store: ImportStore | None = None,
+        nodes_by_path: dict[DotPath, ModuleNode] | None = None,
+    ):
+        super().__init__(store, nodes_by_path)
         self._name: str = name
         self._dot_path: DotPath = full_dotpath
         self._file_path: Path = file_path
-        self._imports: list[ImportInModule] = []
+        # Note: The kind follows from the file path when the node is added,
+        #   and is then kept up to date when the node changes its kind.
+        self._kind: int = _path_kind(file_path)
+        self._module_id = self._store.add_module(self)
+        self._import_rows = range(0)
+        self._import_loader: ImportLoader | None = None
 
     @property
     def name(self) -> str:
@@ -157,8 +709,13 @@ class ModuleNode(RootNode):
         return self._dot_path
 
     @property
-    def imports(self) -> Sequence[ImportInModule]:
-        return self._imports
+    def imports(self) -> ModuleImports:
+        if self._import_loader is not None:
+            # Note: The loader is kept if loading fails (e.g., on a syntax error),
+            #   so the error is raised again instead of reporting no imports.
+            self.add_imports(self._import_loader())
+            self._import_loader = None
+        return ModuleImports(self._store, self._import_rows)
 
     @property
     def file_path(self) -> Path:
@@ -169,54 +726,709 @@ class ModuleNode(RootNode):
         """
         return self._file_path
 
+    @property
+    def is_directory(self) -> bool:
+        """Whether this node is a directory without a module file
+        (e.g., a namespace package)."""
+        return self._kind == _NODE_DIRECTORY
+
     def add_imports(self, imports: Iterable[ImportInModule]) -> None:
-        self._imports += imports
+        self._import_rows = self._store.add_imports(
+            self._module_id, self._import_rows, imports
+        )
+
+    def clear_imports(self) -> None:
+        self._store.remove_imports(self._import_rows)
+        self._import_rows = range(0)
+        self._import_loader = None
+
+    def set_import_loader(self, loader: ImportLoader) -> None:
+        """Replace the imports with the result of the loader,
+        which is only called when the imports are first accessed."""
+        self.clear_imports()
+        self._import_loader = loader
 
     def add_data_for_init_file(self, imports: Iterable[ImportInModule]) -> None:
         """Turn a directory node into a package node,
         with data from the `__init__.py` file.
 
         There is no separate node for the `__init__.py` file.
+        A module node can't be turned into a package, this raises a ValueError.
         """
-        if self._file_path.name != '__init__.py':
-            assert not self._file_path.suffix
+        if self._kind == _NODE_MODULE:
+            raise _name_conflict(
+                self._file_path, self._file_path.with_suffix('') / '__init__.py'
+            )
+        if self._kind == _NODE_DIRECTORY:
             self._file_path /= '__init__.py'
+            self._kind = _NODE_PACKAGE
         self.add_imports(imports)
 
     def get(self, dot_path: DotPath) -> ModuleNode | None:
-        """Return the node from this tree corresponding to the dot path."""
+        """Return the node from this tree corresponding to the dot path,
+        relative to this node."""
         if not dot_path.parts:
             return self
         return super().get(dot_path)
 
+    def _full_dotpath(self, dot_path: DotPath) -> DotPath:
+        return self._dot_path / dot_path
+
     def _child_dotpath(self, name: str) -> DotPath:
-        return self._dot_path / name
+        return self._dot_path._child(name)
 
     def get_or_add(self, dot_path: DotPath, file_path: Path) -> ModuleNode:
-        """Return the node for this dot_path.
-
-        If this node and any of its parents are missing then they are
-        first added to the tree.
-        """
         if not dot_path.parts:
             return self
         return super().get_or_add(dot_path, file_path)
 
-    def walk(self, exclude: Iterable[DotPath] | None = None) -> Iterator[ModuleNode]:
+    def walk(
+        self, exclude: Iterable[DotPath] | ExcludedPaths | None = None
+    ) -> Iterator[ModuleNode]:
         """Return all nodes including and below this node.
 
         If the exclude argument is used then the given paths are
         expected to be relative to this node.
         """
         yield self
-        for child in self._children.values():
-            relative_exclude = None
-            if exclude:
-                relative_exclude = {
-                    DotPath(p.parts[1:])
-                    for p in exclude
-                    if p.parts and p.parts[0] == child.name
-                }
-                if DotPath() in relative_exclude:
-                    continue
-            yield from child.walk(exclude=relative_exclude)
+        yield from super().walk(exclude=exclude)
+
+    def contains(
+        self, node: ModuleNode, exclude: Iterable[DotPath] | ExcludedPaths = ()
+    ) -> bool:
+        """Check if the node is this node or below it (and not excluded).
+
+        The exclude paths are expected to be relative to this node,
+        as in `walk`.
+        """
+        if not node.dot_path.is_relative_to(self._dot_path):
+            return False
+        if not isinstance(exclude, ExcludedPaths):
+            exclude = ExcludedPaths(exclude)
+        return not exclude.contains(node.dot_path.parts[len(self._dot_path.parts) :])
+
+
+def _path_kind(file_path: Path) -> int:
+    if file_path.name == '__init__.py':
+        return _NODE_PACKAGE
+    if file_path.suffix == '.py':
+        return _NODE_MODULE
+    return _NODE_DIRECTORY
+
+
+def _name_conflict(module_path: Path, package_path: Path) -> ValueError:
+    return ValueError(
+        f'Module {module_path} has the same name as the package {package_path},'
+        ' remove or rename one of them.'
+    )
+
+
+class ExcludedPaths:
+    """Set of excluded subtrees, as a trie over the parts of their paths.
+
+    Paths below an excluded path are pruned when the trie is built, so
+    checking a path stops at its first excluded ancestor, and the
+    excluded subtrees are only listed once. Empty paths are ignored.
+    """
+
+    __slots__ = ('_children', 'is_excluded')
+
+    def __init__(self, paths: Iterable[DotPath] = ()) -> None:
+        self._children: dict[str, ExcludedPaths] = {}
+        self.is_excluded = False
+        for path in paths:
+            if path.parts:
+                self._add(path.parts)
+
+    def _add(self, parts: tuple[str, ...]) -> None:
+        trie = self
+        for part in parts:
+            if (child := trie._children.get(part)) is None:
+                child = trie._children[part] = ExcludedPaths()
+            elif child.is_excluded:
+                return
+            trie = child
+        trie.is_excluded = True
+        trie._children.clear()
+
+    def child(self, name: str) -> ExcludedPaths | None:
+        """Return the excluded paths below the child (relative to it),
+        or None if nothing below it is excluded."""
+        return self._children.get(name)
+
+    def contains(self, parts: Sequence[str]) -> bool:
+        """Check if the path (given by its parts) is excluded,
+        i.e., it is an excluded path or below one."""
+        trie = self
+        for part in parts:
+            if (child := trie._children.get(part)) is None:
+                return False
+            if child.is_excluded:
+                return True
+            trie = child
+        return False
+
+    def paths(self) -> Iterator[DotPath]:
+        """Return the excluded paths, without the pruned paths below them."""
+        stack = [(DotPath(), self)]
+        while stack:
+            path, trie = stack.pop()
+            for name, child in trie._children.items():
+                if child.is_excluded:
+                    yield path._child(name)
+                else:
+                    stack.append((path._child(name), child))
+
+
+class FlatTree:
+    """Frozen representation of a tree as an array of its nodes in pre-order
+    (i.e., in the order of `walk`), so each subtree is a contiguous range.
+
+    The end of the range is stored for each node, so the nodes of a scope
+    (with excluded subtrees) are found by subtracting ranges, without
+    recursion and without creating paths for each level.
+    """
+
+    def __init__(self, root_node: RootNode):
+        self._nodes: list[ModuleNode] = []
+        # The end of the subtree range for each node (exclusive).
+        self._ends = array('i')
+        self._positions: dict[DotPath, int] = {}
+        # Note: The positions are pushed after the children,
+        #   to set the end of the range when all children are done.
+        stack: list[ModuleNode | int] = (
+            [root_node]
+            if isinstance(root_node, ModuleNode)
+            else list(reversed(root_node._children.values()))
+        )
+        while stack:
+            item = stack.pop()
+            if isinstance(item, int):
+                self._ends[item] = len(self._nodes)
+                continue
+            position = len(self._nodes)
+            self._positions[item.dot_path] = position
+            self._nodes.append(item)
+            self._ends.append(0)
+            stack.append(position)
+            stack += reversed(item._children.values())
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def select(
+        self,
+        base_node: ModuleNode,
+        exclude: Iterable[DotPath] | ExcludedPaths = (),
+    ) -> NodeRanges:
+        """Return the nodes including and below the base node,
+        without the excluded subtrees.
+
+        The exclude paths are expected to be relative to the base node,
+        as in `walk`.
+        """
+        if not isinstance(exclude, ExcludedPaths):
+            exclude = ExcludedPaths(exclude)
+        start = self._positions[base_node.dot_path]
+        end = self._ends[start]
+        # Note: The excluded subtrees are disjoint, since nested paths are pruned.
+        excluded = sorted(
+            (position, self._ends[position])
+            for p in exclude.paths()
+            if (position := self._positions.get(base_node.dot_path / p)) is not None
+        )
+        ranges: list[range] = []
+        for excluded_start, excluded_end in excluded:
+            if start < excluded_start:
+                ranges.append(range(start, excluded_start))
+            start = excluded_end
+        if start < end:
+            ranges.append(range(start, end))
+        return NodeRanges(self._nodes, self._positions, ranges)
+
+    def find(self, pattern: PathPattern) -> list[ModuleNode]:
+        """Return the nodes with a dot path matching the pattern,
+        without the nodes below another matching node.
+
+        The nodes are found in one pass over the flat tree, with the state
+        of the pattern for each level. Subtrees that can't contain
+        a match anymore are skipped.
+        """
+        nodes = self._nodes
+        ends = self._ends
+        found: list[ModuleNode] = []
+        # The end of the subtree range and the pattern state of the ancestors.
+        stack: list[tuple[int, int]] = []
+        position = 0
+        while position < len(nodes):
+            node = nodes[position]
+            while stack and stack[-1][0] <= position:
+                stack.pop()
+            if stack:
+                state = pattern.step(stack[-1][1], node.name)
+            else:
+                state = pattern.start
+                for part in node.dot_path.parts:
+                    state = pattern.step(state, part)
+            if pattern.is_match(state):
+                found.append(node)
+                position = ends[position]
+            elif state:
+                stack.append((ends[position], state))
+                position += 1
+            else:
+                position = ends[position]
+        return found
+
+
+class NodeRanges:
+    """Nodes of a flat tree, as ranges of their positions."""
+
+    def __init__(
+        self,
+        nodes: list[ModuleNode],
+        positions: dict[DotPath, int],
+        ranges: list[range],
+    ):
+        self._nodes = nodes
+        self._positions = positions
+        self.ranges = ranges
+
+    def __iter__(self) -> Iterator[ModuleNode]:
+        nodes = self._nodes
+        for node_range in self.ranges:
+            yield from nodes[node_range.start : node_range.stop]
+
+    def __contains__(self, node: object) -> bool:
+        if not isinstance(node, ModuleNode):
+            return False
+        position = self._positions.get(node.dot_path)
+        return position is not None and any(
+            position in node_range for node_range in self.ranges
+        )
+
+
+class _IndexNode:
+    __slots__ = ('children', 'positions')
+
+    def __init__(self) -> None:
+        self.children: dict[str, _IndexNode] = {}
+        self.positions = array('i')
+
+
+class ImportIndex:
+    """Inverted index from import paths to the modules importing them.
+
+    The index is a trie keyed by the parts of the import paths,
+    so all imports of a path or any path below it are found
+    without looking at the other imports.
+
+    Imports are numbered by their position when walking the tree,
+    and the trie only stores these positions.
+    """
+
+    def __init__(self, module_nodes: Iterable[ModuleNode]):
+        self._root = _IndexNode()
+        self._pattern_results: dict[
+            PathPattern, list[tuple[ModuleNode, ImportInModule]]
+        ] = {}
+        self._module_nodes: list[ModuleNode] = []
+        # Position of the first import of each module in _module_nodes.
+        self._module_starts = array('i')
+        index_nodes: dict[int, _IndexNode] = {}
+        position = 0
+        for module_node in module_nodes:
+            self._module_nodes.append(module_node)
+            self._module_starts.append(position)
+            for path_id, _, _ in module_node.imports.columns():
+                if (index_node := index_nodes.get(path_id)) is None:
+                    index_node = index_nodes[path_id] = self._add_path(
+                        DotPath.from_id(path_id)
+                    )
+                index_node.positions.append(position)
+                position += 1
+
+    def _add_path(self, import_path: DotPath) -> _IndexNode:
+        index_node = self._root
+        for part in import_path.parts:
+            if (child := index_node.children.get(part)) is None:
+                child = index_node.children[part] = _IndexNode()
+            index_node = child
+        return index_node
+
+    def find(self, import_path: DotPath) -> list[tuple[ModuleNode, ImportInModule]]:
+        """Return all imports of the path or of paths below it.
+
+        The results are in the same order as when walking the tree.
+        """
+        index_node = self._root
+        for part in import_path.parts:
+            if (child := index_node.children.get(part)) is None:
+                return []
+            index_node = child
+        positions = array('i')
+        self._collect_positions(index_node, positions)
+        return self._imports_at(positions)
+
+    def find_pattern(
+        self, pattern: PathPattern
+    ) -> list[tuple[ModuleNode, ImportInModule]]:
+        """Return all imports of paths matching the pattern or below them.
+
+        The trie is followed with the state of the pattern, so branches
+        that can't match are skipped. The results are in the same order
+        as when walking the tree, and they are kept for the pattern
+        (e.g., for a scope with many nodes).
+        """
+        if (results := self._pattern_results.get(pattern)) is not None:
+            return results
+        positions = array('i')
+        stack = [(self._root, pattern.start)]
+        while stack:
+            index_node, state = stack.pop()
+            for part, child in index_node.children.items():
+                child_state = pattern.step(state, part)
+                if pattern.is_match(child_state):
+                    self._collect_positions(child, positions)
+                elif child_state:
+                    stack.append((child, child_state))
+        results = self._pattern_results[pattern] = self._imports_at(positions)
+        return results
+
+    @staticmethod
+    def _collect_positions(index_node: _IndexNode, positions: array[int]) -> None:
+        stack = [index_node]
+        while stack:
+            current = stack.pop()
+            positions += current.positions
+            stack += current.children.values()
+
+    def _imports_at(
+        self, positions: array[int]
+    ) -> list[tuple[ModuleNode, ImportInModule]]:
+        results: list[tuple[ModuleNode, ImportInModule]] = []
+        for position in sorted(positions):
+            module_index = bisect_right(self._module_starts, position) - 1
+            module_node = self._module_nodes[module_index]
+            results.append(
+                (
+                    module_node,
+                    module_node.imports[position - self._module_starts[module_index]],
+                )
+            )
+        return results
+
+
+class ModuleGraph:
+    """Dependency graph between the module nodes of a tree.
+
+    Each import is resolved to the deepest node that contains the imported
+    path (e.g., `from a.b import c` to the node of `a.b`, unless `a.b.c` is
+    a module), and imports of paths outside the tree are not part of the
+    graph. Imports of a module itself are ignored. Importing a module
+    doesn't count as importing its parent packages.
+
+    Transitive imports are checked with a reachability bitset per strongly
+    connected component, which is computed on first use.
+    """
+
+    def __init__(self, root_node: RootNode, index: ImportIndex):
+        self._index = index
+        self._module_nodes = list(root_node.walk())
+        self._vertices = {
+            node.dot_path: vertex for vertex, node in enumerate(self._module_nodes)
+        }
+        # The position of the first import of each edge, by target vertex.
+        self._edges: list[dict[int, int]] = []
+        targets_by_path_id: dict[int, int] = {}
+        for vertex, module_node in enumerate(self._module_nodes):
+            edges: dict[int, int] = {}
+            for position, (path_id, _, _) in enumerate(module_node.imports.columns()):
+                if (target := targets_by_path_id.get(path_id)) is None:
+                    target = targets_by_path_id[path_id] = self._resolve(
+                        DotPath.from_id(path_id)
+                    )
+                if target != -1 and target != vertex and target not in edges:
+                    edges[target] = position
+            self._edges.append(edges)
+        self._digraph = Digraph([list(edges) for edges in self._edges])
+        self._reachability: Reachability | None = None
+
+    def _resolve(self, import_path: DotPath) -> int:
+        while import_path.parts:
+            if (vertex := self._vertices.get(import_path)) is not None:
+                return vertex
+            import_path = import_path.parent
+        return -1
+
+    def find_import_chains(
+        self, module_nodes: Iterable[ModuleNode], import_path: DotPath
+    ) -> Iterator[list[tuple[ModuleNode, ImportInModule]]]:
+        """Return a shortest import chain to the import path (or to a path
+        below it) for each of the module nodes that imports it transitively.
+
+        A chain starts with the import in the module node that leads to the
+        next module, and ends with the import of the import path.
+        """
+        final_imports: dict[int, ImportInModule] = {}
+        for module_node, import_by in self._index.find(import_path):
+            final_imports.setdefault(self._vertices[module_node.dot_path], import_by)
+        if not final_imports:
+            return
+        if self._reachability is None:
+            self._reachability = self._digraph.reachability()
+        reachability = self._reachability
+        mask = reachability.mask(final_imports)
+        next_hops: array[int] | None = None
+        for module_node in module_nodes:
+            vertex = self._vertices[module_node.dot_path]
+            if not reachability.reaches(vertex, mask):
+                continue
+            if next_hops is None:
+                next_hops = self._digraph.next_hops(final_imports)
+            chain = []
+            while vertex not in final_imports:
+                next_vertex = next_hops[vertex]
+                chain_node = self._module_nodes[vertex]
+                chain.append(
+                    (chain_node, chain_node.imports[self._edges[vertex][next_vertex]])
+                )
+                vertex = next_vertex
+            chain.append((self._module_nodes[vertex], final_imports[vertex]))
+            yield chain
+
+    def find_cycles(
+        self, module_nodes: Iterable[ModuleNode]
+    ) -> Iterator[list[tuple[ModuleNode, ImportInModule]]]:
+        """Return an import cycle for each group of mutually dependent modules,
+        only looking at the imports between the given module nodes.
+
+        Each cycle is a shortest cycle through the first module of the group
+        (in the order of the module nodes), and contains the import in each
+        module that leads to the next module (the last one back to the first).
+        Runs in linear time in the number of modules and imports between them.
+        """
+        vertices = [self._vertices[node.dot_path] for node in module_nodes]
+        local_vertices = {vertex: local for local, vertex in enumerate(vertices)}
+        subgraph = Digraph(
+            [
+                [local_vertices[t] for t in self._edges[vertex] if t in local_vertices]
+                for vertex in vertices
+            ]
+        )
+        components = [
+            component
+            for component in subgraph.strongly_connected_components()
+            if len(component) > 1
+        ]
+        for component in sorted(components, key=min):
+            cycle = [vertices[local] for local in subgraph.shortest_cycle(component)]
+            chain = []
+            for vertex, next_vertex in zip(cycle, [*cycle[1:], cycle[0]], strict=True):
+                module_node = self._module_nodes[vertex]
+                chain.append(
+                    (module_node, module_node.imports[self._edges[vertex][next_vertex]])
+                )
+            yield chain
+
+
+MODEL_FILE_MAGIC = b'PYIMPMDL'
+MODEL_FILE_VERSION = 1
+
+# Flag for the kind of nodes in the model file that store their directory
+#   (instead of deriving it from the parent node).
+_NODE_EXPLICIT_DIRECTORY = 4
+
+
+class _ModelWriter:
+    """Writes the binary model file format.
+
+    The file starts with the magic bytes and the format version,
+    followed by these tables (all numbers are varints, except in the
+    import columns):
+     - strings: the names of the nodes and paths, and the directories,
+     - paths: the imported paths, each as the index of its parent path
+       (0 for the root path, otherwise the index + 1) and a name,
+     - nodes: in pre-order, each with the index of its parent node
+       (0 for the root node), its name, kind, directory (only if it can't
+       be derived from the parent node) and number of imports,
+     - imports: the columns of path indexes, line numbers and levels,
+       as little-endian 32-bit integers in the order of the nodes.
+    """
+
+    def __init__(self) -> None:
+        self._strings: dict[str, int] = {}
+        self._path_indexes: dict[DotPath, int] = {_ROOT_PATH: 0}
+        self._paths: list[tuple[int, int]] = []
+
+    def write(self, root_node: RootNode) -> bytes:
+        nodes = bytearray()
+        path_indexes = array('i')
+        line_nos = array('i')
+        levels = array('i')
+        n_nodes = 0
+        # Note: The top-level nodes have no parent directory to derive from.
+        stack: list[tuple[int, Path | None, ModuleNode]] = [
+            (0, None, child) for child in reversed(root_node.children())
+        ]
+        while stack:
+            parent_index, parent_directory, node = stack.pop()
+            n_nodes += 1
+            kind, directory = self._node_kind(node)
+            self._write_varint(nodes, parent_index)
+            self._write_varint(nodes, self._string(node.name))
+            if directory == parent_directory:
+                self._write_varint(nodes, kind)
+            else:
+                self._write_varint(nodes, kind | _NODE_EXPLICIT_DIRECTORY)
+                self._write_varint(nodes, self._string(str(directory)))
+            imports = node.imports
+            self._write_varint(nodes, len(imports))
+            for path_id, line_no, level in imports.columns():
+                path_indexes.append(self._path_index(DotPath.from_id(path_id)))
+                line_nos.append(line_no)
+                levels.append(level)
+            stack += [
+                (n_nodes, directory / node.name, child)
+                for child in reversed(node.children())
+            ]
+        buffer = bytearray(MODEL_FILE_MAGIC)
+        self._write_varint(buffer, MODEL_FILE_VERSION)
+        self._write_varint(buffer, len(self._strings))
+        for string in self._strings:
+            encoded = string.encode('utf-8', 'surrogateescape')
+            self._write_varint(buffer, len(encoded))
+            buffer += encoded
+        self._write_varint(buffer, len(self._paths))
+        for parent_index, name_index in self._paths:
+            self._write_varint(buffer, parent_index)
+            self._write_varint(buffer, name_index)
+        self._write_varint(buffer, n_nodes)
+        buffer += nodes
+        self._write_varint(buffer, len(path_indexes))
+        for column in (path_indexes, line_nos, levels):
+            if sys.byteorder == 'big':
+                column.byteswap()  # pragma: no cover
+            buffer += column.tobytes()
+        return bytes(buffer)
+
+    @staticmethod
+    def _node_kind(node: ModuleNode) -> tuple[int, Path]:
+        file_path = node.file_path
+        if node._kind == _NODE_PACKAGE:
+            return _NODE_PACKAGE, file_path.parent.parent
+        return node._kind, file_path.parent
+
+    def _string(self, string: str) -> int:
+        if (index := self._strings.get(string)) is None:
+            index = self._strings[string] = len(self._strings)
+        return index
+
+    def _path_index(self, dot_path: DotPath) -> int:
+        if (index := self._path_indexes.get(dot_path)) is None:
+            parent_index = self._path_index(dot_path.parent)
+            self._paths.append((parent_index, self._string(dot_path.name)))
+            index = self._path_indexes[dot_path] = len(self._paths)
+        return index
+
+    @staticmethod
+    def _write_varint(buffer: bytearray, value: int) -> None:
+        while value > 0x7F:
+            buffer.append((value & 0x7F) | 0x80)
+            value >>= 7
+        buffer.append(value)
+
+
+def _node_file_path(kind: int, directory: Path, name: str) -> Path:
+    if kind == _NODE_PACKAGE:
+        return directory / name / '__init__.py'
+    if kind == _NODE_MODULE:
+        return directory / f'{name}.py'
+    return directory / name
+
+
+class _ModelReader:
+    """Reads the binary model file format (see `_ModelWriter`)."""
+
+    def __init__(self, data: bytes):
+        self._data = data
+        self._pos = 0
+
+    def read(self) -> RootNode:
+        if not self._data.startswith(MODEL_FILE_MAGIC):
+            raise ValueError('Not a pytest-imports model file.')
+        self._pos = len(MODEL_FILE_MAGIC)
+        if (version := self._read_varint()) != MODEL_FILE_VERSION:
+            raise ValueError(
+                f'Unsupported model file version {version}, '
+                f'expected {MODEL_FILE_VERSION}.'
+            )
+        strings = [
+            self._read_bytes(self._read_varint()).decode('utf-8', 'surrogateescape')
+            for _ in range(self._read_varint())
+        ]
+        path_ids = [_ROOT_PATH.id]
+        for _ in range(self._read_varint()):
+            parent_path = DotPath.from_id(path_ids[self._read_varint()])
+            path_ids.append(parent_path._child(strings[self._read_varint()]).id)
+        root_node = RootNode()
+        store = root_node._store
+        parents: list[RootNode] = [root_node]
+        # Note: The top-level nodes always have an explicit directory.
+        child_directories = [Path()]
+        module_ids = array('i')
+        start = 0
+        for _ in range(self._read_varint()):
+            parent_index = self._read_varint()
+            name = strings[self._read_varint()]
+            kind = self._read_varint()
+            parent = parents[parent_index]
+            if kind & _NODE_EXPLICIT_DIRECTORY:
+                directory = Path(strings[self._read_varint()])
+            else:
+                directory = child_directories[parent_index]
+            kind &= ~_NODE_EXPLICIT_DIRECTORY
+            node = parent._add_child(name, _node_file_path(kind, directory, name))
+            node._kind = kind
+            parents.append(node)
+            child_directories.append(directory / name)
+            n_imports = self._read_varint()
+            node._import_rows = range(start, start + n_imports)
+            module_ids += array('i', [node._module_id]) * n_imports
+            start += n_imports
+        n_rows = self._read_varint()
+        path_indexes, store._line_nos, store._levels = (
+            self._read_column(n_rows) for _ in range(3)
+        )
+        store._path_ids = array('i', [path_ids[i] for i in path_indexes])
+        store._module_ids = module_ids
+        return root_node
+
+    def _read_column(self, n_rows: int) -> array[int]:
+        column = array('i')
+        column.frombytes(self._read_bytes(n_rows * column.itemsize))
+        if sys.byteorder == 'big':
+            column.byteswap()  # pragma: no cover
+        return column
+
+    def _read_bytes(self, size: int) -> bytes:
+        end = self._pos + size
+        if end > len(self._data):
+            raise ValueError('Truncated model file.')
+        data = self._data[self._pos : end]
+        self._pos = end
+        return data
+
+    def _read_varint(self) -> int:
+        value = 0
+        shift = 0
+        data = self._data
+        while True:
+            if self._pos >= len(data):
+                raise ValueError('Truncated model file.')
+            byte = data[self._pos]
+            self._pos += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
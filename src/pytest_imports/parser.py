@@ -1,68 +1,505 @@
 import ast
 import logging
-from collections.abc import Generator, Sequence
+import multiprocessing
+import os
+import time
+from collections import deque
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import AbstractContextManager, nullcontext
+from functools import partial
 from pathlib import Path
+from typing import Literal
+from weakref import WeakKeyDictionary
 
+from .cache import FileSignature, ImportCache
+from .discovery import DEFAULT_EXCLUDE_DIRS, walk_module_files
 from .model import DotPath, ImportInModule, RootNode
+from .profile import Profile
+from .scanner import AmbiguousSource, ScannedImport, scan_imports
 
 log = logging.getLogger(__name__)
 
+MAX_CHUNK_SIZE = 64
+# Number of threads for reading the module files, and number of files
+#   that are read ahead of the parsing.
+READ_THREADS = 8
+READ_AHEAD = 64
+# Note: The worker processes are not forked, as the models may be built in
+#   several threads, and a fork copies the locks held by the other threads
+#   (e.g., while interning paths), which then deadlocks the child.
+PROCESS_START_METHOD = (
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
 
-def build_import_model(base_path: Path) -> RootNode:
-    root_node = RootNode()
-    for module_path, module_content in _walk_modules(base_path):
-        module_ast = ast.parse(module_content, str(module_path))
-        dot_path = DotPath.from_path(module_path.relative_to(base_path))
-        node = root_node.get_or_add(dot_path, module_path)
-        imports = _collect_imports(module_ast, dot_path)
-        if module_path.name == '__init__.py':
-            node.add_data_for_init_file(imports)
+# 'ast' parses the full syntax tree, 'fast' only scans for import statements
+#   (and falls back to 'ast' if the scan isn't reliable for a module).
+Engine = Literal['ast', 'fast']
+
+# Import path parts, line number and level of an import.
+ImportRecord = tuple[tuple[str, ...], int, int]
+
+# Signatures of the module files that were parsed for a model,
+#   for finding the changed files when the model is updated.
+_model_signatures: WeakKeyDictionary[RootNode, dict[Path, FileSignature]] = (
+    WeakKeyDictionary()
+)
+
+
+def build_import_model(
+    base_path: Path,
+    cache: ImportCache | None = None,
+    workers: int = 1,
+    engine: Engine = 'ast',
+    previous: RootNode | None = None,
+    profile: Profile | None = None,
+    lazy: bool = False,
+    exclude_dirs: Sequence[str] = DEFAULT_EXCLUDE_DIRS,
+    use_gitignore: bool = False,
+) -> RootNode:
+    """Parse all modules below the base path and return the module tree.
+
+    If a cache is given then only modules without a valid cache entry are
+    parsed, and the updated cache is saved afterwards.
+
+    With more than one worker the modules are parsed in a process pool.
+    The resulting model is identical to the one from sequential parsing.
+
+    The engine determines how the imports are extracted from each module,
+    both engines result in the same model.
+
+    If a previous model for the same base path and engine is given then
+    only the modules that changed since it was built are parsed, and the
+    previous model is updated in place and returned (without using the
+    cache). This requires that the previous model was built with a cache
+    or with multiple workers, otherwise a new model is built.
+
+    With a profile the time for the whole build ('model'), for finding
+    ('discovery'), reading ('read') and parsing ('parse') each module,
+    and for building the tree ('tree') is recorded.
+
+    In lazy mode only the module tree is created, and each module is parsed
+    (or loaded from the cache) when its imports are first accessed. Workers
+    and previous models are not used then. The cache is not saved, since
+    the modules are parsed later on, so save it with `prune=False` once
+    the model is no longer used.
+
+    Hidden directories, directories matching the `exclude_dirs` patterns,
+    and optionally those ignored by `.gitignore` files are not searched
+    for modules (see `walk_module_files`).
+    """
+    model_phase: AbstractContextManager[None] = (
+        profile.phase('model') if profile is not None else nullcontext()
+    )
+    with model_phase:
+        module_files: Iterable[os.DirEntry[str]] = walk_module_files(
+            base_path, exclude_dirs, use_gitignore
+        )
+        if profile is not None:
+            module_files = _profile_discovery(module_files, profile)
+        if lazy:
+            return _build_lazy_model(base_path, module_files, cache, engine, profile)
+        if previous is not None and previous in _model_signatures:
+            _update_model(previous, base_path, module_files, workers, engine, profile)
+            return previous
+        root_node = RootNode()
+        if cache is None and workers <= 1:
+            module_imports = _parse_modules(base_path, module_files, engine, profile)
         else:
-            node.add_imports(imports)
+            signatures = _model_signatures[root_node] = {}
+            module_imports = _parse_modules_batched(
+                base_path, module_files, cache, workers, engine, signatures, profile
+            )
+        if profile is not None:
+            module_imports = _profile_tree(module_imports, profile)
+        root_node.add_module_files(base_path, module_imports)
+        if cache is not None:
+            cache.save()
+        return root_node
+
+
+def _profile_discovery(
+    module_files: Iterable[os.DirEntry[str]], profile: Profile
+) -> Iterator[os.DirEntry[str]]:
+    """Pass the module files on and profile the time for finding each one."""
+    module_files = iter(module_files)
+    while True:
+        start = time.perf_counter()
+        entry = next(module_files, None)
+        if entry is None:
+            profile.add_time('discovery', time.perf_counter() - start)
+            return
+        profile.add_time('discovery', time.perf_counter() - start, count=1)
+        yield entry
+
+
+def _profile_tree(
+    module_imports: Iterable[tuple[Path, Sequence[ImportInModule]]], profile: Profile
+) -> Iterator[tuple[Path, Sequence[ImportInModule]]]:
+    """Pass the modules on and profile the time for adding each one to the tree
+    (i.e., the time until the next module is requested)."""
+    for module_path, imports in module_imports:
+        start = time.perf_counter()
+        yield module_path, imports
+        profile.add_time('tree', time.perf_counter() - start, count=1)
+
+
+def _update_model(
+    root_node: RootNode,
+    base_path: Path,
+    module_files: Iterable[os.DirEntry[str]],
+    workers: int,
+    engine: Engine,
+    profile: Profile | None,
+) -> None:
+    previous_signatures = _model_signatures[root_node]
+    signatures = {
+        Path(entry.path): FileSignature.from_stat(entry.stat())
+        for entry in module_files
+    }
+    changed_paths = [
+        module_path
+        for module_path, signature in signatures.items()
+        if previous_signatures.get(module_path) != signature
+    ]
+    deleted_paths = [
+        module_path
+        for module_path in previous_signatures
+        if module_path not in signatures
+    ]
+    log.info(
+        f'Updating model for {len(changed_paths)} changed '
+        f'and {len(deleted_paths)} deleted modules.'
+    )
+    root_node.update_paths(
+        base_path,
+        changed=zip(
+            changed_paths,
+            _parse_files(changed_paths, base_path, workers, engine, profile),
+            strict=True,
+        ),
+        deleted=deleted_paths,
+    )
+    _model_signatures[root_node] = signatures
+
+
+def _build_lazy_model(
+    base_path: Path,
+    module_files: Iterable[os.DirEntry[str]],
+    cache: ImportCache | None,
+    engine: Engine,
+    profile: Profile | None,
+) -> RootNode:
+    root_node = RootNode()
+    for entry in module_files:
+        node = root_node.add_module_file(base_path, Path(entry.path), ())
+        node.set_import_loader(
+            partial(_load_module, entry, base_path, cache, engine, profile)
+        )
     return root_node
 
 
+def _load_module(
+    entry: os.DirEntry[str],
+    base_path: Path,
+    cache: ImportCache | None,
+    engine: Engine,
+    profile: Profile | None,
+) -> Sequence[ImportInModule]:
+    """Return the imports of a module from the cache, or parse it."""
+    module_path = Path(entry.path)
+    if cache is None:
+        return _parse_module_profiled(
+            _read_module_profiled(module_path, profile),
+            module_path,
+            base_path,
+            engine,
+            profile,
+        )
+    stat = entry.stat()
+    content = _read_module_profiled(module_path, profile) if cache.verify_hash else None
+    signature = FileSignature.from_stat(stat, content)
+    relative_path = module_path.relative_to(base_path)
+    if (imports := cache.get(relative_path, signature)) is not None:
+        return imports
+    if content is None:
+        content = _read_module_profiled(module_path, profile)
+    imports = _parse_module_profiled(content, module_path, base_path, engine, profile)
+    cache.put(relative_path, signature, imports)
+    return imports
+
+
+def _parse_modules(
+    base_path: Path,
+    module_files: Iterable[os.DirEntry[str]],
+    engine: Engine,
+    profile: Profile | None,
+) -> Iterator[tuple[Path, Sequence[ImportInModule]]]:
+    for module_path, module_content in _walk_modules(module_files, profile):
+        yield (
+            module_path,
+            _parse_module_profiled(
+                module_content, module_path, base_path, engine, profile
+            ),
+        )
+
+
+def _parse_modules_batched(
+    base_path: Path,
+    module_files: Iterable[os.DirEntry[str]],
+    cache: ImportCache | None,
+    workers: int,
+    engine: Engine,
+    signatures: dict[Path, FileSignature],
+    profile: Profile | None,
+) -> Iterator[tuple[Path, Sequence[ImportInModule]]]:
+    """Parse the modules, using the cache, and collect their signatures.
+
+    The `stat` results from the module discovery are reused for the signatures.
+    """
+    module_paths: list[Path] = []
+    imports_by_path: dict[Path, Sequence[ImportInModule]] = {}
+    cache_signatures: dict[Path, FileSignature] = {}
+    for entry in module_files:
+        module_path = Path(entry.path)
+        module_paths.append(module_path)
+        stat = entry.stat()
+        signatures[module_path] = FileSignature.from_stat(stat)
+        if cache is None:
+            continue
+        content = (
+            _read_module_profiled(module_path, profile) if cache.verify_hash else None
+        )
+        signature = FileSignature.from_stat(stat, content)
+        relative_path = module_path.relative_to(base_path)
+        if (imports := cache.get(relative_path, signature)) is not None:
+            imports_by_path[module_path] = imports
+        else:
+            cache_signatures[module_path] = signature
+    stale_paths = [path for path in module_paths if path not in imports_by_path]
+    parsed_imports = _parse_files(stale_paths, base_path, workers, engine, profile)
+    for module_path, imports in zip(stale_paths, parsed_imports, strict=True):
+        imports_by_path[module_path] = imports
+        if cache is not None:
+            relative_path = module_path.relative_to(base_path)
+            cache.put(relative_path, cache_signatures[module_path], imports)
+    for module_path in module_paths:
+        yield module_path, imports_by_path[module_path]
+
+
+def _parse_files(
+    module_paths: Sequence[Path],
+    base_path: Path,
+    workers: int,
+    engine: Engine,
+    profile: Profile | None = None,
+) -> Iterator[Sequence[ImportInModule]]:
+    if workers <= 1 or len(module_paths) <= 1:
+        for module_path, module_content in _read_modules(module_paths, profile):
+            yield _parse_module_profiled(
+                module_content, module_path, base_path, engine, profile
+            )
+        return
+    chunk_size = max(1, min(MAX_CHUNK_SIZE, len(module_paths) // (workers * 4)))
+    chunks = [
+        module_paths[i : i + chunk_size]
+        for i in range(0, len(module_paths), chunk_size)
+    ]
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(chunks)),
+        mp_context=multiprocessing.get_context(PROCESS_START_METHOD),
+    ) as executor:
+        for chunk, (chunk_records, log_records, durations) in zip(
+            chunks,
+            executor.map(partial(_parse_chunk, base_path, engine), chunks),
+            strict=True,
+        ):
+            for log_record in log_records:
+                log.handle(log_record)
+            if profile is not None:
+                for module_path, (read_seconds, parse_seconds) in zip(
+                    chunk, durations, strict=True
+                ):
+                    profile.add_time('read', read_seconds, count=1)
+                    profile.add_file(module_path, parse_seconds)
+            for module_records in chunk_records:
+                yield [
+                    ImportInModule(DotPath(parts), line_no, level)
+                    for parts, line_no, level in module_records
+                ]
+
+
+def _parse_chunk(
+    base_path: Path, engine: Engine, module_paths: Sequence[Path]
+) -> tuple[
+    list[list[ImportRecord]], list[logging.LogRecord], list[tuple[float, float]]
+]:
+    """Parse modules in a worker process.
+
+    Returns compact import records instead of model objects, together with
+    the log records, which are handled in the main process, and the read
+    and parse durations of each module.
+    """
+    handler = _RecordingHandler()
+    log.addHandler(handler)
+    log.propagate = False
+    chunk_records: list[list[ImportRecord]] = []
+    durations: list[tuple[float, float]] = []
+    try:
+        for module_path in module_paths:
+            start = time.perf_counter()
+            content = module_path.read_bytes()
+            read_end = time.perf_counter()
+            imports = _parse_module(content, module_path, base_path, engine)
+            durations.append((read_end - start, time.perf_counter() - read_end))
+            chunk_records.append(
+                [
+                    (import_by.import_path.parts, import_by.line_no, import_by.level)
+                    for import_by in imports
+                ]
+            )
+    finally:
+        log.removeHandler(handler)
+        log.propagate = True
+    return chunk_records, handler.records, durations
+
+
+class _RecordingHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.records: list[logging.LogRecord] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+
+
+def _read_module_profiled(module_path: Path, profile: Profile | None) -> bytes:
+    if profile is None:
+        return module_path.read_bytes()
+    start = time.perf_counter()
+    content = module_path.read_bytes()
+    profile.add_time('read', time.perf_counter() - start, count=1)
+    return content
+
+
+def _parse_module_profiled(
+    module_content: str | bytes,
+    module_path: Path,
+    base_path: Path,
+    engine: Engine,
+    profile: Profile | None,
+) -> Sequence[ImportInModule]:
+    if profile is None:
+        return _parse_module(module_content, module_path, base_path, engine)
+    start = time.perf_counter()
+    imports = _parse_module(module_content, module_path, base_path, engine)
+    profile.add_file(module_path, time.perf_counter() - start)
+    return imports
+
+
+def _parse_module(
+    module_content: str | bytes,
+    module_path: Path,
+    base_path: Path,
+    engine: Engine = 'ast',
+) -> Sequence[ImportInModule]:
+    dot_path = DotPath.from_path(module_path.relative_to(base_path))
+    if engine == 'fast':
+        try:
+            return _resolve_imports(scan_imports(module_content), dot_path)
+        except AmbiguousSource as e:
+            log.debug(f'Falling back to ast parser for {module_path}: {e}')
+    module_ast = ast.parse(module_content, str(module_path))
+    return _collect_imports(module_ast, dot_path)
+
+
 def _collect_imports(
     module_ast: ast.Module, node_path: DotPath
 ) -> Sequence[ImportInModule]:
-    imports: list[ImportInModule] = []
+    """Return the imports in the syntax tree, in the order of their appearance."""
+    scanned_imports: list[ScannedImport] = []
     for ast_node in ast.walk(module_ast):
         match ast_node:
             case ast.Import() as ast_import:
-                for alias in ast_import.names:
-                    imports.append(
-                        ImportInModule(
-                            import_path=DotPath(alias.name),
-                            line_no=alias.lineno,
-                        )
-                    )
+                scanned_imports.extend(
+                    ScannedImport(None, alias.name, alias.lineno)
+                    for alias in ast_import.names
+                )
             case ast.ImportFrom() as ast_import_from:
-                for alias in ast_import_from.names:
-                    if ast_import_from.module:
-                        from_path = DotPath(ast_import_from.module)
-                    else:
-                        from_path = DotPath()
-                    if (level := ast_import_from.level) > 0:
-                        if level > len(node_path.parts):
-                            log.warning(
-                                f'Skipping import from {node_path} because '
-                                f'relative import level goes beyond project.'
-                            )
-                            continue
-                        else:
-                            from_path = DotPath(node_path.parts[:-level]) / from_path
-                    from_path /= alias.name
-                    imports.append(
-                        ImportInModule(
-                            import_path=from_path,
-                            line_no=alias.lineno,
-                            level=ast_import_from.level,
-                        )
+                scanned_imports.extend(
+                    ScannedImport(
+                        ast_import_from.module or '',
+                        alias.name,
+                        alias.lineno,
+                        ast_import_from.level,
                     )
+                    for alias in ast_import_from.names
+                )
+    # Note: ast.walk is breadth-first, but statements on the same line
+    #   are always on the same level, so sorting restores the source order.
+    scanned_imports.sort(key=lambda scanned: scanned.line_no)
+    return _resolve_imports(scanned_imports, node_path)
+
+
+def _resolve_imports(
+    scanned_imports: Iterable[ScannedImport], node_path: DotPath
+) -> Sequence[ImportInModule]:
+    imports: list[ImportInModule] = []
+    for module, name, line_no, level in scanned_imports:
+        if module is None:
+            imports.append(ImportInModule(import_path=DotPath(name), line_no=line_no))
+            continue
+        from_path = DotPath(module)
+        if level > 0:
+            if level > len(node_path.parts):
+                log.warning(
+                    f'Skipping import from {node_path} because '
+                    f'relative import level goes beyond project.'
+                )
+                continue
+            else:
+                from_path = DotPath(node_path.parts[:-level]) / from_path
+        imports.append(
+            ImportInModule(import_path=from_path / name, line_no=line_no, level=level)
+        )
     return imports
 
 
-def _walk_modules(base_path: Path) -> Generator[tuple[Path, str], None, None]:
-    for path in base_path.glob('**/*.py'):
-        if not any(part.startswith('.') for part in path.parts):
-            yield path, path.read_text()
+def _walk_modules(
+    module_files: Iterable[os.DirEntry[str]], profile: Profile | None = None
+) -> Iterator[tuple[Path, bytes]]:
+    return _read_modules((Path(entry.path) for entry in module_files), profile)
+
+
+def _read_modules(
+    module_paths: Iterable[Path], profile: Profile | None = None
+) -> Iterator[tuple[Path, bytes]]:
+    """Return the content of the module files, in the order of the paths.
+
+    The content is not decoded, so the parser detects the encoding
+    (e.g., from a coding comment, see PEP 263). The files are read ahead
+    in a thread pool, which overlaps the I/O latency (e.g., on a network
+    file system) with the parsing of the already read modules. So with a
+    profile only the time waiting for a file is recorded as read time.
+    """
+    # Note: Memory-mapping large files wouldn't save memory,
+    #   since compile() copies sources that are not bytes objects.
+    with ThreadPoolExecutor(max_workers=READ_THREADS) as executor:
+        pending: deque[tuple[Path, Future[bytes]]] = deque()
+        for module_path in module_paths:
+            pending.append((module_path, executor.submit(module_path.read_bytes)))
+            if len(pending) > READ_AHEAD:
+                yield _read_result(*pending.popleft(), profile)
+        for done_path, content in pending:
+            yield _read_result(done_path, content, profile)
+
+
+def _read_result(
+    module_path: Path, content: Future[bytes], profile: Profile | None
+) -> tuple[Path, bytes]:
+    if profile is None:
+        return module_path, content.result()
+    start = time.perf_counter()
+    result = content.result()
+    profile.add_time('read', time.perf_counter() - start, count=1)
+    return module_path, result
@@ -1,19 +1,54 @@
 from __future__ import annotations
 
+import hashlib
+import json
 import logging
-from collections.abc import Sequence
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import Any, get_args
 
 import pytest
 
-from .model import RootNode
-from .parser import build_import_model
-from .query import Predicate, Scope, evaluate_rules
+from .cache import ImportCache
+from .discovery import DEFAULT_EXCLUDE_DIRS
+from .model import DotPath, RootNode
+from .parser import Engine, build_import_model
+from .profile import Profile
+from .query import Rules, Scope, compile_rules, filter_rules_by_changes
 
 log = logging.getLogger(__name__)
 
 INI_NAME = 'imports_project_paths'
+INI_CACHE_VERIFY_HASH = 'imports_cache_verify_hash'
+INI_WORKERS = 'imports_workers'
+INI_PARSER_ENGINE = 'imports_parser_engine'
+INI_LAZY = 'imports_lazy'
+INI_EXCLUDE_DIRS = 'imports_exclude_dirs'
+INI_USE_GITIGNORE = 'imports_use_gitignore'
+PARSER_ENGINES = get_args(Engine)
 PROJECT_CONFIG_FILES = ['pyproject.toml', 'setup.cfg', 'setup.py']
+CACHE_DIR_NAME = 'pytest-imports'
+# Files for sharing the model between pytest-xdist workers.
+WORKERINPUT_SHARED_DIR = 'imports_shared_dir'
+SHARED_MODEL_FILE = 'model.bin'
+SHARED_MODEL_LOCK_FILE = 'model.lock'
+SHARED_MODEL_FAILED_FILE = 'model.failed'
+SHARED_MODEL_POLL_SECONDS = 0.05
+SHARED_MODEL_TIMEOUT_SECONDS = 600
+
+# Models from previous sessions in this process (e.g., in a pytest daemon),
+#   which are updated instead of building a new model.
+_previous_models: dict[tuple[Path, Engine], RootNode] = {}
+
+_profile_key = pytest.StashKey[Profile]()
+_shared_dir_key = pytest.StashKey[Path]()
 
 
 def pytest_addoption(parser: pytest.Parser) -> None:
@@ -23,6 +58,117 @@ def pytest_addoption(parser: pytest.Parser) -> None:
         help='Paths for pytest-imports source code analysis '
         '(relative to rootpath or absolute).',
     )
+    parser.addini(
+        INI_CACHE_VERIFY_HASH,
+        type='bool',
+        default=False,
+        help='Validate cached module imports by content hash '
+        'instead of file modification time and size.',
+    )
+    parser.addini(
+        INI_WORKERS,
+        default='1',
+        help="Number of processes for parsing the modules, or 'auto' "
+        'for one per CPU (default: 1).',
+    )
+    parser.addini(
+        INI_PARSER_ENGINE,
+        default='ast',
+        help="Engine for extracting the imports: 'ast' parses the full "
+        "syntax tree, 'fast' only scans for import statements (default: ast).",
+    )
+    parser.addini(
+        INI_LAZY,
+        type='bool',
+        default=False,
+        help='Parse each module only when a rule first looks at its imports, '
+        'instead of parsing all modules up front.',
+    )
+    parser.addini(
+        INI_EXCLUDE_DIRS,
+        type='linelist',
+        default=list(DEFAULT_EXCLUDE_DIRS),
+        help='Glob patterns for directories that are not searched for modules, '
+        'matching the directory name or (with a /) the path below the project '
+        f'path (default: {" ".join(DEFAULT_EXCLUDE_DIRS)}).',
+    )
+    parser.addini(
+        INI_USE_GITIGNORE,
+        type='bool',
+        default=False,
+        help='Skip directories and modules that are ignored by .gitignore files.',
+    )
+    group = parser.getgroup('imports', 'pytest-imports')
+    group.addoption(
+        '--imports-workers',
+        metavar='N',
+        help=f"Number of processes for parsing the modules, or 'auto' "
+        f'(overrides the {INI_WORKERS} ini option).',
+    )
+    group.addoption(
+        '--imports-no-cache',
+        action='store_true',
+        help='Parse all modules without using or updating the import cache.',
+    )
+    group.addoption(
+        '--imports-cache-clear',
+        action='store_true',
+        help='Remove the import cache before parsing the modules.',
+    )
+    group.addoption(
+        '--imports-changed-since',
+        metavar='REF',
+        help='Only check rules for scopes with modules that changed since '
+        'the git ref (e.g., the target branch of a pull request).',
+    )
+    group.addoption(
+        '--imports-profile',
+        action='store_true',
+        help='Record the time and memory for building the model and checking '
+        'the rules, and show a summary at the end of the session.',
+    )
+    group.addoption(
+        '--imports-profile-json',
+        metavar='PATH',
+        type=Path,
+        help='Write the profile as JSON to the path (implies --imports-profile).',
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    if config.getoption('imports_profile') or config.getoption('imports_profile_json'):
+        config.stash[_profile_key] = Profile()
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_configure_node(node: Any) -> None:
+    """Pass the directory for sharing the model to a pytest-xdist worker.
+
+    The node is an xdist `WorkerController`, xdist is not a dependency.
+    """
+    config: pytest.Config = node.config
+    if (shared_dir := config.stash.get(_shared_dir_key, None)) is None:
+        shared_dir = Path(tempfile.mkdtemp(prefix='pytest-imports-'))
+        config.stash[_shared_dir_key] = shared_dir
+    node.workerinput[WORKERINPUT_SHARED_DIR] = str(shared_dir)
+
+
+def pytest_unconfigure(config: pytest.Config) -> None:
+    if (shared_dir := config.stash.get(_shared_dir_key, None)) is not None:
+        shutil.rmtree(shared_dir, ignore_errors=True)
+
+
+def pytest_terminal_summary(
+    terminalreporter: pytest.TerminalReporter, config: pytest.Config
+) -> None:
+    if (profile := config.stash.get(_profile_key, None)) is None:
+        return
+    terminalreporter.write_sep('-', 'pytest-imports profile')
+    for line in profile.summary_lines():
+        terminalreporter.write_line(line)
+    if json_path := config.getoption('imports_profile_json'):
+        json_path.write_text(json.dumps(profile.to_dict(), indent=2))
+        terminalreporter.write_line(f'profile written to {json_path}')
 
 
 @pytest.fixture(scope='session')
@@ -56,41 +202,288 @@ def imports_project_paths(pytestconfig: pytest.Config) -> Sequence[Path]:
 
 
 @pytest.fixture(scope='session')
-def imports_root_node(imports_project_paths: Sequence[Path]) -> RootNode:
+def imports_root_node(
+    imports_project_paths: Sequence[Path], pytestconfig: pytest.Config
+) -> Iterator[RootNode]:
     """
     Provides the root node of the tree of analyzed Python modules.
 
+    With multiple project paths the trees are built concurrently and then
+    merged into one tree, in the order of the project paths.
+
+    Modules that are unchanged since the last session are loaded from
+    the import cache in the pytest cache directory. If the last session
+    ran in the same process then its model is updated instead.
+
+    With the `imports_lazy` option the modules are only parsed when their
+    imports are first needed, and the cache is saved at the end of the session.
+
+    With pytest-xdist the model is built by the first worker that needs it,
+    and the other workers load it from a file (except in lazy mode).
+
     Normally this isn't used explicitly in tests.
     """
-    if len(imports_project_paths) != 1:
-        raise NotImplementedError()
-    log.info(f'creating architecture model for {imports_project_paths[0]}')
-    return build_import_model(imports_project_paths[0])
+    lazy = pytestconfig.getini(INI_LAZY)
+    caches: list[ImportCache | None] = []
+
+    def build_model() -> RootNode:
+        caches.extend(_import_caches(pytestconfig, imports_project_paths))
+        build_root_node = partial(
+            _build_root_node,
+            workers=_workers(pytestconfig),
+            engine=_parser_engine(pytestconfig),
+            reuse_previous=not pytestconfig.getoption('imports_cache_clear'),
+            profile=pytestconfig.stash.get(_profile_key, None),
+            lazy=lazy,
+            exclude_dirs=pytestconfig.getini(INI_EXCLUDE_DIRS),
+            use_gitignore=pytestconfig.getini(INI_USE_GITIGNORE),
+        )
+        with ThreadPoolExecutor(max_workers=len(imports_project_paths)) as executor:
+            root_nodes = list(
+                executor.map(build_root_node, imports_project_paths, caches)
+            )
+        if len(root_nodes) == 1:
+            return root_nodes[0]
+        return RootNode.merge(root_nodes)
+
+    workerinput = getattr(pytestconfig, 'workerinput', {})
+    if (shared_dir := workerinput.get(WORKERINPUT_SHARED_DIR)) and not lazy:
+        yield _shared_model(Path(shared_dir), build_model)
+    else:
+        yield build_model()
+    if lazy:
+        for cache in caches:
+            if cache is not None:
+                # Note: Modules that were not looked at keep their cache entries.
+                cache.save(prune=False)
+
+
+def _build_root_node(
+    project_path: Path,
+    cache: ImportCache | None,
+    workers: int,
+    engine: Engine,
+    reuse_previous: bool,
+    profile: Profile | None,
+    lazy: bool,
+    exclude_dirs: Sequence[str],
+    use_gitignore: bool,
+) -> RootNode:
+    log.info(f'creating architecture model for {project_path}')
+    model_key = (project_path, engine)
+    previous = None
+    if cache is not None and reuse_previous and not lazy:
+        previous = _previous_models.get(model_key)
+    root_node = build_import_model(
+        project_path,
+        cache=cache,
+        workers=workers,
+        engine=engine,
+        previous=previous,
+        profile=profile,
+        lazy=lazy,
+        exclude_dirs=exclude_dirs,
+        use_gitignore=use_gitignore,
+    )
+    if cache is not None and not lazy:
+        _previous_models[model_key] = root_node
+    return root_node
+
+
+def _shared_model(shared_dir: Path, build_model: Callable[[], RootNode]) -> RootNode:
+    """Build the model in the first process that calls this, and load it
+    from the shared directory in the others.
+
+    If building the model fails, then the other processes build it themselves
+    (and probably fail in the same way, which is then reported for each test).
+    They also build it themselves if it isn't written within the timeout,
+    e.g., when the first process was killed while building it.
+    """
+    model_file = shared_dir / SHARED_MODEL_FILE
+    failed_file = shared_dir / SHARED_MODEL_FAILED_FILE
+    try:
+        lock_fd = os.open(
+            shared_dir / SHARED_MODEL_LOCK_FILE, os.O_CREAT | os.O_EXCL | os.O_WRONLY
+        )
+    except FileExistsError:
+        deadline = time.monotonic() + SHARED_MODEL_TIMEOUT_SECONDS
+        while not model_file.exists():
+            if failed_file.exists():
+                return build_model()
+            if time.monotonic() > deadline:
+                log.warning(
+                    f'Timed out waiting for the architecture model {model_file}'
+                    ' of another worker, building it in this worker.'
+                )
+                return build_model()
+            time.sleep(SHARED_MODEL_POLL_SECONDS)
+        log.info(f'loading architecture model from {model_file}')
+        return RootNode.load(model_file)
+    os.close(lock_fd)
+    try:
+        root_node = build_model()
+        tmp_file = model_file.with_name(model_file.name + '.tmp')
+        root_node.dump(tmp_file)
+        os.replace(tmp_file, model_file)
+    except BaseException:
+        failed_file.touch()
+        raise
+    return root_node
+
+
+def _workers(config: pytest.Config) -> int:
+    value = config.getoption('imports_workers') or config.getini(INI_WORKERS)
+    if value == 'auto':
+        return os.cpu_count() or 1
+    try:
+        workers = int(value)
+    except ValueError:
+        workers = 0
+    if workers < 1:
+        raise pytest.UsageError(
+            f"Invalid number of imports workers {value!r}, expected N >= 1 or 'auto'."
+        )
+    return workers
+
+
+def _import_caches(
+    config: pytest.Config, project_paths: Sequence[Path]
+) -> list[ImportCache | None]:
+    """Return the import cache for each project path."""
+    # Note: the cache attribute is missing if the cacheprovider plugin is disabled.
+    pytest_cache = getattr(config, 'cache', None)
+    if config.getoption('imports_no_cache') or pytest_cache is None:
+        return [None] * len(project_paths)
+    cache_dir = pytest_cache.mkdir(CACHE_DIR_NAME)
+    if config.getoption('imports_cache_clear'):
+        shutil.rmtree(cache_dir)
+        cache_dir.mkdir()
+    caches: list[ImportCache | None] = []
+    for project_path in project_paths:
+        path_digest = hashlib.blake2b(str(project_path).encode(), digest_size=8)
+        caches.append(
+            ImportCache(
+                cache_dir / f'{path_digest.hexdigest()}.json',
+                verify_hash=config.getini(INI_CACHE_VERIFY_HASH),
+            )
+        )
+    return caches
+
+
+def _parser_engine(config: pytest.Config) -> Engine:
+    engine = config.getini(INI_PARSER_ENGINE)
+    if engine not in PARSER_ENGINES:
+        raise pytest.UsageError(
+            f'Invalid {INI_PARSER_ENGINE} {engine!r}, '
+            f'expected one of {", ".join(PARSER_ENGINES)}.'
+        )
+    return engine  # type: ignore[no-any-return]
+
+
+@pytest.fixture(scope='session')
+def imports_changed_paths(
+    imports_project_paths: Sequence[Path], pytestconfig: pytest.Config
+) -> Sequence[DotPath] | None:
+    """
+    Provides the dot paths of the modules that changed since the git ref
+    from the `--imports-changed-since` option, or None without that option.
+
+    This includes modified, added (also untracked) and deleted modules.
+
+    Normally this isn't used explicitly in tests.
+    """
+    if (ref := pytestconfig.getoption('imports_changed_since')) is None:
+        return None
+    return [
+        DotPath.from_path(changed_file)
+        for project_path in imports_project_paths
+        for changed_file in _git_changed_files(project_path, ref)
+        if changed_file.suffix == '.py'
+    ]
+
+
+def _git_changed_files(project_path: Path, ref: str) -> list[Path]:
+    """Return the changed files below the project path, relative to it."""
+    # Note: Without rename detection a moved file shows up as both its old
+    #   and its new path, so the scopes it was moved out of are checked too.
+    git_commands = [
+        ['git', 'diff', '--name-only', '--no-renames', '--relative', '-z', ref, '--'],
+        ['git', 'ls-files', '--others', '--exclude-standard', '-z'],
+    ]
+    changed_files: list[Path] = []
+    for git_command in git_commands:
+        try:
+            result = subprocess.run(
+                git_command,
+                cwd=project_path,
+                capture_output=True,
+                check=True,
+                text=True,
+            )
+        except (OSError, subprocess.CalledProcessError) as e:
+            details = getattr(e, 'stderr', None) or e
+            raise pytest.UsageError(
+                f'Failed to get the files changed since {ref!r} with git: {details}'
+            ) from e
+        changed_files += [Path(name) for name in result.stdout.split('\0') if name]
+    return changed_files
 
 
 class ImportsFixture:
     """Provides architecture rule checking for test assertions."""
 
-    def __init__(self, imports_root_node: RootNode):
+    def __init__(
+        self,
+        imports_root_node: RootNode,
+        changed_paths: Sequence[DotPath] | None = None,
+        profile: Profile | None = None,
+    ):
         self._root_node = imports_root_node
+        self._changed_paths = changed_paths
+        self._profile = profile
 
-    def check(self, rules: dict[str | Scope, Predicate | list[Predicate]]) -> None:
+    def check(self, rules: Rules) -> None:
         """
         Check a set of architecture import rules.
 
         Raises AssertionError listing all violations if any rules fail.
+
+        With the `--imports-changed-since` option, rules for scopes without
+        changed modules are skipped. If all rules are skipped then the test
+        is reported as skipped.
         """
-        failures = evaluate_rules(self._root_node, rules)
+        if self._changed_paths is not None:
+            rules, skipped_keys = filter_rules_by_changes(rules, self._changed_paths)
+            if skipped_keys:
+                skipped_scopes = ', '.join(_scope_label(k) for k in skipped_keys)
+                log.info(f'skipping unchanged scopes {skipped_scopes}')
+                if not rules:
+                    pytest.skip(f'No changed modules in scopes {skipped_scopes}.')
+        failures = compile_rules(rules).evaluate(self._root_node, self._profile)
         if failures:
             raise AssertionError(
                 'Architecture rule violations:\n' + '\n'.join(failures)
             )
 
 
+def _scope_label(scope_key: str | Scope) -> str:
+    if isinstance(scope_key, str):
+        return scope_key
+    return scope_key.path or '<project>'
+
+
 @pytest.fixture
-def imports(imports_root_node: RootNode) -> ImportsFixture:
+def imports(
+    imports_root_node: RootNode,
+    imports_changed_paths: Sequence[DotPath] | None,
+    pytestconfig: pytest.Config,
+) -> ImportsFixture:
     """
     Provides a factory that is used to create the architecture representation
     objects for test assertions.
     """
-    return ImportsFixture(imports_root_node)
+    return ImportsFixture(
+        imports_root_node,
+        imports_changed_paths,
+        pytestconfig.stash.get(_profile_key, None),
+    )
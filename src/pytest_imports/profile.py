@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import heapq
+import sys
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+
+@dataclass
+class PhaseStats:
+    seconds: float = 0.0
+    # Number of processed items (e.g., parsed files), 0 if not applicable.
+    count: int = 0
+    # Growth of the peak resident set size during the phase, None if unknown.
+    peak_rss_bytes: int | None = None
+
+
+class Profile:
+    """Collects timing and memory statistics for the phases of a session.
+
+    Phases are recorded either as a block with `phase`, or by adding up
+    durations with `add_time` (e.g., for parts of a loop). Time for
+    phases running in parallel (e.g., in worker processes) is summed up,
+    so it can exceed the wall time.
+
+    Profiling is optional, so the instrumented code checks for None
+    instead of calling into a disabled profile.
+    """
+
+    def __init__(self, top_n: int = 10):
+        self.top_n = top_n
+        self._phases: dict[str, PhaseStats] = {}
+        self._files: list[tuple[float, Path]] = []
+        self._scopes: list[tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str, count: int = 0) -> Iterator[None]:
+        """Record the wall time and peak memory growth of the block."""
+        with self._lock:
+            # Note: Adding the phase first keeps the phases in order of their start.
+            stats = self._phases.setdefault(name, PhaseStats())
+        rss_before = _peak_rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            rss_after = _peak_rss_bytes()
+            with self._lock:
+                stats.seconds += seconds
+                stats.count += count
+                if rss_before is not None and rss_after is not None:
+                    stats.peak_rss_bytes = (stats.peak_rss_bytes or 0) + (
+                        rss_after - rss_before
+                    )
+
+    def add_time(self, name: str, seconds: float, count: int = 0) -> None:
+        with self._lock:
+            stats = self._phases.setdefault(name, PhaseStats())
+            stats.seconds += seconds
+            stats.count += count
+
+    def add_file(self, file_path: Path, seconds: float) -> None:
+        """Record the parse time of a file (also adds to the parse phase)."""
+        self.add_time('parse', seconds, count=1)
+        with self._lock:
+            self._files.append((seconds, file_path))
+
+    def add_scope(self, scope_label: str, seconds: float) -> None:
+        """Record the evaluation time of the rules for a scope."""
+        with self._lock:
+            self._scopes.append((seconds, scope_label))
+
+    @property
+    def phases(self) -> dict[str, PhaseStats]:
+        return self._phases
+
+    def slowest_files(self) -> list[tuple[float, Path]]:
+        return heapq.nlargest(self.top_n, self._files, key=lambda item: item[0])
+
+    def slowest_scopes(self) -> list[tuple[float, str]]:
+        return heapq.nlargest(self.top_n, self._scopes, key=lambda item: item[0])
+
+    def summary_lines(self) -> list[str]:
+        """Return a human-readable summary."""
+        lines = ['phases:']
+        for name, stats in self._phases.items():
+            line = f'  {name:<10} {stats.seconds:9.3f}s'
+            if stats.count and stats.seconds:
+                line += f' {stats.count:>8} items ({stats.count / stats.seconds:.0f}/s)'
+            if stats.peak_rss_bytes is not None:
+                line += f'  peak RSS +{stats.peak_rss_bytes / 2**20:.1f} MiB'
+            lines.append(line)
+        if slowest_files := self.slowest_files():
+            lines.append(f'slowest files to parse (top {self.top_n}):')
+            lines += [f'  {s:9.3f}s  {path}' for s, path in slowest_files]
+        if slowest_scopes := self.slowest_scopes():
+            lines.append(f'slowest rule scopes (top {self.top_n}):')
+            lines += [f'  {s:9.3f}s  {label}' for s, label in slowest_scopes]
+        return lines
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the statistics as JSON-serializable data."""
+        return {
+            'phases': {
+                name: {
+                    'seconds': stats.seconds,
+                    'count': stats.count,
+                    'peak_rss_bytes': stats.peak_rss_bytes,
+                }
+                for name, stats in self._phases.items()
+            },
+            'slowest_files': [
+                {'seconds': s, 'path': str(path)} for s, path in self.slowest_files()
+            ],
+            'slowest_scopes': [
+                {'seconds': s, 'scope': label} for s, label in self.slowest_scopes()
+            ],
+        }
+
+
+def _peak_rss_bytes() -> int | None:
+    try:
+        import resource
+    except ImportError:  # pragma: no cover (not available on Windows)
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Note: The unit is bytes on macOS and kilobytes elsewhere.
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
@@ -1,10 +1,25 @@
 from __future__ import annotations
 
-from collections.abc import Iterator
+import sys
+import time
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
-from typing import Literal
-
-from .model import DotPath, ImportInModule, ModuleNode, RootNode
+from functools import lru_cache
+from typing import Generic, Literal, TypeVar
+from weakref import WeakKeyDictionary
+
+from .model import (
+    DotPath,
+    ExcludedPaths,
+    FlatTree,
+    ImportIndex,
+    ImportInModule,
+    ModuleNode,
+    NodeRanges,
+    PathPattern,
+    RootNode,
+)
+from .profile import Profile
 
 Via = Literal['absolute', 'relative']
 
@@ -55,6 +70,21 @@ def must_not_import(path: str, *, via: Via | None = None) -> MustNotImport:
     return MustNotImport(path=path, via=via)
 
 
+@dataclass(frozen=True)
+class MayOnlyImport:
+    """Predicate asserting that a scope only imports the given paths
+    (or paths below them), and optionally the standard library."""
+
+    paths: tuple[str, ...]
+    stdlib: bool = False
+
+
+def may_only_import(paths: str | list[str], *, stdlib: bool = False) -> MayOnlyImport:
+    if isinstance(paths, str):
+        paths = [paths]
+    return MayOnlyImport(paths=tuple(paths), stdlib=stdlib)
+
+
 @dataclass(frozen=True)
 class MustNotImportPrivate:
     """Predicate asserting that a scope must not import any private symbol."""
@@ -78,141 +108,734 @@ def must_not_import_within_parent(*, via: Via) -> MustNotImportWithinParent:
     return MustNotImportWithinParent(via=via)
 
 
+@dataclass(frozen=True)
+class MustImportTransitively:
+    """Predicate asserting that a scope must import a given path,
+    either directly or via other modules of the project."""
+
+    path: str
+
+
+def must_import_transitively(path: str) -> MustImportTransitively:
+    _check_no_wildcards(path, 'must_import_transitively')
+    return MustImportTransitively(path=path)
+
+
+@dataclass(frozen=True)
+class MustNotImportTransitively:
+    """Predicate asserting that a scope must not import a given path,
+    neither directly nor via other modules of the project."""
+
+    path: str
+
+
+def must_not_import_transitively(path: str) -> MustNotImportTransitively:
+    _check_no_wildcards(path, 'must_not_import_transitively')
+    return MustNotImportTransitively(path=path)
+
+
+@dataclass(frozen=True)
+class MustNotHaveCycles:
+    """Predicate asserting that the modules in a scope have no import cycles
+    between each other."""
+
+
+def must_not_have_cycles() -> MustNotHaveCycles:
+    return MustNotHaveCycles()
+
+
+@dataclass(frozen=True)
+class Layers:
+    """Predicate asserting that modules in a layer don't import from higher
+    layers. The layers are ordered from the top to the bottom layer."""
+
+    paths: tuple[str, ...]
+
+
+def layers(paths: str | list[str]) -> Layers:
+    if isinstance(paths, str):
+        paths = [paths]
+    for path in paths:
+        _check_no_wildcards(path, 'layers')
+    return Layers(paths=tuple(paths))
+
+
+def _check_no_wildcards(path: str, predicate_name: str) -> None:
+    if PathPattern.is_pattern(path):
+        raise ValueError(f'Wildcards are not supported in {predicate_name}: {path}')
+
+
 Predicate = (
-    MustImport | MustNotImport | MustNotImportPrivate | MustNotImportWithinParent
+    MustImport
+    | MustNotImport
+    | MayOnlyImport
+    | MustNotImportPrivate
+    | MustNotImportWithinParent
+    | MustImportTransitively
+    | MustNotImportTransitively
+    | MustNotHaveCycles
+    | Layers
 )
 
+# Predicates that also depend on the imports of modules outside of the scope.
+_TRANSITIVE_PREDICATES = (MustImportTransitively, MustNotImportTransitively)
 
-def evaluate_rules(
-    root_node: RootNode,
-    rules: dict[str | Scope, Predicate | list[Predicate]],
-) -> list[str]:
-    """Evaluate all rules and return a list of human-readable failure messages."""
-    failures: list[str] = []
+# Scopes with at most this many predicates, all of them `must_import` or
+#   `must_not_import`, look up the imports in the import index instead of
+#   walking the modules (see `benchmark/bench_rules.py`).
+MAX_INDEXED_PREDICATES = 16
+
+
+Rules = dict[str | Scope, Predicate | list[Predicate]]
+
+
+def evaluate_rules(root_node: RootNode, rules: Rules) -> list[str]:
+    """Evaluate all rules and return a list of human-readable failure messages.
+
+    This compiles the rules, see `compile_rules` to evaluate them more than once.
+
+    Cycles are checked between the modules of all scope nodes together
+    (i.e., also between the top-level packages for the project scope),
+    after the other predicates.
+    """
+    return compile_rules(rules).evaluate(root_node)
+
+
+def compile_rules(rules: Rules) -> RulePlan:
+    """Compile the rules into a plan that walks each scope only once."""
+    return RulePlan(
+        [
+            _ScopeRules(
+                _compile_scope(scope_key),
+                _CompiledPredicates(
+                    predicates if isinstance(predicates, list) else [predicates]
+                ),
+            )
+            for scope_key, predicates in rules.items()
+        ]
+    )
+
+
+def filter_rules_by_changes(
+    rules: Rules, changed_paths: Iterable[DotPath]
+) -> tuple[Rules, list[str | Scope]]:
+    """Split off the rules for scopes without any changed module.
+
+    Returns the rules for scopes containing a changed (or deleted) module,
+    and the keys of the other scopes. The result of the rules for the
+    other scopes can't have changed, since the predicates only depend on
+    the imports in the modules of the scope. The exception are transitive
+    predicates, so their scopes are never skipped.
+    """
+    changed_paths = list(changed_paths)
+    changed_rules: Rules = {}
+    skipped_keys: list[str | Scope] = []
     for scope_key, predicates in rules.items():
-        match scope_key:
-            case str():
-                scope_path = scope_key
-                exclude: list[DotPath] = []
-            case Scope(path=scope_path, without=without):
-                exclude = [DotPath(s) for s in without]
+        compiled_scope = _compile_scope(scope_key)
         predicate_list = predicates if isinstance(predicates, list) else [predicates]
+        if any(isinstance(p, _TRANSITIVE_PREDICATES) for p in predicate_list) or any(
+            compiled_scope.contains(path) for path in changed_paths
+        ):
+            changed_rules[scope_key] = predicates
+        else:
+            skipped_keys.append(scope_key)
+    return changed_rules, skipped_keys
+
+
+class RulePlan:
+    """Rules compiled for evaluation with a single walk per scope."""
+
+    def __init__(self, scope_rules: list[_ScopeRules]):
+        self._scope_rules = scope_rules
+        self._uses_index = any(rules.predicates.uses_index for rules in scope_rules)
+
+    def evaluate(
+        self, root_node: RootNode, profile: Profile | None = None
+    ) -> list[str]:
+        """Evaluate the rules and return a list of human-readable failure messages.
+
+        With a profile the evaluation time of each scope is recorded,
+        as well as the total time ('rules').
+
+        If the imports of the tree are loaded lazily then the import index
+        isn't used, so only the modules in the scopes of the rules are loaded.
+        """
+        if profile is not None:
+            with profile.phase('rules'):
+                return self._evaluate(root_node, profile)
+        return self._evaluate(root_node, profile)
+
+    def _evaluate(self, root_node: RootNode, profile: Profile | None) -> list[str]:
+        failures: list[str] = []
+        index = (
+            root_node.import_index()
+            if self._uses_index and root_node.is_loaded()
+            else None
+        )
+        for scope_rules in self._scope_rules:
+            start = time.perf_counter()
+            scope_label = scope_rules.scope.label
+            scope_ranges = scope_rules.scope.select(root_node)
+            for nodes in scope_ranges:
+                failures += scope_rules.predicates.evaluate(
+                    nodes, scope_label, root_node, index
+                )
+            for _ in range(scope_rules.predicates.n_cycle_predicates):
+                failures += _cycle_failures(root_node, scope_ranges, scope_label)
+            if profile is not None:
+                profile.add_scope(scope_label, time.perf_counter() - start)
+        return failures
+
+
+@dataclass(frozen=True)
+class _ScopeRules:
+    scope: _CompiledScope
+    predicates: _CompiledPredicates
+
 
-        if scope_path is None:
-            nodes: list[ModuleNode] = root_node.children()
+class _CompiledScope:
+    """A scope with its excluded paths compiled into a trie.
+
+    Compiled scopes are shared by all rules and `check` calls with the
+    same scope key, see `_compile_scope`. The selected nodes are kept for
+    each flat tree, so a scope is only selected again for a new model.
+    """
+
+    def __init__(self, path: str | None, exclude: list[DotPath]):
+        self.path = path
+        self.label = path or '<project>'
+        self._base_path = _compile_import_path(path) if path is not None else None
+        self._exclude = ExcludedPaths(exclude)
+        self._selections: WeakKeyDictionary[FlatTree, list[NodeRanges]] = (
+            WeakKeyDictionary()
+        )
+
+    def select(self, root_node: RootNode) -> list[NodeRanges]:
+        """Return the nodes of each scope node, without the excluded subtrees."""
+        tree = root_node.flat_tree()
+        if (selection := self._selections.get(tree)) is None:
+            if isinstance(self._base_path, PathPattern):
+                scope_nodes = tree.find(self._base_path)
+                if not scope_nodes:
+                    raise KeyError(f'Found no node for path {self.path} in project.')
+            else:
+                scope_nodes = _scope_nodes(root_node, self.path)
+            selection = self._selections[tree] = [
+                tree.select(node, self._exclude) for node in scope_nodes
+            ]
+        return selection
+
+    def contains(self, path: DotPath) -> bool:
+        """Check if the module path is in the scope, with the same semantics
+        as `ModuleNode.contains` for the scope nodes."""
+        if self._base_path is None:
+            base_depth = 1  # the scope nodes are the top-level nodes
+        elif isinstance(self._base_path, PathPattern):
+            # Note: Nodes below a matching node belong to its scope.
+            if (match_depth := self._base_path.match_depth(path)) is None:
+                return False
+            base_depth = match_depth
+        else:
+            if not path.is_relative_to(self._base_path):
+                return False
+            base_depth = len(self._base_path.parts)
+        return not self._exclude.contains(path.parts[base_depth:])
+
+
+@lru_cache(maxsize=1024)
+def _compile_scope(scope_key: str | Scope) -> _CompiledScope:
+    return _CompiledScope(*_parse_scope_key(scope_key))
+
+
+@lru_cache(maxsize=1024)
+def _compile_import_path(path: str | None) -> DotPath | PathPattern:
+    """Return the path, or the compiled pattern if it contains wildcards.
+
+    Patterns are cached, so their transitions are reused between rules.
+    """
+    if path is not None and PathPattern.is_pattern(path):
+        return PathPattern(path)
+    return DotPath(path)
+
+
+class _CompiledPredicates:
+    """The predicates for a scope, compiled to dispatch each import
+    to all interested predicates at once.
+
+    Predicates with an import path are stored in a trie keyed by the path
+    parts, so the predicates for an import are found by following the
+    parts of the imported path, independent of the number of predicates.
+    Predicates with a path pattern are matched once per imported path.
+
+    A scope with only a few `must_import` and `must_not_import` predicates
+    doesn't walk its modules when there is an import index, but looks up
+    the imports of each path in the index.
+    """
+
+    def __init__(self, predicates: list[Predicate]):
+        self._predicates = predicates
+        # Cycles are checked for all scope nodes together, see `RulePlan._evaluate`.
+        self.n_cycle_predicates = 0
+        self._path_trie: _PathTrie[int] = _PathTrie()
+        self._path_patterns: list[tuple[PathPattern, int]] = []
+        self._must_imports: list[tuple[int, MustImport]] = []
+        self._within_parent: list[tuple[int, MustNotImportWithinParent]] = []
+        self._layers: list[tuple[int, _LayerIndex]] = []
+        self._allowlists: list[tuple[int, _Allowlist]] = []
+        self._transitive: list[
+            tuple[int, MustImportTransitively | MustNotImportTransitively]
+        ] = []
+        self.uses_index = len(predicates) <= MAX_INDEXED_PREDICATES and all(
+            isinstance(predicate, (MustImport, MustNotImport))
+            for predicate in predicates
+        )
+        for position, predicate in enumerate(predicates):
+            match predicate:
+                case MustImport(path=path):
+                    self._add_path(path, position)
+                    self._must_imports.append((position, predicate))
+                case MustNotImport(path=path) | MustNotImportPrivate(path=path):
+                    self._add_path(path, position)
+                case MustNotImportWithinParent():
+                    self._within_parent.append((position, predicate))
+                case MustImportTransitively() | MustNotImportTransitively():
+                    self._transitive.append((position, predicate))
+                case MustNotHaveCycles():
+                    self.n_cycle_predicates += 1
+                case Layers():
+                    self._layers.append((position, _LayerIndex(predicate)))
+                case MayOnlyImport():
+                    self._allowlists.append((position, _compile_allowlist(predicate)))
+
+    def _add_path(self, path: str | None, position: int) -> None:
+        import_path = _compile_import_path(path)
+        if isinstance(import_path, PathPattern):
+            self._path_patterns.append((import_path, position))
         else:
-            node = root_node.get(DotPath(scope_path))
-            if not node:
-                raise KeyError(f'Found no node for path {scope_path} in project.')
-            nodes = [node]
+            self._path_trie.add(import_path, position)
+
+    def evaluate(
+        self,
+        nodes: NodeRanges,
+        scope_label: str,
+        root_node: RootNode,
+        index: ImportIndex | None = None,
+    ) -> list[str]:
+        """Evaluate the predicates for the nodes of a scope.
+
+        The transitive predicates use the module graph of the root node.
+        """
+        if index is not None and self.uses_index:
+            return self._evaluate_with_index(nodes, scope_label, index)
+        predicates = self._predicates
+        failures: list[list[str]] = [[] for _ in predicates]
+        found_positions: set[int] = set()
+        py_modules: list[ModuleNode] = []
+        scope_modules: list[ModuleNode] = []
+        # The same paths are imported in many modules, so the trie lookup
+        # is only done once per path id.
+        matches_by_path_id: dict[int, list[int]] = {}
+        for module_node in nodes:
+            if self._must_imports and not module_node.is_directory:
+                py_modules.append(module_node)
+            if self._transitive:
+                scope_modules.append(module_node)
+            parent = module_node.dot_path.parent
+            # The layer of the module is only looked up once for all imports.
+            # Note: Modules in the top layer (0) or in no layer (-1) can't
+            #   import from a higher layer.
+            module_layers = [
+                (position, layer_index, module_layer)
+                for position, layer_index in self._layers
+                if (module_layer := layer_index.layer(module_node.dot_path)) > 0
+            ]
+            for path_id, line_no, level in module_node.imports.columns():
+                for position, allowlist in self._allowlists:
+                    if not allowlist.allows(path_id):
+                        failures[position].append(
+                            _may_only_import_failure(
+                                scope_label,
+                                allowlist.predicate,
+                                module_node,
+                                DotPath.from_id(path_id),
+                                line_no,
+                            )
+                        )
+                for position, layer_index, module_layer in module_layers:
+                    import_layer = layer_index.layers_by_path_id.get(path_id)
+                    if import_layer is None:
+                        import_layer = layer_index.layer(DotPath.from_id(path_id))
+                    if 0 <= import_layer < module_layer:
+                        failures[position].append(
+                            _layer_failure(
+                                scope_label,
+                                layer_index.layers,
+                                module_layer,
+                                import_layer,
+                                module_node,
+                                line_no,
+                            )
+                        )
+                if (positions := matches_by_path_id.get(path_id)) is None:
+                    positions = matches_by_path_id[path_id] = self._matches(
+                        DotPath.from_id(path_id)
+                    )
+                for position in positions:
+                    match predicates[position]:
+                        case MustImport(via=via):
+                            if _via_matches(via, level):
+                                found_positions.add(position)
+                        case MustNotImport(via=via) as predicate:
+                            if _via_matches(via, level):
+                                failures[position].append(
+                                    _must_not_import_failure(
+                                        scope_label, predicate, module_node, line_no
+                                    )
+                                )
+                        case MustNotImportPrivate() as predicate:
+                            if _is_private_path(DotPath.from_id(path_id)):
+                                failures[position].append(
+                                    _private_import_failure(
+                                        scope_label, predicate, module_node, line_no
+                                    )
+                                )
+                if not parent.parts or not self._within_parent:
+                    continue  # top-level modules have no parent package to check
+                import_path = DotPath.from_id(path_id)
+                for position, within_parent in self._within_parent:
+                    if import_path.is_relative_to(parent) and (
+                        within_parent.via == 'absolute'
+                    ) != bool(level):
+                        failures[position].append(
+                            _within_parent_failure(
+                                scope_label, within_parent, module_node, line_no
+                            )
+                        )
+        for position, must_import in self._must_imports:
+            if position not in found_positions:
+                failures[position] = [
+                    _must_import_failure(scope_label, must_import, module_node)
+                    for module_node in py_modules
+                ]
+        for position, transitive in self._transitive:
+            failures[position] = _transitive_failures(
+                root_node, scope_modules, transitive, scope_label
+            )
+        return [failure for bucket in failures for failure in bucket]
+
+    def _evaluate_with_index(
+        self, nodes: NodeRanges, scope_label: str, index: ImportIndex
+    ) -> list[str]:
+        failures: list[str] = []
+        for predicate in self._predicates:
+            match predicate:
+                case MustImport(path=path, via=via):
+                    matches = _find_matching_imports(
+                        nodes, _compile_import_path(path), via, index
+                    )
+                    if next(matches, None) is None:
+                        failures += [
+                            _must_import_failure(scope_label, predicate, module_node)
+                            for module_node in nodes
+                            if not module_node.is_directory
+                        ]
+                case MustNotImport(path=path, via=via):
+                    failures += [
+                        _must_not_import_failure(
+                            scope_label, predicate, module_node, import_by.line_no
+                        )
+                        for module_node, import_by in _find_matching_imports(
+                            nodes, _compile_import_path(path), via, index
+                        )
+                    ]
+        return failures
+
+    def _matches(self, import_path: DotPath) -> list[int]:
+        """Return the positions of the predicates with a path matching the import."""
+        positions = list(self._path_trie.matches(import_path))
+        for pattern, position in self._path_patterns:
+            if pattern.match_depth(import_path) is not None:
+                positions.append(position)
+        return positions
 
-        scope_label = scope_path or '<project>'
 
-        for node in nodes:
-            for predicate in predicate_list:
-                _evaluate_predicate(node, exclude, predicate, scope_label, failures)
+class _LayerIndex:
+    """Finds the layer of a path, for a `Layers` predicate.
 
-    return failures
+    The layers are stored in a path trie, and the layer of each path
+    is cached by the path id.
+    """
 
+    def __init__(self, layers: Layers):
+        self.layers = layers
+        self._path_trie: _PathTrie[int] = _PathTrie()
+        for layer, path in enumerate(layers.paths):
+            self._path_trie.add(DotPath(path), layer)
+        self.layers_by_path_id: dict[int, int] = {}
+
+    def layer(self, path: DotPath) -> int:
+        """Return the index of the most specific layer containing the path,
+        or -1 if the path is in no layer."""
+        if (layer := self.layers_by_path_id.get(path.id)) is None:
+            layer = self.layers_by_path_id[path.id] = [
+                -1,
+                *self._path_trie.matches(path),
+            ][-1]
+        return layer
+
+
+class _Allowlist:
+    """Classifies imports as allowed or not, for a `MayOnlyImport` predicate.
+
+    The allowed paths (and the top-level modules of the standard library)
+    are stored in a path trie, so each import is classified with a single
+    lookup, and the result is cached by the path id.
+    """
 
-def _evaluate_predicate(
-    node: ModuleNode,
-    exclude: list[DotPath],
-    predicate: Predicate,
+    def __init__(self, predicate: MayOnlyImport):
+        self.predicate = predicate
+        self._path_trie: _PathTrie[bool] = _PathTrie()
+        self._path_patterns: list[PathPattern] = []
+        for path in predicate.paths:
+            allowed_path = _compile_import_path(path)
+            if isinstance(allowed_path, PathPattern):
+                self._path_patterns.append(allowed_path)
+            else:
+                self._path_trie.add(allowed_path, True)
+        if predicate.stdlib:
+            for name in sys.stdlib_module_names:
+                self._path_trie.add(DotPath(name), True)
+        self._allowed_by_path_id: dict[int, bool] = {}
+
+    def allows(self, path_id: int) -> bool:
+        """Check if the import of the path (given by its id) is allowed."""
+        if (allowed := self._allowed_by_path_id.get(path_id)) is None:
+            path = DotPath.from_id(path_id)
+            allowed = self._allowed_by_path_id[path_id] = any(
+                self._path_trie.matches(path)
+            ) or any(
+                pattern.match_depth(path) is not None for pattern in self._path_patterns
+            )
+        return allowed
+
+
+@lru_cache(maxsize=256)
+def _compile_allowlist(predicate: MayOnlyImport) -> _Allowlist:
+    """Return the allowlist for the predicate, which is shared by all scopes
+    and `check` calls (path ids are valid for the lifetime of the process)."""
+    return _Allowlist(predicate)
+
+
+T = TypeVar('T')
+
+
+class _PathTrie(Generic[T]):
+    """Trie for finding all values stored for a path or any of its parents."""
+
+    __slots__ = ('_children', '_values')
+
+    def __init__(self) -> None:
+        self._children: dict[str, _PathTrie[T]] = {}
+        self._values: list[T] = []
+
+    def add(self, path: DotPath, value: T) -> None:
+        trie = self
+        for part in path.parts:
+            if (child := trie._children.get(part)) is None:
+                child = trie._children[part] = _PathTrie()
+            trie = child
+        trie._values.append(value)
+
+    def matches(self, path: DotPath) -> Iterator[T]:
+        """Return the values for all paths that the given path is relative to."""
+        trie = self
+        yield from trie._values
+        for part in path.parts:
+            if (child := trie._children.get(part)) is None:
+                return
+            trie = child
+            yield from trie._values
+
+
+def _parse_scope_key(scope_key: str | Scope) -> tuple[str | None, list[DotPath]]:
+    match scope_key:
+        case str():
+            return scope_key, []
+        case Scope(path=scope_path, without=without):
+            return scope_path, [DotPath(s) for s in without]
+
+
+def _scope_nodes(root_node: RootNode, scope_path: str | None) -> list[ModuleNode]:
+    if scope_path is None:
+        return root_node.children()
+    node = root_node.get(DotPath(scope_path))
+    if not node:
+        raise KeyError(f'Found no node for path {scope_path} in project.')
+    return [node]
+
+
+def _transitive_failures(
+    root_node: RootNode,
+    scope_modules: list[ModuleNode],
+    predicate: MustImportTransitively | MustNotImportTransitively,
     scope_label: str,
-    failures: list[str],
-) -> None:
+) -> list[str]:
+    chains = root_node.module_graph().find_import_chains(
+        scope_modules, DotPath(predicate.path)
+    )
     match predicate:
-        case MustImport():
-            import_path = DotPath(predicate.path)
-            if not any(
-                _find_matching_imports(node, exclude, import_path, predicate.via)
-            ):
-                for module_node in node.walk(exclude=exclude):
-                    if module_node.file_path.suffix == '.py':
-                        failures.append(
-                            f'  [scope {scope_label}] must import {predicate.path}'
-                            f' — no matching import in {module_node.file_path}'
-                        )
-        case MustNotImport():
-            import_path = DotPath(predicate.path)
-            for module_node, import_by in _find_matching_imports(
-                node, exclude, import_path, predicate.via
-            ):
-                failures.append(
-                    f'  [scope {scope_label}] must not import {predicate.path}'
-                    f' — found in {module_node.file_path}:{import_by.line_no}'
-                )
-        case MustNotImportPrivate():
-            for module_node, import_by in _find_matching_private_imports(
-                node, exclude, predicate.path
-            ):
-                failures.append(
-                    f'  [scope {scope_label}] must not import private symbols'
-                    + (f' from {predicate.path}' if predicate.path else '')
-                    + f' — found in {module_node.file_path}:{import_by.line_no}'
-                )
-        case MustNotImportWithinParent():
-            for module_node, import_by in _find_within_parent_imports(
-                node, exclude, predicate.via
-            ):
-                failures.append(
-                    f'  [scope {scope_label}] must not use {predicate.via} import'
-                    f' within parent package'
-                    f' — found in {module_node.file_path}:{import_by.line_no}'
-                )
+        case MustImportTransitively():
+            if next(chains, None) is not None:
+                return []
+            return [
+                f'  [scope {scope_label}] must import {predicate.path} transitively'
+                f' — no matching import chain from {module_node.file_path}'
+                for module_node in scope_modules
+                if not module_node.is_directory
+            ]
+        case MustNotImportTransitively():
+            return [
+                f'  [scope {scope_label}] must not import {predicate.path}'
+                f' transitively — found chain {_format_chain(chain)}'
+                for chain in chains
+            ]
+
+
+def _layer_failure(
+    scope_label: str,
+    predicate: Layers,
+    module_layer: int,
+    import_layer: int,
+    module_node: ModuleNode,
+    line_no: int,
+) -> str:
+    return (
+        f'  [scope {scope_label}] layer {predicate.paths[module_layer]}'
+        f' must not import higher layer {predicate.paths[import_layer]}'
+        f' — found in {module_node.file_path}:{line_no}'
+    )
+
+
+def _cycle_failures(
+    root_node: RootNode, scope_ranges: list[NodeRanges], scope_label: str
+) -> list[str]:
+    module_nodes = [module_node for nodes in scope_ranges for module_node in nodes]
+    return [
+        f'  [scope {scope_label}] must not have cycles'
+        f' — found cycle {_format_chain(cycle, cycle[0][0].dot_path)}'
+        for cycle in root_node.module_graph().find_cycles(module_nodes)
+    ]
+
+
+def _format_chain(
+    chain: list[tuple[ModuleNode, ImportInModule]], end: DotPath | None = None
+) -> str:
+    """Format an import chain, which ends with the last imported path
+    (or with another end, e.g., the first module for a cycle)."""
+    hops = [
+        f'{module_node.dot_path} ({module_node.file_path}:{import_by.line_no})'
+        for module_node, import_by in chain
+    ]
+    return ' -> '.join([*hops, str(end or chain[-1][1].import_path)])
+
+
+def _must_import_failure(
+    scope_label: str, predicate: MustImport, module_node: ModuleNode
+) -> str:
+    return (
+        f'  [scope {scope_label}] must import {predicate.path}'
+        f' — no matching import in {module_node.file_path}'
+    )
+
+
+def _must_not_import_failure(
+    scope_label: str,
+    predicate: MustNotImport,
+    module_node: ModuleNode,
+    line_no: int,
+) -> str:
+    return (
+        f'  [scope {scope_label}] must not import {predicate.path}'
+        f' — found in {module_node.file_path}:{line_no}'
+    )
 
 
-def _find_matching_imports(
-    base_node: ModuleNode,
-    exclude: list[DotPath],
+def _may_only_import_failure(
+    scope_label: str,
+    predicate: MayOnlyImport,
+    module_node: ModuleNode,
     import_path: DotPath,
+    line_no: int,
+) -> str:
+    allowed = ', '.join([*predicate.paths, *(['<stdlib>'] if predicate.stdlib else [])])
+    return (
+        f'  [scope {scope_label}] may only import {allowed}'
+        f' — found import of {import_path} in {module_node.file_path}:{line_no}'
+    )
+
+
+def _private_import_failure(
+    scope_label: str,
+    predicate: MustNotImportPrivate,
+    module_node: ModuleNode,
+    line_no: int,
+) -> str:
+    return (
+        f'  [scope {scope_label}] must not import private symbols'
+        + (f' from {predicate.path}' if predicate.path else '')
+        + f' — found in {module_node.file_path}:{line_no}'
+    )
+
+
+def _within_parent_failure(
+    scope_label: str,
+    predicate: MustNotImportWithinParent,
+    module_node: ModuleNode,
+    line_no: int,
+) -> str:
+    return (
+        f'  [scope {scope_label}] must not use {predicate.via} import'
+        f' within parent package'
+        f' — found in {module_node.file_path}:{line_no}'
+    )
+
+
+def _find_matching_imports(
+    nodes: NodeRanges,
+    import_path: DotPath | PathPattern,
     via: Via | None,
+    index: ImportIndex,
 ) -> Iterator[tuple[ModuleNode, ImportInModule]]:
+    """Find the imports of the import path (or pattern) in the scope.
+
+    Only the matching imports in the index of the tree are looked at,
+    instead of walking all modules in the scope.
+    """
     absolute = _via_to_absolute(via)
-    for module_node in base_node.walk(exclude=exclude):
-        for import_by in module_node.imports:
-            if import_by.import_path.is_relative_to(import_path) and (
-                absolute is None or absolute != bool(import_by.level)
-            ):
-                yield module_node, import_by
-
-
-def _find_within_parent_imports(
-    base_node: ModuleNode,
-    exclude: list[DotPath],
-    via: Via,
-) -> Iterator[tuple[ModuleNode, ImportInModule]]:
-    absolute = via == 'absolute'
-    for module_node in base_node.walk(exclude=exclude):
-        parent = module_node.dot_path.parent
-        if not parent.parts:
-            continue  # top-level modules have no parent package to check
-        for import_by in module_node.imports:
-            if import_by.import_path.is_relative_to(parent) and absolute != bool(
-                import_by.level
-            ):
-                yield module_node, import_by
-
-
-def _find_matching_private_imports(
-    base_node: ModuleNode,
-    exclude: list[DotPath],
-    path: str | None,
-) -> Iterator[tuple[ModuleNode, ImportInModule]]:
-    filter_path = DotPath(path) if path else None
-    for module_node in base_node.walk(exclude=exclude):
-        for import_by in module_node.imports:
-            if filter_path and not import_by.import_path.is_relative_to(filter_path):
-                continue
-            if any(_is_private_name(p) for p in import_by.import_path.parts):
-                yield module_node, import_by
+    for module_node, import_by in (
+        index.find_pattern(import_path)
+        if isinstance(import_path, PathPattern)
+        else index.find(import_path)
+    ):
+        if module_node in nodes and (
+            absolute is None or absolute != bool(import_by.level)
+        ):
+            yield module_node, import_by
+
+
+def _is_private_path(path: DotPath) -> bool:
+    return any(_is_private_name(p) for p in path.parts)
 
 
 def _is_private_name(name: str) -> bool:
     return name.startswith('_') and name != '__future__'
 
 
+def _via_matches(via: Via | None, level: int) -> bool:
+    absolute = _via_to_absolute(via)
+    return absolute is None or absolute != bool(level)
+
+
 def _via_to_absolute(via: Via | None) -> bool | None:
     if via == 'absolute':
         return True
@@ -0,0 +1,245 @@
+"""Fast extraction of import statements without building a syntax tree.
+
+The scanner only looks at the source bytes. String literals and comments
+are skipped with a regular expression, and the import statements are then
+read with a minimal tokenizer. Whenever the source uses a construct the
+scanner doesn't support (e.g., `if x: import y`) it raises `AmbiguousSource`,
+so that the caller can fall back to a full parse.
+"""
+
+from __future__ import annotations
+
+import codecs
+import io
+import re
+import tokenize
+import unicodedata
+from typing import NamedTuple
+
+
+class ScannedImport(NamedTuple):
+    """An imported name, as it is written in the import statement."""
+
+    # The module in `from module import name`, which is an empty string
+    # for `from . import name`. None for plain `import name` statements.
+    module: str | None
+    name: str
+    line_no: int
+    level: int = 0
+
+
+class AmbiguousSource(Exception):
+    """The imports in the source can't be extracted reliably by the scanner."""
+
+
+_NAME_CHARS = rb'\w\x80-\xff'
+
+_SCAN_RE = re.compile(
+    rb"""
+    '''(?:\\.|[^\\])*?'''
+    | \"\"\"(?:\\.|[^\\])*?\"\"\"
+    | '(?:\\.|[^\\'\r\n])*'
+    | "(?:\\.|[^\\"\r\n])*"
+    | \#[^\r\n]*
+    | (?<![%(name)s])(?P<keyword>import|from)(?![%(name)s])
+    """
+    % {b'name': _NAME_CHARS},
+    re.VERBOSE | re.DOTALL,
+)
+
+_TOKEN_RE = re.compile(
+    rb"""
+    (?:[ \t\f]|\\\r?\n)*
+    (?:
+        (?P<name>(?![0-9])[%(name)s]+)
+        | (?P<op>[.,()*;])
+        | (?P<newline>(?:\#[^\r\n]*)?(?:\r?\n|\Z))
+        | (?P<other>.)
+    )
+    """
+    % {b'name': _NAME_CHARS},
+    re.VERBOSE | re.DOTALL,
+)
+
+_LINE_START_RE = re.compile(rb'(?:^|(?<![\\\r])\r?\n)[ \t\f]*\Z')
+
+
+def scan_imports(source: str | bytes) -> list[ScannedImport]:
+    """Return the imports in the source, in the order of their appearance.
+
+    Raises AmbiguousSource if the imports can't be extracted reliably.
+    """
+    if isinstance(source, str):
+        source_bytes = source.encode()
+        encoding = 'utf-8'
+    else:
+        encoding = _detect_encoding(source)
+        source_bytes = source.removeprefix(codecs.BOM_UTF8)
+    if b'import' not in source_bytes:
+        return []
+    if source_bytes.count(b'\r') != source_bytes.count(b'\r\n'):
+        raise AmbiguousSource('Source contains carriage returns as line breaks.')
+    return _Scanner(source_bytes, encoding).scan()
+
+
+def _detect_encoding(source: bytes) -> str:
+    try:
+        encoding, _ = tokenize.detect_encoding(io.BytesIO(source).readline)
+    except SyntaxError as e:
+        raise AmbiguousSource(str(e)) from e
+    return encoding
+
+
+class _Scanner:
+    def __init__(self, source: bytes, encoding: str):
+        self._source = source
+        self._encoding = encoding
+        self._pos = 0
+        self._line_pos = 0
+        self._line_no = 1
+        self._imports: list[ScannedImport] = []
+
+    def scan(self) -> list[ScannedImport]:
+        statement_end = 0
+        semicolon_end = -1
+        for match in _SCAN_RE.finditer(self._source):
+            keyword = match.group('keyword')
+            if keyword is None or match.start() < statement_end:
+                continue
+            if not (
+                self._at_line_start(match.start())
+                or self._after_semicolon(semicolon_end, match.start())
+            ):
+                if keyword == b'import':
+                    raise AmbiguousSource('Import statement in unsupported position.')
+                continue  # e.g., `yield from` or `raise ... from`
+            self._pos = match.end()
+            if keyword == b'import':
+                self._scan_import()
+            else:
+                self._scan_from_import()
+            statement_end = self._pos
+            semicolon_end = self._pos if self._source[self._pos - 1] == ord(';') else -1
+        return self._imports
+
+    def _at_line_start(self, pos: int) -> bool:
+        line_start = self._source.rfind(b'\n', 0, pos) + 1
+        prefix = self._source[max(line_start - 3, 0) : pos]
+        return _LINE_START_RE.search(prefix) is not None
+
+    def _after_semicolon(self, semicolon_end: int, pos: int) -> bool:
+        return semicolon_end >= 0 and not self._source[semicolon_end:pos].strip()
+
+    def _scan_import(self) -> None:
+        while True:
+            line_no, name = self._dotted_name()
+            self._imports.append(ScannedImport(None, name, line_no))
+            if self._optional_alias() != ',':
+                break
+
+    def _scan_from_import(self) -> None:
+        level = 0
+        kind, value, _ = self._next_token()
+        while value == '.':
+            level += 1
+            kind, value, _ = self._next_token()
+        module = ''
+        if kind == 'name' and value != 'import':
+            module = self._dotted_name(first=value)[1]
+            kind, value, _ = self._next_token()
+        if value != 'import' or (level == 0 and not module):
+            raise AmbiguousSource('Incomplete from-import statement.')
+        kind, value, line_no = self._next_token()
+        if value == '*':
+            self._imports.append(ScannedImport(module, '*', line_no, level))
+            self._expect_end(*self._next_token()[:2])
+            return
+        in_parens = value == '('
+        if in_parens:
+            kind, value, line_no = self._next_token(in_parens)
+        while True:
+            if kind != 'name':
+                raise AmbiguousSource('Expected imported name.')
+            self._imports.append(ScannedImport(module, value, line_no, level))
+            kind, value, _ = self._next_token(in_parens)
+            if value == 'as':
+                self._name(in_parens)
+                kind, value, _ = self._next_token(in_parens)
+            if value != ',':
+                break
+            kind, value, line_no = self._next_token(in_parens)
+            if in_parens and value == ')':
+                break
+        if in_parens:
+            if value != ')':
+                raise AmbiguousSource('Expected closing parenthesis.')
+            kind, value, _ = self._next_token()
+        self._expect_end(kind, value)
+
+    def _dotted_name(self, first: str | None = None) -> tuple[int, str]:
+        """Read a dotted name and return its line number and value."""
+        if first is None:
+            line_no, first = self._name_with_line()
+        else:
+            line_no = self._line_no
+        parts = [first]
+        while self._peek_op() == '.':
+            self._next_token()
+            parts.append(self._name())
+        return line_no, '.'.join(parts)
+
+    def _optional_alias(self) -> str | None:
+        """Read an optional `as` clause and return the following operator."""
+        kind, value, _ = self._next_token()
+        if value == 'as':
+            self._name()
+            kind, value, _ = self._next_token()
+        if value == ',':
+            return value
+        self._expect_end(kind, value)
+        return None
+
+    def _expect_end(self, kind: str, value: str) -> None:
+        if kind != 'newline' and value != ';':
+            raise AmbiguousSource('Expected end of import statement.')
+
+    def _name(self, in_parens: bool = False) -> str:
+        return self._name_with_line(in_parens)[1]
+
+    def _name_with_line(self, in_parens: bool = False) -> tuple[int, str]:
+        kind, value, line_no = self._next_token(in_parens)
+        if kind != 'name':
+            raise AmbiguousSource('Expected name.')
+        return line_no, value
+
+    def _peek_op(self) -> str | None:
+        match = _TOKEN_RE.match(self._source, self._pos)
+        assert match is not None
+        op = match.group('op')
+        return op.decode() if op is not None else None
+
+    def _next_token(self, in_parens: bool = False) -> tuple[str, str, int]:
+        """Return kind, value and line number of the next token."""
+        while True:
+            match = _TOKEN_RE.match(self._source, self._pos)
+            assert match is not None
+            self._pos = match.end()
+            kind = match.lastgroup
+            assert kind is not None
+            start = match.start(kind)
+            if kind == 'newline' and in_parens:
+                if start == len(self._source):
+                    raise AmbiguousSource('Unexpected end of source.')
+                continue
+            break
+        if kind == 'other':
+            raise AmbiguousSource('Unexpected character in import statement.')
+        value = match.group(kind).decode(self._encoding)
+        if kind == 'name' and not value.isascii():
+            value = unicodedata.normalize('NFKC', value)
+        return kind, value, self._line_at(start)
+
+    def _line_at(self, pos: int) -> int:
+        self._line_no += self._source.count(b'\n', self._line_pos, pos)
+        self._line_pos = pos
+        return self._line_no
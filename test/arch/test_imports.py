@@ -1,7 +1,10 @@
 from pytest_imports import (
+    layers,
     must_import,
+    must_not_have_cycles,
     must_not_import,
     must_not_import_private,
+    must_not_import_transitively,
     must_not_import_within_parent,
     project,
     scope,
@@ -23,6 +26,42 @@ def test_internal_dependencies(imports):
     )
 
 
+def test_transitive_dependencies(imports):
+    imports.check(
+        {
+            scope('pytest_imports', without='plugin'): must_not_import_transitively(
+                'pytest'
+            ),
+            'pytest_imports.graph': must_not_import_transitively('pytest_imports'),
+        }
+    )
+
+
+def test_layers(imports):
+    imports.check(
+        {
+            project(): layers(
+                [
+                    'pytest_imports.plugin',
+                    'pytest_imports.parser',
+                    'pytest_imports.query',
+                    'pytest_imports.cache',
+                    'pytest_imports.model',
+                    'pytest_imports.graph',
+                ]
+            ),
+        }
+    )
+
+
+def test_no_import_cycles(imports):
+    imports.check(
+        {
+            project(): must_not_have_cycles(),
+        }
+    )
+
+
 def test_all_internal_imports_must_be_relative(imports):
     imports.check(
         {
@@ -10,3 +10,208 @@ def test_simple_project(pytester):
     """)
     result = pytester.runpytest()
     result.assert_outcomes(passed=1)
+
+
+def test_transitive_imports(pytester):
+    pytester.makepyfile(foo='import bar', bar='from baz import qux')
+    pytester.makepyfile("""
+        from pytest_imports import (
+            must_import_transitively,
+            must_not_import_transitively,
+        )
+
+        def test_arch(imports):
+            imports.check({'foo': must_import_transitively('baz.qux')})
+
+        def test_arch_fails(imports):
+            imports.check({'foo': must_not_import_transitively('baz')})
+    """)
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=1, failed=1)
+    result.stdout.fnmatch_lines(
+        ['*must not import baz transitively — found chain foo (*foo.py:1) -> bar*']
+    )
+
+
+def test_import_cycles(pytester):
+    pytester.makepyfile(foo='import bar', bar='from foo import baz')
+    pytester.makepyfile("""
+        from pytest_imports import must_not_have_cycles, project
+
+        def test_arch(imports):
+            imports.check({project(): must_not_have_cycles()})
+    """)
+    result = pytester.runpytest()
+    result.assert_outcomes(failed=1)
+    result.stdout.fnmatch_lines(
+        ['*must not have cycles — found cycle bar (*bar.py:1) -> foo (*foo.py:1) -> *']
+    )
+
+
+def test_layers(pytester):
+    pytester.makepyfile(api='import service', service='import db', db='import api')
+    pytester.makepyfile("""
+        from pytest_imports import layers, project
+
+        def test_arch(imports):
+            imports.check({project(): layers(['api', 'service', 'db'])})
+    """)
+    result = pytester.runpytest()
+    result.assert_outcomes(failed=1)
+    result.stdout.fnmatch_lines(
+        ['*layer db must not import higher layer api — found in *db.py:1']
+    )
+
+
+def test_may_only_import(pytester):
+    pytester.makepyfile(
+        **{
+            'domain/__init__': '',
+            'domain/model': 'import dataclasses\nimport requests',
+        }
+    )
+    pytester.makepyfile("""
+        from pytest_imports import may_only_import
+
+        def test_arch(imports):
+            imports.check({'domain': may_only_import(['domain'], stdlib=True)})
+    """)
+    result = pytester.runpytest()
+    result.assert_outcomes(failed=1)
+    result.stdout.fnmatch_lines(
+        ['*may only import domain, <stdlib> — found import of requests in *model.py:2']
+    )
+
+
+def test_wildcards(pytester):
+    pytester.makepyfile(
+        **{
+            'app/__init__': '',
+            'app/a/__init__': '',
+            'app/a/adapters': 'import app.b.internal',
+            'app/b/__init__': '',
+            'app/b/adapters': 'import app.a.adapters',
+            'app/b/internal': '',
+        }
+    )
+    pytester.makepyfile("""
+        from pytest_imports import must_not_import
+
+        def test_arch(imports):
+            imports.check({'app.*.adapters': must_not_import('app.*.internal')})
+    """)
+    result = pytester.runpytest()
+    result.assert_outcomes(failed=1)
+    result.stdout.fnmatch_lines(
+        ['*must not import app.*.internal — found in *a?adapters.py:1']
+    )
+    result.stdout.no_fnmatch_line('*b?adapters.py*')
+
+
+def test_parallel_parsing(pytester):
+    pytester.makepyfile(foobar='from foo import bar', foobaz='import foo.baz')
+    pytester.makepyfile("""
+        from pytest_imports import must_import
+
+        def test_arch(imports):
+            imports.check({
+                'foobar': must_import('foo.bar'),
+                'foobaz': must_import('foo.baz'),
+            })
+    """)
+    result = pytester.runpytest('--imports-workers=2', '--imports-no-cache')
+    result.assert_outcomes(passed=1)
+
+
+def test_parallel_parsing_auto_from_ini(pytester):
+    pytester.makeini("""
+        [pytest]
+        imports_workers = auto
+    """)
+    pytester.makepyfile(foobar='from foo import bar')
+    pytester.makepyfile("""
+        from pytest_imports import must_import
+
+        def test_arch(imports):
+            imports.check({'foobar': must_import('foo.bar')})
+    """)
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=1)
+
+
+def test_parallel_parsing_invalid_workers(pytester):
+    pytester.makepyfile('def test_arch(imports): pass')
+    result = pytester.runpytest('--imports-workers=zero')
+    result.assert_outcomes(errors=1)
+    result.stdout.fnmatch_lines(['*Invalid number of imports workers*'])
+
+
+def test_fast_parser_engine(pytester):
+    pytester.makeini("""
+        [pytest]
+        imports_parser_engine = fast
+    """)
+    pytester.makepyfile(foobar='from foo import bar\nif bar: import baz')
+    pytester.makepyfile("""
+        from pytest_imports import must_import
+
+        def test_arch(imports):
+            imports.check({'foobar': [must_import('foo.bar'), must_import('baz')]})
+    """)
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=1)
+
+
+def test_invalid_parser_engine(pytester):
+    pytester.makeini("""
+        [pytest]
+        imports_parser_engine = slow
+    """)
+    pytester.makepyfile('def test_arch(imports): pass')
+    result = pytester.runpytest()
+    result.assert_outcomes(errors=1)
+    result.stdout.fnmatch_lines(['*Invalid imports_parser_engine*'])
+
+
+def test_multiple_project_paths(pytester):
+    pytester.makeini("""
+        [pytest]
+        imports_project_paths =
+            src
+            plugins
+    """)
+    (pytester.path / 'src' / 'app').mkdir(parents=True)
+    (pytester.path / 'src' / 'app' / 'core.py').write_text('import ext')
+    (pytester.path / 'plugins' / 'ext').mkdir(parents=True)
+    (pytester.path / 'plugins' / 'ext' / 'hook.py').write_text('from app import core')
+    pytester.makepyfile("""
+        from pytest_imports import must_import, must_not_import
+
+        def test_arch(imports):
+            imports.check({
+                'app.core': must_import('ext'),
+                'ext': [must_import('app.core'), must_not_import('ext')],
+            })
+    """)
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=1)
+
+
+def test_multiple_project_paths_conflict(pytester):
+    pytester.makeini("""
+        [pytest]
+        imports_project_paths =
+            src
+            plugins
+    """)
+    (pytester.path / 'src' / 'app').mkdir(parents=True)
+    (pytester.path / 'plugins' / 'app').mkdir(parents=True)
+    (pytester.path / 'src' / 'app' / 'a.py').write_text('')
+    (pytester.path / 'plugins' / 'app' / 'b.py').write_text('')
+    pytester.makepyfile("""
+        def test_arch(imports):
+            pass
+    """)
+    result = pytester.runpytest()
+    result.assert_outcomes(errors=1)
+    result.stdout.fnmatch_lines(["*Conflicting top-level name 'app'*"])
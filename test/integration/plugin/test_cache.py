@@ -0,0 +1,77 @@
+import pytest
+
+ARCH_TEST = """
+    from pytest_imports import must_import
+
+    def test_arch(imports):
+        imports.check({'foo': must_import('bar')})
+"""
+
+
+@pytest.fixture
+def cache_dir(pytester):
+    pytester.makepyprojecttoml('')
+    pytester.makepyfile(foo='import bar')
+    pytester.makepyfile(test_arch=ARCH_TEST)
+    return pytester.path / '.pytest_cache' / 'd' / 'pytest-imports'
+
+
+def test_cache_is_created_and_used(pytester, cache_dir):
+    pytester.runpytest().assert_outcomes(passed=1)
+    assert len(list(cache_dir.glob('*.json'))) == 1
+    pytester.runpytest().assert_outcomes(passed=1)
+    (pytester.path / 'foo.py').write_text('import baz')
+    pytester.runpytest().assert_outcomes(failed=1)
+
+
+def test_no_cache(pytester, cache_dir):
+    pytester.runpytest('--imports-no-cache').assert_outcomes(passed=1)
+    assert not cache_dir.exists()
+
+
+def test_no_cacheprovider(pytester, cache_dir):
+    pytester.runpytest('-p', 'no:cacheprovider').assert_outcomes(passed=1)
+    assert not cache_dir.exists()
+
+
+def test_cache_clear(pytester, cache_dir):
+    pytester.runpytest().assert_outcomes(passed=1)
+    stale_file = cache_dir / 'stale.json'
+    stale_file.write_text('')
+    pytester.runpytest('--imports-cache-clear').assert_outcomes(passed=1)
+    assert not stale_file.exists()
+    assert len(list(cache_dir.glob('*.json'))) == 1
+
+
+def test_cache_verify_hash(pytester, cache_dir):
+    pytester.makeini("""
+        [pytest]
+        imports_cache_verify_hash = true
+    """)
+    pytester.runpytest().assert_outcomes(passed=1)
+    pytester.runpytest().assert_outcomes(passed=1)
+
+
+def test_model_reused_in_same_process(pytester, cache_dir):
+    pytester.runpytest().assert_outcomes(passed=1)
+    (pytester.path / 'foo.py').unlink()
+    (pytester.path / 'foo').mkdir()
+    (pytester.path / 'foo' / '__init__.py').write_text('import bar')
+    pytester.runpytest().assert_outcomes(passed=1)
+    (pytester.path / 'foo' / '__init__.py').write_text('import baz')
+    pytester.runpytest().assert_outcomes(failed=1)
+
+
+def test_lazy_keeps_cache_entries_of_unused_modules(pytester, cache_dir):
+    pytester.makepyfile(baz='import qux')
+    pytester.runpytest().assert_outcomes(passed=1)
+    (cache_file,) = cache_dir.glob('*.json')
+    pytester.makeini("""
+        [pytest]
+        imports_lazy = true
+    """)
+    (pytester.path / 'foo.py').write_text('import bar\nimport baz')
+    pytester.runpytest().assert_outcomes(passed=1)
+    assert 'baz.py' in cache_file.read_text()
+    (pytester.path / 'foo.py').write_text('import baz')
+    pytester.runpytest().assert_outcomes(failed=1)
@@ -0,0 +1,83 @@
+import subprocess
+
+import pytest
+
+ARCH_TEST = """
+    from pytest_imports import must_import, must_not_import, project, scope
+
+    def test_foo(imports):
+        imports.check({'foo': must_import('bar')})
+
+    def test_pkg(imports):
+        imports.check({
+            scope('pkg', without='b'): must_not_import('baz'),
+            'pkg.b': must_not_import('baz'),
+        })
+
+    def test_project(imports):
+        imports.check({project(): must_not_import('qux')})
+"""
+
+
+def _git(path, *args):
+    subprocess.run(
+        ['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com', *args],
+        cwd=path,
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.fixture
+def git_project(pytester):
+    pytester.makepyprojecttoml('')
+    pytester.makepyfile(foo='import bar', test_arch=ARCH_TEST)
+    pkg_path = pytester.mkpydir('pkg')
+    (pkg_path / 'a.py').write_text('')
+    (pkg_path / 'b.py').write_text('')
+    _git(pytester.path, 'init', '-q')
+    _git(pytester.path, 'add', '.')
+    _git(pytester.path, 'commit', '-q', '-m', 'initial')
+    return pytester.path
+
+
+def test_changed_since_nothing_changed(pytester, git_project):
+    result = pytester.runpytest('--imports-changed-since=HEAD')
+    result.assert_outcomes(skipped=3)
+
+
+def test_changed_since_modified_module(pytester, git_project):
+    (git_project / 'pkg' / 'b.py').write_text('import baz')
+    result = pytester.runpytest('--imports-changed-since=HEAD', '-rs')
+    result.assert_outcomes(passed=1, failed=1, skipped=1)
+    result.stdout.fnmatch_lines(['*No changed modules in scopes foo.*'])
+
+
+def test_changed_since_untracked_module(pytester, git_project):
+    (git_project / 'pkg' / 'c.py').write_text('import qux')
+    result = pytester.runpytest('--imports-changed-since=HEAD')
+    result.assert_outcomes(passed=1, failed=1, skipped=1)
+
+
+def test_changed_since_deleted_module(pytester, git_project):
+    _git(git_project, 'rm', '-q', 'pkg/a.py')
+    _git(git_project, 'commit', '-q', '-m', 'remove module')
+    result = pytester.runpytest('--imports-changed-since=HEAD~1')
+    result.assert_outcomes(passed=2, skipped=1)
+
+
+def test_changed_since_renamed_module(pytester, git_project):
+    (git_project / 'pkg' / 'a.py').write_text('import os\nimport sys\n')
+    _git(git_project, 'commit', '-q', '-am', 'fill module')
+    _git(git_project, 'mv', 'pkg/a.py', 'moved.py')
+    _git(git_project, 'commit', '-q', '-m', 'move module')
+    result = pytester.runpytest('--imports-changed-since=HEAD~1')
+    result.assert_outcomes(passed=2, skipped=1)
+
+
+def test_changed_since_invalid_ref(pytester, git_project):
+    result = pytester.runpytest('--imports-changed-since=nonexistent')
+    result.assert_outcomes(errors=3)
+    result.stdout.fnmatch_lines(
+        ["*Failed to get the files changed since 'nonexistent'*"]
+    )
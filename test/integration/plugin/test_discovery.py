@@ -0,0 +1,46 @@
+ARCH_TEST = """
+    from pytest_imports import must_not_import
+
+    def test_arch(imports):
+        imports.check({'foo': must_not_import('bar')})
+"""
+
+
+def test_default_exclude_dirs(pytester):
+    pytester.makepyprojecttoml('')
+    pytester.mkpydir('foo')
+    (pytester.path / 'foo' / 'node_modules').mkdir()
+    (pytester.path / 'foo' / 'node_modules' / 'x.py').write_text('import bar')
+    pytester.makepyfile(test_arch=ARCH_TEST)
+    pytester.runpytest().assert_outcomes(passed=1)
+
+
+def test_exclude_dirs(pytester):
+    pytester.makeini("""
+        [pytest]
+        imports_exclude_dirs =
+            generated
+            foo/legacy
+    """)
+    pytester.mkpydir('foo')
+    for name in ('generated', 'legacy'):
+        (pytester.path / 'foo' / name).mkdir()
+        (pytester.path / 'foo' / name / 'x.py').write_text('import bar')
+    pytester.makepyfile(test_arch=ARCH_TEST)
+    pytester.runpytest().assert_outcomes(passed=1)
+
+
+def test_use_gitignore(pytester):
+    pytester.makeini("""
+        [pytest]
+        imports_use_gitignore = true
+    """)
+    (pytester.path / '.git').mkdir()
+    (pytester.path / '.gitignore').write_text('build/\n')
+    pytester.mkpydir('foo')
+    (pytester.path / 'foo' / 'build').mkdir()
+    (pytester.path / 'foo' / 'build' / 'x.py').write_text('import bar')
+    pytester.makepyfile(test_arch=ARCH_TEST)
+    pytester.runpytest().assert_outcomes(passed=1)
+    (pytester.path / '.gitignore').write_text('')
+    pytester.runpytest().assert_outcomes(failed=1)
@@ -0,0 +1,59 @@
+import json
+
+ARCH_TEST = """
+    from pytest_imports import must_import, must_not_import
+
+    def test_arch(imports):
+        imports.check({
+            'foo': must_import('bar'),
+            'baz': must_not_import('bar'),
+        })
+"""
+
+
+def test_profile_summary(pytester):
+    pytester.makepyfile(foo='import bar', baz='', test_arch=ARCH_TEST)
+    result = pytester.runpytest('--imports-profile')
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines(
+        [
+            '*pytest-imports profile*',
+            'phases:',
+            '  model *s*',
+            '  discovery *s*3 items*',
+            '  read *s*3 items*',
+            '  parse *s*items*',
+            'slowest files to parse (top 10):',
+            '*foo.py',
+            'slowest rule scopes (top 10):',
+            '*s  foo',
+        ]
+    )
+
+
+def test_profile_json(pytester):
+    pytester.makepyfile(foo='import bar', baz='', test_arch=ARCH_TEST)
+    json_path = pytester.path / 'profile.json'
+    result = pytester.runpytest(f'--imports-profile-json={json_path}')
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines([f'profile written to {json_path}'])
+    profile_data = json.loads(json_path.read_text())
+    assert set(profile_data['phases']) == {
+        'model',
+        'discovery',
+        'read',
+        'parse',
+        'tree',
+        'rules',
+    }
+    assert {scope['scope'] for scope in profile_data['slowest_scopes']} == {
+        'foo',
+        'baz',
+    }
+
+
+def test_no_profile(pytester):
+    pytester.makepyfile(foo='import bar', baz='', test_arch=ARCH_TEST)
+    result = pytester.runpytest()
+    result.assert_outcomes(passed=1)
+    result.stdout.no_fnmatch_line('*pytest-imports profile*')
@@ -94,7 +94,7 @@ def test_project_path_from_heuristic_with_setup_py(pytester):
     result.assert_outcomes(passed=1)
 
 
-def test_project_path_multiple_not_implemented(pytester):
+def test_project_path_multiple(pytester):
     pytester.makepyprojecttoml("""
         [tool.pytest.ini_options]
         imports_project_paths = [
@@ -104,4 +104,4 @@ def test_project_path_multiple_not_implemented(pytester):
     """)
     pytester.makepyfile('def test_arch(imports): pass')
     result = pytester.runpytest()
-    result.assert_outcomes(errors=1)
+    result.assert_outcomes(passed=1)
@@ -0,0 +1,126 @@
+from types import SimpleNamespace
+
+import pytest
+
+from pytest_imports import parser, plugin
+from pytest_imports.model import DotPath, ImportInModule, RootNode
+
+COUNTING_CONFTEST = """
+    from pathlib import Path
+
+    from pytest_imports import parser
+
+    _parse_module = parser._parse_module
+
+    def _counting_parse_module(module_content, module_path, *args, **kwargs):
+        with (Path(__file__).parent / 'parsed.txt').open('a') as f:
+            f.write(f'{module_path.name}\\n')
+        return _parse_module(module_content, module_path, *args, **kwargs)
+
+    parser._parse_module = _counting_parse_module
+"""
+
+ARCH_TEST = """
+    from pytest_imports import must_import
+
+    def test_arch(imports):
+        imports.check({'foo': must_import('bar')})
+"""
+
+
+def test_model_is_parsed_once_with_xdist(pytester):
+    pytest.importorskip('xdist')
+    pytester.makepyprojecttoml('')
+    pytester.makeconftest(COUNTING_CONFTEST)
+    pytester.makepyfile(foo='import bar', test_arch=ARCH_TEST)
+    # Note: The conftest patches the parser, so it must not run in this process.
+    result = pytester.runpytest_subprocess('-p', 'xdist', '-n', '2', '--dist', 'each')
+    result.assert_outcomes(passed=2)
+    parsed_files = (pytester.path / 'parsed.txt').read_text().split()
+    assert sorted(parsed_files) == ['conftest.py', 'foo.py', 'test_arch.py']
+
+
+def test_model_is_shared_between_workers(pytester, tmp_path_factory, mocker):
+    """Runs the sessions in-process, with the worker input set up like xdist."""
+    shared_dir = tmp_path_factory.mktemp('shared')
+    pytester.makepyprojecttoml('')
+    pytester.makeconftest(f"""
+        def pytest_configure(config):
+            config.workerinput = {{'imports_shared_dir': {str(shared_dir)!r}}}
+    """)
+    pytester.makepyfile(foo='import bar', test_arch=ARCH_TEST)
+    parse_spy = mocker.spy(parser, '_parse_module')
+    pytester.runpytest('--imports-no-cache').assert_outcomes(passed=1)
+    pytester.runpytest('--imports-no-cache').assert_outcomes(passed=1)
+    assert (shared_dir / plugin.SHARED_MODEL_FILE).exists()
+    assert sorted(call.args[1].name for call in parse_spy.call_args_list) == [
+        'conftest.py',
+        'foo.py',
+        'test_arch.py',
+    ]
+
+
+def _root_node() -> RootNode:
+    root_node = RootNode()
+    node = root_node.get_or_add(DotPath('a'), plugin.Path('a.py'))
+    node.add_imports([ImportInModule(DotPath('b'), 1)])
+    return root_node
+
+
+def test_shared_model_is_built_once(tmp_path, mocker):
+    build_model = mocker.Mock(side_effect=_root_node)
+    root_node = plugin._shared_model(tmp_path, build_model)
+    loaded_node = plugin._shared_model(tmp_path, build_model)
+    build_model.assert_called_once_with()
+    assert loaded_node is not root_node
+    assert loaded_node.get(DotPath('a')).imports == [ImportInModule(DotPath('b'), 1)]
+
+
+def test_shared_model_waits_for_other_process(tmp_path, mocker):
+    (tmp_path / plugin.SHARED_MODEL_LOCK_FILE).touch()
+
+    def write_model(seconds):
+        plugin._shared_model(tmp_path / 'other', _root_node)
+        (tmp_path / 'other' / plugin.SHARED_MODEL_FILE).rename(
+            tmp_path / plugin.SHARED_MODEL_FILE
+        )
+
+    (tmp_path / 'other').mkdir()
+    mocker.patch.object(plugin.time, 'sleep', side_effect=write_model)
+    build_model = mocker.Mock()
+    root_node = plugin._shared_model(tmp_path, build_model)
+    build_model.assert_not_called()
+    assert root_node.get(DotPath('a'))
+
+
+def test_shared_model_wait_timeout(tmp_path, mocker, caplog):
+    (tmp_path / plugin.SHARED_MODEL_LOCK_FILE).touch()
+    mocker.patch.object(plugin, 'SHARED_MODEL_TIMEOUT_SECONDS', 0.1)
+    mocker.patch.object(plugin.time, 'sleep')
+    mocker.patch.object(plugin.time, 'monotonic', side_effect=[0, 0, 1])
+    build_model = mocker.Mock(side_effect=_root_node)
+    assert plugin._shared_model(tmp_path, build_model).get(DotPath('a'))
+    build_model.assert_called_once_with()
+    plugin.time.sleep.assert_called_once_with(plugin.SHARED_MODEL_POLL_SECONDS)
+    assert 'Timed out waiting for the architecture model' in caplog.text
+
+
+def test_shared_model_build_failure(tmp_path, mocker):
+    build_model = mocker.Mock(side_effect=[ValueError('invalid'), _root_node()])
+    with pytest.raises(ValueError, match='invalid'):
+        plugin._shared_model(tmp_path, build_model)
+    assert (tmp_path / plugin.SHARED_MODEL_FAILED_FILE).exists()
+    assert plugin._shared_model(tmp_path, build_model).get(DotPath('a'))
+    assert build_model.call_count == 2
+
+
+def test_shared_dir_for_workers(pytester):
+    config = pytester.parseconfigure()
+    nodes = [SimpleNamespace(config=config, workerinput={}) for _ in range(2)]
+    for node in nodes:
+        plugin.pytest_configure_node(node)
+    shared_dir = nodes[0].workerinput[plugin.WORKERINPUT_SHARED_DIR]
+    assert nodes[1].workerinput[plugin.WORKERINPUT_SHARED_DIR] == shared_dir
+    assert plugin.Path(shared_dir).is_dir()
+    config._ensure_unconfigure()
+    assert not plugin.Path(shared_dir).exists()
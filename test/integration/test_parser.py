@@ -4,8 +4,17 @@ from pathlib import Path
 
 import pytest
 
+from pytest_imports import parser
+from pytest_imports.cache import ImportCache
 from pytest_imports.model import DotPath, ImportInModule
 from pytest_imports.parser import build_import_model
+from pytest_imports.profile import Profile
+from pytest_imports.query import (
+    compile_rules,
+    evaluate_rules,
+    must_not_import,
+    project,
+)
 
 
 def _create_project_on_disk(struct: dict[str, str | dict], current_path: Path):
@@ -19,6 +28,12 @@ def _create_project_on_disk(struct: dict[str, str | dict], current_path: Path):
                 path.write_text(cleandoc(value))
 
 
+@pytest.fixture(params=['ast', 'fast'])
+def engine(request) -> str:
+    """Runs a test with each parser engine, to cross-check the engines."""
+    return request.param
+
+
 @pytest.fixture
 def project_path(project_structure: dict[str, str | dict], tmp_path: Path) -> Path:
     _create_project_on_disk(project_structure, tmp_path)
@@ -47,8 +62,8 @@ def project_path(project_structure: dict[str, str | dict], tmp_path: Path) -> Pa
         ),
     ],
 )
-def test_relative_import(project_path: Path, path: DotPath, import_obj):
-    base_node = build_import_model(project_path)
+def test_relative_import(project_path: Path, engine, path: DotPath, import_obj):
+    base_node = build_import_model(project_path, engine=engine)
     assert base_node.get(DotPath(path)).imports == [import_obj]
 
 
@@ -60,8 +75,8 @@ def test_relative_import(project_path: Path, path: DotPath, import_obj):
         }
     ],
 )
-def test_relative_import_beyond_base(project_path, caplog):
-    base_node = build_import_model(project_path)
+def test_relative_import_beyond_base(project_path, engine, caplog):
+    base_node = build_import_model(project_path, engine=engine)
     warnings = [
         record for record in caplog.records if record.levelno == logging.WARNING
     ]
@@ -78,8 +93,8 @@ def test_relative_import_beyond_base(project_path, caplog):
         }
     ],
 )
-def test_import_from_init(project_path):
-    base_node = build_import_model(project_path)
+def test_import_from_init(project_path, engine):
+    base_node = build_import_model(project_path, engine=engine)
     assert base_node.get(DotPath('a')).imports == [ImportInModule(DotPath('x'), 1)]
 
 
@@ -100,8 +115,8 @@ def test_import_from_init(project_path):
         ),
     ],
 )
-def test_absolute_import(project_path: Path, path: DotPath, import_obj):
-    base_node = build_import_model(project_path)
+def test_absolute_import(project_path: Path, engine, path: DotPath, import_obj):
+    base_node = build_import_model(project_path, engine=engine)
     assert base_node.get(DotPath(path)).imports == [import_obj]
 
 
@@ -118,8 +133,8 @@ def test_absolute_import(project_path: Path, path: DotPath, import_obj):
         }
     ],
 )
-def test_import_in_nested_block(project_path):
-    base_node = build_import_model(project_path)
+def test_import_in_nested_block(project_path, engine):
+    base_node = build_import_model(project_path, engine=engine)
     assert base_node.get(DotPath('a')).imports == [
         ImportInModule(import_path=DotPath('foo'), line_no=2),
         ImportInModule(import_path=DotPath('bar'), line_no=4),
@@ -149,8 +164,8 @@ def test_import_in_nested_block(project_path):
         }
     ],
 )
-def test_project_structure_nodes(project_path: Path):
-    node = build_import_model(project_path)
+def test_project_structure_nodes(project_path: Path, engine):
+    node = build_import_model(project_path, engine=engine)
     assert len(node.get(DotPath('a')).imports) == 0
     assert node.get(DotPath('a'))._file_path == project_path / 'a'
     assert len(node.get(DotPath('a.b')).imports) == 2
@@ -170,8 +185,8 @@ def test_project_structure_nodes(project_path: Path):
         }
     ],
 )
-def test_hidden_dirs_and_files_are_excluded(project_path: Path):
-    node = build_import_model(project_path)
+def test_hidden_dirs_and_files_are_excluded(project_path: Path, engine):
+    node = build_import_model(project_path, engine=engine)
     assert node.get(DotPath('a.b'))
     assert len(node.get(DotPath('a'))._children) == 1
     assert len(node._children) == 1
@@ -185,6 +200,350 @@ def test_hidden_dirs_and_files_are_excluded(project_path: Path):
         }
     ],
 )
-def test_empty_file(project_path):
-    base_node = build_import_model(project_path)
+def test_empty_file(project_path, engine):
+    base_node = build_import_model(project_path, engine=engine)
     assert base_node.get(DotPath('a')).imports == []
+
+
+@pytest.mark.parametrize(
+    'project_structure',
+    [
+        {
+            'a': {'__init__.py': 'import x', 'b.py': 'from . import y'},
+        }
+    ],
+)
+def test_cached_model_equals_parsed_model(project_path, tmp_path_factory):
+    cache_file = tmp_path_factory.mktemp('cache') / 'imports.json'
+    build_import_model(project_path, cache=ImportCache(cache_file))
+    node = build_import_model(project_path, cache=ImportCache(cache_file))
+    assert node.get(DotPath('a')).imports == [ImportInModule(DotPath('x'), 1)]
+    assert node.get(DotPath('a.b')).imports == [
+        ImportInModule(DotPath('a.y'), 1, level=1)
+    ]
+
+
+@pytest.mark.parametrize('verify_hash', [False, True])
+@pytest.mark.parametrize(
+    'project_structure',
+    [{'a.py': 'import x', 'b.py': 'import y'}],
+)
+def test_cache_reparses_only_changed_modules(
+    project_path, tmp_path_factory, mocker, verify_hash
+):
+    cache_file = tmp_path_factory.mktemp('cache') / 'imports.json'
+    build_import_model(project_path, cache=ImportCache(cache_file, verify_hash))
+    (project_path / 'b.py').write_text('import y\nimport z')
+    parse_spy = mocker.spy(parser, '_parse_module')
+    node = build_import_model(project_path, cache=ImportCache(cache_file, verify_hash))
+    assert [call.args[1].name for call in parse_spy.call_args_list] == ['b.py']
+    assert len(node.get(DotPath('a')).imports) == 1
+    assert len(node.get(DotPath('b')).imports) == 2
+
+
+def _model_snapshot(root_node):
+    return [
+        (node.dot_path, node.file_path, list(node.imports))
+        for child in root_node.children()
+        for node in child.walk()
+    ]
+
+
+@pytest.mark.parametrize(
+    'project_structure',
+    [
+        {
+            'a': {
+                '__init__.py': 'import x',
+                'b.py': 'from . import y\nfrom ... import z',
+                'c': {'d.py': 'from ..b import y', 'e.py': ''},
+            },
+            'f.py': 'import a.b',
+            'g.py': 'from f import a',
+        }
+    ],
+)
+@pytest.mark.parametrize('use_cache', [False, True])
+def test_parallel_model_equals_serial_model(
+    project_path, tmp_path_factory, caplog, use_cache
+):
+    cache_file = tmp_path_factory.mktemp('cache') / 'imports.json'
+    cache = ImportCache(cache_file) if use_cache else None
+    serial_node = build_import_model(project_path)
+    assert len(caplog.records) == 1
+    parallel_node = build_import_model(project_path, cache=cache, workers=2)
+    assert _model_snapshot(parallel_node) == _model_snapshot(serial_node)
+    assert len(caplog.records) == 2
+    assert caplog.records[1].getMessage() == caplog.records[0].getMessage()
+
+
+@pytest.mark.parametrize(
+    'project_structure', [{'a.py': 'import b', 'b.py': 'import c', 'c.py': ''}]
+)
+def test_parallel_parsing_does_not_fork(project_path, mocker):
+    pool_spy = mocker.spy(parser, 'ProcessPoolExecutor')
+    build_import_model(project_path, workers=2)
+    mp_context = pool_spy.call_args.kwargs['mp_context']
+    assert mp_context.get_start_method() in ('forkserver', 'spawn')
+
+
+@pytest.mark.parametrize(
+    'project_structure',
+    [{'a': {'b.py': 'from ... import y', 'c.py': 'import x'}}],
+)
+def test_parse_chunk(project_path, caplog):
+    chunk_records, log_records, durations = parser._parse_chunk(
+        project_path, 'ast', [project_path / 'a' / 'b.py', project_path / 'a' / 'c.py']
+    )
+    assert chunk_records == [[], [(('x',), 1, 0)]]
+    assert len(durations) == 2
+    assert len(log_records) == 1
+    assert 'relative import' in log_records[0].getMessage()
+    assert not caplog.records
+
+
+@pytest.mark.parametrize(
+    'source',
+    [
+        '',
+        'x = 1',
+        'import a.b as c, d',
+        'from . import (x,\n  y as z,  # comment\n)',
+        'from ..q import *',
+        'from ...q import x\nimport y',
+        'from . import x as y, z',
+        'def f():\n    import x\nimport y',
+        'class A:\n    from x import y',
+        'try:\n    import a\nexcept ImportError:\n    import b\nelse:\n    import c',
+        'if x: import y',
+        'import e; import f',
+        'import e; x = 1; import f',
+        'def f():\n    yield from g()\n\n\nraise X from e\nimport y',
+        's = """\nimport nope\n"""\nimport yes',
+        "x = '# import nope'\nimport yes  # import nope",
+        'from x import \\\n    y',
+        'import \\\n  x.y',
+        'import módulo',
+        'import a\r\nfrom b import (\r\n  c)\r\n',
+        'from __future__ import annotations',
+        b'# -*- coding: latin-1 -*-\nimport x  # \xe9\nimport y\n',
+        b'\xef\xbb\xbfimport x',
+    ],
+)
+def test_engines_extract_same_imports(tmp_path, source, caplog):
+    module_path = tmp_path / 'a' / 'b.py'
+    ast_imports = parser._parse_module(source, module_path, tmp_path, 'ast')
+    ast_messages = [record.getMessage() for record in caplog.records]
+    caplog.clear()
+    fast_imports = parser._parse_module(source, module_path, tmp_path, 'fast')
+    assert fast_imports == ast_imports
+    assert [
+        record.getMessage()
+        for record in caplog.records
+        if record.levelno == logging.WARNING
+    ] == ast_messages
+
+
+@pytest.mark.parametrize(
+    'project_structure',
+    [
+        {
+            'a': {'__init__.py': 'import x', 'b.py': 'import y', 'c.py': ''},
+            'd': {'e.py': 'import z'},
+        }
+    ],
+)
+def test_update_previous_model(project_path, mocker):
+    previous = build_import_model(project_path, workers=2)
+    (project_path / 'a' / 'b.py').write_text('import y\nimport w')
+    (project_path / 'a' / 'f.py').write_text('import v')
+    (project_path / 'd' / 'e.py').unlink()
+    (project_path / 'a' / '__init__.py').unlink()
+    parse_spy = mocker.spy(parser, '_parse_module')
+    node = build_import_model(project_path, previous=previous)
+    assert node is previous
+    assert sorted(call.args[1].name for call in parse_spy.call_args_list) == [
+        'b.py',
+        'f.py',
+    ]
+    assert sorted(_model_snapshot(node), key=str) == sorted(
+        _model_snapshot(build_import_model(project_path)), key=str
+    )
+
+
+@pytest.mark.parametrize(
+    'project_structure',
+    [{'app': {'util.py': 'import x', 'util': {'helper.py': 'import y'}, 'c.py': ''}}],
+)
+def test_update_previous_model_with_module_next_to_directory(project_path):
+    previous = build_import_model(project_path)
+    (project_path / 'app' / 'c.py').unlink()
+    node = build_import_model(project_path, previous=previous)
+    assert _model_snapshot(node) == _model_snapshot(build_import_model(project_path))
+    assert node.get(DotPath('app.util')).file_path.name == 'util.py'
+    (project_path / 'app' / 'util.py').unlink()
+    node = build_import_model(project_path, previous=previous)
+    assert _model_snapshot(node) == _model_snapshot(build_import_model(project_path))
+    assert node.get(DotPath('app.util')).is_directory
+
+
+@pytest.mark.parametrize(
+    'project_structure', [{'app': {'util': {'__init__.py': 'import y'}, 'c.py': ''}}]
+)
+def test_update_previous_model_with_module_next_to_package(project_path):
+    previous = build_import_model(project_path)
+    (project_path / 'app' / 'util.py').write_text('import x')
+    with pytest.raises(ValueError, match=r'util\.py has the same name as the package'):
+        build_import_model(project_path)
+    with pytest.raises(ValueError, match=r'util\.py has the same name as the package'):
+        build_import_model(project_path, previous=previous)
+
+
+@pytest.mark.parametrize('project_structure', [{'a.py': 'import x'}])
+def test_update_previous_model_without_signatures(project_path):
+    previous = build_import_model(project_path)
+    node = build_import_model(project_path, previous=previous)
+    assert node is not previous
+    assert _model_snapshot(node) == _model_snapshot(previous)
+
+
+@pytest.mark.parametrize(
+    'project_structure',
+    [{'app': {'util.py': 'import x', 'util': {'helper.py': 'import y'}}}],
+)
+def test_module_next_to_directory_of_same_name(project_path):
+    node = build_import_model(project_path)
+    util_node = node.get(DotPath('app.util'))
+    assert util_node.file_path == project_path / 'app' / 'util.py'
+    assert util_node.imports == [ImportInModule(DotPath('x'), 1)]
+    failures = compile_rules({'app.util': must_not_import('x')}).evaluate(node)
+    assert failures == [
+        f'  [scope app.util] must not import x — found in {util_node.file_path}:1'
+    ]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+@pytest.mark.parametrize(
+    'project_structure',
+    [{'a': {'__init__.py': '', 'b.py': 'import x', 'c.py': 'import y'}}],
+)
+def test_build_with_profile(project_path, workers):
+    profile = Profile()
+    build_import_model(project_path, workers=workers, profile=profile)
+    assert set(profile.phases) == {'model', 'discovery', 'read', 'parse', 'tree'}
+    assert profile.phases['discovery'].count == 3
+    assert profile.phases['read'].count == 3
+    assert profile.phases['parse'].count == 3
+    assert profile.phases['tree'].count == 3
+    assert {path.name for _, path in profile.slowest_files()} == {
+        '__init__.py',
+        'b.py',
+        'c.py',
+    }
+
+
+LAZY_PROJECT = {
+    'a': {'__init__.py': 'import x', 'b.py': 'from . import y\nfrom ... import z'},
+    'c': {'d.py': 'from ..a import b', 'e': {'f.py': 'import a.b'}},
+}
+
+
+@pytest.mark.parametrize('project_structure', [LAZY_PROJECT])
+def test_lazy_model_equals_parsed_model(project_path, engine, mocker, caplog):
+    parse_spy = mocker.spy(parser, '_parse_module')
+    node = build_import_model(project_path, engine=engine, lazy=True)
+    assert not parse_spy.called
+    assert not caplog.records
+    assert _model_snapshot(node) == _model_snapshot(
+        build_import_model(project_path, engine=engine)
+    )
+    assert len(caplog.records) == 2
+
+
+@pytest.mark.parametrize('use_plan', [False, True])
+@pytest.mark.parametrize('project_structure', [LAZY_PROJECT])
+def test_lazy_model_parses_only_queried_scopes(project_path, mocker, use_plan):
+    node = build_import_model(project_path, lazy=True)
+    parse_spy = mocker.spy(parser, '_parse_module')
+    rules = {'c': must_not_import('x')}
+    if use_plan:
+        failures = compile_rules(rules).evaluate(node)
+    else:
+        failures = evaluate_rules(node, rules)
+    assert not failures
+    assert sorted(call.args[1].name for call in parse_spy.call_args_list) == [
+        'd.py',
+        'f.py',
+    ]
+
+
+@pytest.mark.parametrize('project_structure', [LAZY_PROJECT])
+def test_lazy_model_with_profile(project_path):
+    profile = Profile()
+    node = build_import_model(project_path, lazy=True, profile=profile)
+    assert set(profile.phases) == {'model', 'discovery'}
+    assert profile.phases['discovery'].count == 4
+    assert node.get(DotPath('c.d')).imports
+    assert profile.phases['read'].count == 1
+    assert profile.phases['parse'].count == 1
+
+
+@pytest.mark.parametrize(
+    'project_structure', [{'a.py': 'import x', 'bad.py': 'import forbidden\ndef f(:'}]
+)
+def test_lazy_model_parse_error_is_raised_again(project_path):
+    node = build_import_model(project_path, lazy=True)
+    bad_node = node.get(DotPath('bad'))
+    for _ in range(2):
+        with pytest.raises(SyntaxError):
+            _ = bad_node.imports
+    assert not node.is_loaded()
+    rules = {project(): must_not_import('forbidden')}
+    with pytest.raises(SyntaxError):
+        compile_rules(rules).evaluate(node)
+
+
+@pytest.mark.parametrize('verify_hash', [False, True])
+@pytest.mark.parametrize('project_structure', [LAZY_PROJECT])
+def test_lazy_model_with_cache(project_path, tmp_path_factory, mocker, verify_hash):
+    cache_file = tmp_path_factory.mktemp('cache') / 'imports.json'
+    build_import_model(project_path, cache=ImportCache(cache_file, verify_hash))
+    (project_path / 'c' / 'd.py').write_text('import x')
+    expected_snapshot = _model_snapshot(build_import_model(project_path))
+    parse_spy = mocker.spy(parser, '_parse_module')
+    cache = ImportCache(cache_file, verify_hash)
+    node = build_import_model(project_path, cache=cache, lazy=True)
+    assert node.get(DotPath('c.d')).imports == [ImportInModule(DotPath('x'), 1)]
+    assert node.get(DotPath('c.e.f')).imports == [ImportInModule(DotPath('a.b'), 1)]
+    assert [call.args[1].name for call in parse_spy.call_args_list] == ['d.py']
+    cache.save(prune=False)
+    parse_spy.reset_mock()
+    cache = ImportCache(cache_file, verify_hash)
+    node = build_import_model(project_path, cache=cache, lazy=True)
+    assert _model_snapshot(node) == expected_snapshot
+    assert not parse_spy.called
+
+
+@pytest.mark.parametrize('use_cache', [False, True])
+def test_module_with_coding_comment(tmp_path, tmp_path_factory, engine, use_cache):
+    (tmp_path / 'a.py').write_bytes(
+        b'# -*- coding: latin-1 -*-\nimport x  # caf\xe9\nimport y\n'
+    )
+    cache_file = tmp_path_factory.mktemp('cache') / 'imports.json'
+    cache = ImportCache(cache_file) if use_cache else None
+    node = build_import_model(tmp_path, cache=cache, engine=engine)
+    assert node.get(DotPath('a')).imports == [
+        ImportInModule(DotPath('x'), 2),
+        ImportInModule(DotPath('y'), 3),
+    ]
+
+
+def test_read_modules_keeps_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(parser, 'READ_AHEAD', 2)
+    module_paths = [tmp_path / f'm{i}.py' for i in range(5)]
+    for i, module_path in enumerate(module_paths):
+        module_path.write_text(f'import x{i}')
+    assert list(parser._read_modules(module_paths)) == [
+        (module_path, f'import x{i}'.encode())
+        for i, module_path in enumerate(module_paths)
+    ]
@@ -20,7 +20,7 @@ def _yield_project_modules(struct: dict[str, str | dict], current_path: Path):
 def imports_root_node(project_structure, mocker):
     """Overrides the fixture from the plugin with an in-memory version."""
 
-    def mock_walk_modules(_):
+    def mock_walk_modules(*_):
         return _yield_project_modules(project_structure, Path())
 
     mocker.patch('pytest_imports.parser._walk_modules', mock_walk_modules)
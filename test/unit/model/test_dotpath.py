@@ -1,3 +1,5 @@
+import copy
+import pickle
 from pathlib import Path
 
 import pytest
@@ -109,3 +111,20 @@ def test_dotpath_hash():
 def test_dotpath_hash_stable():
     dp = DotPath('a.b')
     assert hash(dp) == hash(dp)
+
+
+def test_dotpath_interned():
+    assert DotPath('a.b') is DotPath(['a', 'b'])
+    assert DotPath('a.b') is DotPath('a') / 'b'
+    assert DotPath('a.b').parent is DotPath('a')
+    assert DotPath() is DotPath('')
+
+
+def test_dotpath_id():
+    assert DotPath('a.b').id != DotPath('a.c').id
+    assert DotPath.from_id(DotPath('a.b').id) is DotPath('a.b')
+
+
+def test_dotpath_pickle():
+    assert pickle.loads(pickle.dumps(DotPath('a.b'))) is DotPath('a.b')
+    assert copy.deepcopy(DotPath('a.b')) is DotPath('a.b')
@@ -0,0 +1,107 @@
+from pathlib import Path
+
+import pytest
+
+from pytest_imports import model
+from pytest_imports.model import DotPath, ImportInModule, ModuleNode, RootNode
+
+
+def _snapshot(root_node: RootNode):
+    return [
+        (node.dot_path, node.name, node.file_path, list(node.imports))
+        for node in root_node.walk()
+    ]
+
+
+@pytest.fixture
+def root_node():
+    root_node = RootNode()
+    root_node.add_module_file(
+        Path('/p'), Path('/p/a/__init__.py'), [ImportInModule(DotPath('x'), 1)]
+    )
+    root_node.add_module_file(
+        Path('/p'),
+        Path('/p/a/b/c.py'),
+        [
+            ImportInModule(DotPath('a.b.d'), 1, level=1),
+            ImportInModule(DotPath('x.y'), 5),
+            ImportInModule(DotPath('a'), 300_000),
+        ],
+    )
+    root_node.add_module_file(Path('/p'), Path('/p/é.py'), [])
+    other_root_node = RootNode()
+    other_root_node.add_module_file(
+        Path('/q/r'), Path('/q/r/s.py'), [ImportInModule(DotPath('a.b'), 2)]
+    )
+    return RootNode.merge([root_node, other_root_node])
+
+
+def test_dump_and_load(root_node, tmp_path):
+    model_file = tmp_path / 'model.bin'
+    root_node.dump(model_file)
+    loaded_node = RootNode.load(model_file)
+    assert _snapshot(loaded_node) == _snapshot(root_node)
+    assert loaded_node.get(DotPath('a.b.c')).imports[2].line_no == 300_000
+    assert loaded_node.import_index().find(DotPath('a.b'))
+
+
+def test_dump_and_load_many_imports(tmp_path):
+    root_node = RootNode()
+    imports = [ImportInModule(DotPath(f'x{i}.y'), i) for i in range(1, 200)]
+    root_node.add_module_file(Path('/p'), Path('/p/a.py'), imports)
+    root_node.dump(tmp_path / 'model.bin')
+    loaded_node = RootNode.load(tmp_path / 'model.bin')
+    assert loaded_node.get(DotPath('a')).imports == imports
+
+
+def test_dump_node_with_other_directory(tmp_path):
+    root_node = RootNode()
+    node = root_node.get_or_add(DotPath('a'), Path('/p/a'))
+    node._children['b'] = ModuleNode('b', DotPath('a.b'), Path('/q/b.py'))
+    root_node.dump(tmp_path / 'model.bin')
+    loaded_node = RootNode.load(tmp_path / 'model.bin')
+    assert loaded_node.get(DotPath('a.b')).file_path == Path('/q/b.py')
+
+
+def test_dump_loads_lazy_imports(tmp_path):
+    root_node = RootNode()
+    node = root_node.get_or_add(DotPath('a'), Path('/p/a.py'))
+    node.set_import_loader(lambda: [ImportInModule(DotPath('x'), 1)])
+    root_node.dump(tmp_path / 'model.bin')
+    loaded_node = RootNode.load(tmp_path / 'model.bin')
+    assert loaded_node.get(DotPath('a')).imports == [ImportInModule(DotPath('x'), 1)]
+
+
+def test_load_imports_without_objects(root_node, tmp_path, mocker):
+    root_node.dump(tmp_path / 'model.bin')
+    import_spy = mocker.spy(model.ImportInModule, '__init__')
+    loaded_node = RootNode.load(tmp_path / 'model.bin')
+    assert not import_spy.called
+    assert len(loaded_node.get(DotPath('a.b.c')).imports) == 3
+
+
+def test_load_other_file(tmp_path):
+    (tmp_path / 'model.bin').write_bytes(b'{}')
+    with pytest.raises(ValueError, match='Not a pytest-imports model file'):
+        RootNode.load(tmp_path / 'model.bin')
+
+
+def test_load_other_version(tmp_path):
+    (tmp_path / 'model.bin').write_bytes(model.MODEL_FILE_MAGIC + b'\x80\x01')
+    with pytest.raises(ValueError, match='Unsupported model file version 128'):
+        RootNode.load(tmp_path / 'model.bin')
+
+
+@pytest.mark.parametrize('size', [-1, -5])
+def test_load_truncated_file(root_node, tmp_path, size):
+    root_node.dump(tmp_path / 'model.bin')
+    data = (tmp_path / 'model.bin').read_bytes()
+    (tmp_path / 'model.bin').write_bytes(data[:size])
+    with pytest.raises(ValueError, match='Truncated model file'):
+        RootNode.load(tmp_path / 'model.bin')
+
+
+def test_load_truncated_varint(tmp_path):
+    (tmp_path / 'model.bin').write_bytes(model.MODEL_FILE_MAGIC + b'\x80')
+    with pytest.raises(ValueError, match='Truncated model file'):
+        RootNode.load(tmp_path / 'model.bin')
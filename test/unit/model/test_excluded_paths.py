@@ -0,0 +1,49 @@
+import pytest
+
+from pytest_imports.model import DotPath, ExcludedPaths
+
+
+def _excluded_paths(*paths: str) -> ExcludedPaths:
+    return ExcludedPaths(DotPath(p) for p in paths)
+
+
+@pytest.mark.parametrize(
+    ('paths', 'result'),
+    [
+        ([], []),
+        ([''], []),
+        (['a'], ['a']),
+        (['a.b', 'a'], ['a']),
+        (['a', 'a.b'], ['a']),
+        (['a.b', 'a.c', 'd'], ['a.b', 'a.c', 'd']),
+    ],
+)
+def test_excluded_paths_are_pruned(paths, result):
+    excluded_paths = _excluded_paths(*paths)
+    assert sorted(str(p) for p in excluded_paths.paths()) == result
+
+
+@pytest.mark.parametrize(
+    ('path', 'result'),
+    [
+        ('', False),
+        ('a', False),
+        ('a.b', True),
+        ('a.b.c', True),
+        ('a.c', False),
+        ('d', True),
+        ('e', False),
+    ],
+)
+def test_excluded_paths_contains(path, result):
+    excluded_paths = _excluded_paths('a.b', 'd')
+    assert excluded_paths.contains(DotPath(path).parts) == result
+
+
+def test_excluded_paths_child():
+    excluded_paths = _excluded_paths('a.b', 'd')
+    child = excluded_paths.child('a')
+    assert not child.is_excluded
+    assert [str(p) for p in child.paths()] == ['b']
+    assert excluded_paths.child('d').is_excluded
+    assert excluded_paths.child('e') is None
@@ -0,0 +1,77 @@
+from pathlib import Path
+
+import pytest
+
+from pytest_imports.model import DotPath, FlatTree, ModuleNode, RootNode
+
+
+@pytest.fixture
+def root_node():
+    root_node = RootNode()
+    for path in ['r.a.b.c', 'r.a.d', 'r.e', 'x.y']:
+        root_node.get_or_add(DotPath(path), Path(*path.split('.')))
+    return root_node
+
+
+def test_flat_tree_is_walk_order(root_node):
+    tree = root_node.flat_tree()
+    assert len(tree) == 8
+    assert list(tree.select(root_node.get(DotPath('r')))) == list(
+        root_node.get(DotPath('r')).walk()
+    )
+
+
+@pytest.mark.parametrize('base_path', ['r', 'r.a', 'r.a.b.c', 'x'])
+@pytest.mark.parametrize(
+    'exclude',
+    [
+        [],
+        [''],
+        ['a'],
+        ['a', 'a'],
+        ['a.b'],
+        ['a.b', 'a'],
+        ['a.b', 'a.d'],
+        ['a.d', 'a.b', 'x.y'],
+        ['e'],
+        ['a', 'e'],
+        ['b', 'd'],
+        ['y'],
+    ],
+)
+def test_flat_tree_select(root_node, base_path, exclude):
+    base_node = root_node.get(DotPath(base_path))
+    exclude = [DotPath(p) for p in exclude]
+    nodes = root_node.flat_tree().select(base_node, exclude)
+    assert list(nodes) == list(base_node.walk(exclude=exclude))
+    for node in root_node.walk():
+        assert (node in nodes) == base_node.contains(node, exclude)
+
+
+def test_flat_tree_ranges(root_node):
+    tree = root_node.flat_tree()
+    r = root_node.get(DotPath('r'))
+    assert tree.select(r).ranges == [range(0, 6)]
+    assert tree.select(r, [DotPath('a.b')]).ranges == [range(0, 2), range(4, 6)]
+    assert tree.select(r, [DotPath('a')]).ranges == [range(0, 1), range(5, 6)]
+
+
+def test_flat_tree_contains_other_nodes(root_node):
+    nodes = root_node.flat_tree().select(root_node.get(DotPath('r')))
+    assert ModuleNode('z', DotPath('z'), Path('z')) not in nodes
+    assert 'r' not in nodes
+
+
+def test_flat_tree_of_module_node(root_node):
+    r = root_node.get(DotPath('r'))
+    tree = FlatTree(r)
+    assert len(tree) == 6
+    assert list(tree.select(r.get(DotPath('a')))) == list(r.get(DotPath('a')).walk())
+
+
+def test_flat_tree_is_reused_until_update(root_node):
+    tree = root_node.flat_tree()
+    assert root_node.flat_tree() is tree
+    root_node.update_paths(Path(), [(Path('z.py'), [])], [])
+    assert root_node.flat_tree() is not tree
+    assert len(root_node.flat_tree()) == 9
@@ -0,0 +1,105 @@
+from pathlib import Path
+
+import pytest
+
+from pytest_imports.model import DotPath, ImportInModule, RootNode
+
+
+def _add_module(root_node: RootNode, dot_path: str, *import_paths: str) -> None:
+    root_node.get_or_add(DotPath(dot_path), Path(*dot_path.split('.'))).add_imports(
+        ImportInModule(DotPath(p), line_no) for line_no, p in enumerate(import_paths, 1)
+    )
+
+
+@pytest.fixture
+def root_node():
+    root_node = RootNode()
+    _add_module(root_node, 'a.x', 'os', 'a.y.f', 'b.z')
+    _add_module(root_node, 'a.y', 'a.x', 'a.y.g', 'c.w.v')
+    _add_module(root_node, 'b.z', 'b')
+    _add_module(root_node, 'c.w', 'ext.sub')
+    _add_module(root_node, 'd', 'a.x')
+    return root_node
+
+
+def _chains(root_node, module_paths, import_path):
+    module_nodes = [root_node.get(DotPath(p)) for p in module_paths]
+    return [
+        [(str(node.dot_path), import_by.line_no) for node, import_by in chain]
+        for chain in root_node.module_graph().find_import_chains(
+            module_nodes, DotPath(import_path)
+        )
+    ]
+
+
+@pytest.mark.parametrize(
+    ('module_paths', 'import_path', 'chains'),
+    [
+        (['a.x'], 'os', [[('a.x', 1)]]),
+        (['a.y', 'd'], 'os', [[('a.y', 1), ('a.x', 1)], [('d', 1), ('a.x', 1)]]),
+        (
+            ['a.x', 'a.y', 'b.z', 'c.w', 'd'],
+            'ext',
+            [
+                [('a.x', 2), ('a.y', 3), ('c.w', 1)],
+                [('a.y', 3), ('c.w', 1)],
+                [('c.w', 1)],
+                [('d', 1), ('a.x', 2), ('a.y', 3), ('c.w', 1)],
+            ],
+        ),
+        (['d'], 'b', [[('d', 1), ('a.x', 3)]]),
+        (['b.z'], 'a', []),
+        (['a.x'], 'd', []),
+        (['a.x'], 'ext.other', []),
+    ],
+)
+def test_find_import_chains(root_node, module_paths, import_path, chains):
+    assert _chains(root_node, module_paths, import_path) == chains
+
+
+def test_find_import_chains_ignores_self_imports(root_node):
+    # a.y imports a.y.g (a symbol in a.y), which is not an edge to itself.
+    graph = root_node.module_graph()
+    assert _chains(root_node, ['a.y'], 'a.y') == [[('a.y', 2)]]
+    assert graph._edges[graph._vertices[DotPath('a.y')]] == {
+        graph._vertices[DotPath('a.x')]: 0,
+        graph._vertices[DotPath('c.w')]: 2,
+    }
+
+
+def test_module_graph_is_reused_until_update(root_node):
+    graph = root_node.module_graph()
+    assert root_node.module_graph() is graph
+    root_node.update_paths(Path(), [(Path('e.py'), [])], [])
+    assert root_node.module_graph() is not graph
+    assert root_node.module_graph()._vertices[DotPath('e')] == 8
+
+
+def _cycles(root_node, module_paths):
+    module_nodes = [root_node.get(DotPath(p)) for p in module_paths]
+    return [
+        [(str(node.dot_path), import_by.line_no) for node, import_by in cycle]
+        for cycle in root_node.module_graph().find_cycles(module_nodes)
+    ]
+
+
+@pytest.mark.parametrize(
+    ('module_paths', 'cycles'),
+    [
+        (['a.x', 'a.y', 'b.z', 'c.w', 'd'], [[('a.x', 2), ('a.y', 1)]]),
+        (['d', 'a.y', 'a.x'], [[('a.y', 1), ('a.x', 2)]]),
+        (['a.x', 'b.z', 'c.w', 'd'], []),
+    ],
+)
+def test_find_cycles(root_node, module_paths, cycles):
+    assert _cycles(root_node, module_paths) == cycles
+
+
+def test_find_cycles_shortest_per_group(root_node):
+    _add_module(root_node, 'e.p', 'e.q')
+    _add_module(root_node, 'e.q', 'e.r', 'e.p')
+    _add_module(root_node, 'e.r', 'e.p')
+    assert _cycles(root_node, ['a.x', 'a.y', 'e.p', 'e.q', 'e.r']) == [
+        [('a.x', 2), ('a.y', 1)],
+        [('e.p', 1), ('e.q', 2)],
+    ]
@@ -0,0 +1,56 @@
+from pathlib import Path
+
+import pytest
+
+from pytest_imports.model import DotPath, ImportIndex, ImportInModule, RootNode
+
+
+@pytest.fixture
+def root_node():
+    root_node = RootNode()
+    root_node.get_or_add(DotPath('a'), Path('a')).add_imports(
+        [
+            ImportInModule(DotPath('x.y'), line_no=1),
+            ImportInModule(DotPath('z'), line_no=2),
+        ]
+    )
+    root_node.get_or_add(DotPath('b.c'), Path('b', 'c')).add_imports(
+        [ImportInModule(DotPath('x'), line_no=3)]
+    )
+    root_node.get_or_add(DotPath('b.d'), Path('b', 'd')).add_imports(
+        [ImportInModule(DotPath('x.y.w'), line_no=4)]
+    )
+    return root_node
+
+
+@pytest.mark.parametrize(
+    ('import_path', 'line_nos'),
+    [
+        ('x', [1, 3, 4]),
+        ('x.y', [1, 4]),
+        ('x.y.w', [4]),
+        ('z', [2]),
+        ('x.w', []),
+        ('w', []),
+        ('', [1, 2, 3, 4]),
+    ],
+)
+def test_index_find(root_node, import_path, line_nos):
+    index = ImportIndex(root_node.walk())
+    assert [
+        import_by.line_no for _, import_by in index.find(DotPath(import_path))
+    ] == line_nos
+
+
+def test_index_find_returns_modules(root_node):
+    index = ImportIndex(root_node.walk())
+    assert [module_node.dot_path for module_node, _ in index.find(DotPath('x'))] == [
+        DotPath('a'),
+        DotPath('b.c'),
+        DotPath('b.d'),
+    ]
+
+
+def test_root_node_import_index_is_reused(root_node):
+    index = root_node.import_index()
+    assert root_node.import_index() is index
@@ -71,6 +71,20 @@ def test_node_get_or_add_root(tree_base_node):
         assert tree_base_node.get_or_add(DotPath(), Path())
 
 
+def test_node_get_or_add_self(tree_base_node):
+    node = tree_base_node.get(DotPath('2'))
+    assert node.get(DotPath()) is node
+    assert node.get_or_add(DotPath(), Path()) is node
+
+
+def test_node_get_or_add_below_node(tree_base_node):
+    node = tree_base_node.get(DotPath('2'))
+    new_node = node.get_or_add(DotPath('a.b'), Path('2', 'a', 'b'))
+    assert new_node.dot_path == DotPath('2.a.b')
+    assert tree_base_node.get(DotPath('2.a.b')) is new_node
+    assert node.get(DotPath('a')).file_path == Path('2', 'a')
+
+
 def test_node_add_imports():
     imports = [
         ImportInModule(DotPath('a'), line_no=1),
@@ -86,6 +100,29 @@ def test_node_add_imports():
     }
 
 
+def test_node_import_loader(mocker):
+    loader = mocker.Mock(return_value=[ImportInModule(DotPath('a'), line_no=1)])
+    root_node = RootNode()
+    node = root_node.get_or_add(DotPath('x'), Path('x.py'))
+    node.add_imports([ImportInModule(DotPath('b'), line_no=1)])
+    node.set_import_loader(loader)
+    assert not root_node.is_loaded()
+    loader.assert_not_called()
+    assert node.imports == [ImportInModule(DotPath('a'), line_no=1)]
+    assert node.imports == [ImportInModule(DotPath('a'), line_no=1)]
+    loader.assert_called_once_with()
+    assert root_node.is_loaded()
+
+
+def test_node_clear_imports_drops_loader(mocker):
+    loader = mocker.Mock(return_value=[ImportInModule(DotPath('a'), line_no=1)])
+    node = ModuleNode('x', DotPath('x'), Path('x.py'))
+    node.set_import_loader(loader)
+    node.clear_imports()
+    assert node.imports == []
+    loader.assert_not_called()
+
+
 def test_node_for_init_file():
     imports = [
         ImportInModule(DotPath('a'), line_no=1),
@@ -132,3 +169,182 @@ def test_node_walk_exclude(exclude, visited):
     assert {
         node.name for node in base_node.walk(exclude=[DotPath(p) for p in exclude])
     } == visited
+
+
+def test_root_node_walk():
+    root_node = RootNode()
+    root_node.get_or_add(DotPath('a.b'), Path())
+    root_node.get_or_add(DotPath('c'), Path())
+    assert [node.dot_path for node in root_node.walk()] == [
+        DotPath('a'),
+        DotPath('a.b'),
+        DotPath('c'),
+    ]
+    assert [node.dot_path for node in root_node.walk(exclude=[DotPath('a')])] == [
+        DotPath('c')
+    ]
+
+
+@pytest.mark.parametrize(
+    ('path', 'exclude', 'result'),
+    [
+        ('r', [], True),
+        ('r.a.b', [], True),
+        ('x', [], False),
+        ('r.a.b', ['a'], False),
+        ('r.a.b', ['a.b'], False),
+        ('r.a', ['a.b'], True),
+        ('r.a.d', ['a.b'], True),
+        ('r.a.b', [''], True),
+    ],
+)
+def test_node_contains(path, exclude, result):
+    root_node = RootNode()
+    root_node.get_or_add(DotPath('r.a.b'), Path())
+    root_node.get_or_add(DotPath('r.a.d'), Path())
+    root_node.get_or_add(DotPath('x'), Path())
+    base_node = root_node.get(DotPath('r'))
+    node = root_node.get(DotPath(path))
+    assert base_node.contains(node, exclude=[DotPath(p) for p in exclude]) == result
+    assert (node in base_node.walk(exclude=[DotPath(p) for p in exclude])) == result
+
+
+@pytest.fixture
+def package_root_node():
+    root_node = RootNode()
+    root_node.update_paths(
+        Path('/'),
+        changed=[
+            (Path('/a/__init__.py'), [ImportInModule(DotPath('x'), 1)]),
+            (Path('/a/b/c.py'), [ImportInModule(DotPath('y'), 1)]),
+            (Path('/a/d.py'), []),
+        ],
+        deleted=[],
+    )
+    return root_node
+
+
+def test_node_add_module_files():
+    root_node = RootNode()
+    root_node.add_module_files(
+        Path('/p'),
+        [
+            (Path('/p/a/b/c.py'), [ImportInModule(DotPath('x'), 1)]),
+            (Path('/p/a/b/d.py'), []),
+            (Path('/p/a/__init__.py'), [ImportInModule(DotPath('y'), 2)]),
+            (Path('/p/e.f.py'), []),
+        ],
+    )
+    assert [(str(node.dot_path), node.file_path) for node in root_node.walk()] == [
+        ('a', Path('/p/a/__init__.py')),
+        ('a.b', Path('/p/a/b')),
+        ('a.b.c', Path('/p/a/b/c.py')),
+        ('a.b.d', Path('/p/a/b/d.py')),
+        ('e.f', Path('/p/e.f.py')),
+    ]
+    assert root_node.get(DotPath('a')).imports == [ImportInModule(DotPath('y'), 2)]
+    assert root_node.get(DotPath('a.b.c')).imports == [ImportInModule(DotPath('x'), 1)]
+
+
+def test_node_add_module_file_namespace_package():
+    root_node = RootNode()
+    root_node.add_module_file(Path('/p'), Path('/p/a/b/__init__.py'), [])
+    assert root_node.get(DotPath('a')).file_path == Path('/p/a')
+    assert root_node.get(DotPath('a.b')).file_path == Path('/p/a/b/__init__.py')
+
+
+def test_node_add_module_file_after_directory_of_same_name():
+    root_node = RootNode()
+    root_node.add_module_file(Path('/p'), Path('/p/a/b.py'), [])
+    root_node.add_module_file(Path('/p'), Path('/p/a.py'), [])
+    assert root_node.get(DotPath('a')).file_path == Path('/p/a.py')
+    assert root_node.get(DotPath('a.b')).file_path == Path('/p/a/b.py')
+
+
+@pytest.mark.parametrize(
+    'module_paths',
+    [
+        [Path('/p/a.py'), Path('/p/a/__init__.py')],
+        [Path('/p/a/__init__.py'), Path('/p/a.py')],
+    ],
+)
+def test_node_add_module_file_conflicts_with_package(module_paths):
+    root_node = RootNode()
+    root_node.add_module_file(Path('/p'), module_paths[0], [])
+    with pytest.raises(ValueError, match=r'Module /p/a\.py has the same name as'):
+        root_node.add_module_file(Path('/p'), module_paths[1], [])
+
+
+def test_node_update_paths_keeps_module_with_directory():
+    root_node = RootNode()
+    root_node.add_module_files(
+        Path('/p'),
+        [(Path('/p/a.py'), []), (Path('/p/a/b.py'), []), (Path('/p/c.py'), [])],
+    )
+    root_node.update_paths(Path('/p'), changed=[], deleted=[Path('/p/c.py')])
+    assert not root_node.get(DotPath('a')).is_directory
+    root_node.update_paths(Path('/p'), changed=[], deleted=[Path('/p/a.py')])
+    assert root_node.get(DotPath('a')).is_directory
+    root_node.update_paths(Path('/p'), changed=[], deleted=[Path('/p/a/b.py')])
+    assert not root_node.children()
+
+
+def test_node_update_paths_changed(package_root_node):
+    index = package_root_node.import_index()
+    package_root_node.update_paths(
+        Path('/'),
+        changed=[(Path('/a/b/c.py'), [ImportInModule(DotPath('z'), 2)])],
+        deleted=[],
+    )
+    assert package_root_node.get(DotPath('a.b.c')).imports == [
+        ImportInModule(DotPath('z'), 2)
+    ]
+    assert package_root_node.import_index() is not index
+    assert not package_root_node.import_index().find(DotPath('y'))
+
+
+def test_node_update_paths_deleted_module(package_root_node):
+    package_root_node.update_paths(
+        Path('/'), changed=[], deleted=[Path('/a/b/c.py'), Path('/a/x.py')]
+    )
+    assert package_root_node.get(DotPath('a.b')) is None
+    assert package_root_node.get(DotPath('a.b.c')) is None
+    assert package_root_node.get(DotPath('a.d'))
+    assert not package_root_node.import_index().find(DotPath('y'))
+
+
+def test_node_update_paths_deleted_init_file(package_root_node):
+    package_root_node.update_paths(
+        Path('/'), changed=[], deleted=[Path('/a/__init__.py')]
+    )
+    node = package_root_node.get(DotPath('a'))
+    assert node.file_path == Path('/a')
+    assert not node.imports
+    package_root_node.update_paths(
+        Path('/'), changed=[], deleted=[Path('/a/b/c.py'), Path('/a/d.py')]
+    )
+    assert not package_root_node.children()
+
+
+def test_root_node_merge():
+    root_node_1 = RootNode()
+    node_a = root_node_1.get_or_add(DotPath('a.b'), Path('1', 'a', 'b'))
+    root_node_2 = RootNode()
+    node_c = root_node_2.get_or_add(DotPath('c'), Path('2', 'c'))
+    merged_node = RootNode.merge([root_node_1, root_node_2])
+    assert [node.dot_path for node in merged_node.walk()] == [
+        DotPath('a'),
+        DotPath('a.b'),
+        DotPath('c'),
+    ]
+    assert merged_node.get(DotPath('a.b')) is node_a
+    assert merged_node.get(DotPath('c')) is node_c
+
+
+def test_root_node_merge_conflict():
+    root_node_1 = RootNode()
+    root_node_1.get_or_add(DotPath('a.b'), Path('1', 'a', 'b'))
+    root_node_2 = RootNode()
+    root_node_2.get_or_add(DotPath('a.c'), Path('2', 'a', 'c'))
+    with pytest.raises(ValueError, match="top-level name 'a'"):
+        RootNode.merge([root_node_1, root_node_2])
@@ -0,0 +1,125 @@
+from pathlib import Path
+
+import pytest
+
+from pytest_imports.model import (
+    DotPath,
+    ImportIndex,
+    ImportInModule,
+    PathPattern,
+    RootNode,
+)
+
+
+@pytest.mark.parametrize(
+    ('pattern', 'path', 'depth'),
+    [
+        ('a.b', 'a.b', 2),
+        ('a.b', 'a.b.c', 2),
+        ('a.b', 'a', None),
+        ('a.*.c', 'a.b.c', 3),
+        ('a.*.c', 'a.c', None),
+        ('a.*.c', 'a.b.d.c', None),
+        ('a.**.c', 'a.c', 2),
+        ('a.**.c', 'a.b.d.c.e', 4),
+        ('a.**.c', 'a.b.d', None),
+        ('a.**', 'a', 1),
+        ('**.c', 'c', 1),
+        ('**.c', 'a.c.c', 2),
+        ('a.**.**.c', 'a.b.c', 3),
+        ('a.test_*', 'a.test_x.y', 2),
+        ('a.test_*', 'a.tests', None),
+        ('a.?', 'a.b', 2),
+        ('a.[bc]', 'a.c', 2),
+        ('a.[bc]', 'a.d', None),
+        ('*', 'x.y', 1),
+        ('x.*', 'y', None),
+    ],
+)
+def test_pattern_match_depth(pattern, path, depth):
+    assert PathPattern(pattern).match_depth(DotPath(path)) == depth
+
+
+def test_pattern_reuses_steps():
+    pattern = PathPattern('a.*.c')
+    assert pattern.match_depth(DotPath('a.b.c'))
+    steps = dict(pattern._steps)
+    assert pattern.match_depth(DotPath('a.b.c'))
+    assert pattern._steps == steps
+
+
+@pytest.mark.parametrize(
+    ('path', 'result'),
+    [('a.b', False), ('a.*', True), ('a.b?', True), ('a.[bc]', True)],
+)
+def test_pattern_is_pattern(path, result):
+    assert PathPattern.is_pattern(path) == result
+
+
+def test_pattern_repr():
+    assert repr(PathPattern('a.*')) == "PathPattern('a.*')"
+
+
+@pytest.fixture
+def root_node():
+    root_node = RootNode()
+    for path in [
+        'app.a.adapters.x',
+        'app.b.adapters',
+        'app.b.core',
+        'app.tests',
+        'app.c.d.tests.e.tests',
+        'lib.adapters',
+    ]:
+        root_node.get_or_add(DotPath(path), Path(*path.split('.'))).add_imports(
+            [ImportInModule(DotPath(path).parent, 1)]
+        )
+    return root_node
+
+
+@pytest.mark.parametrize(
+    ('pattern', 'paths'),
+    [
+        ('app.*.adapters', ['app.a.adapters', 'app.b.adapters']),
+        ('*.adapters', ['lib.adapters']),
+        ('**.adapters', ['app.a.adapters', 'app.b.adapters', 'lib.adapters']),
+        ('app.**.tests', ['app.tests', 'app.c.d.tests']),
+        ('app.*', ['app.a', 'app.b', 'app.tests', 'app.c']),
+        ('*', ['app', 'lib']),
+        ('app.*.x', []),
+        ('other.*', []),
+    ],
+)
+def test_flat_tree_find(root_node, pattern, paths):
+    nodes = root_node.flat_tree().find(PathPattern(pattern))
+    assert [str(node.dot_path) for node in nodes] == paths
+
+
+def test_flat_tree_find_in_module_node_tree(root_node):
+    tree = root_node.get(DotPath('app.c')).flat_tree()
+    nodes = tree.find(PathPattern('app.**.e'))
+    assert [str(node.dot_path) for node in nodes] == ['app.c.d.tests.e']
+
+
+@pytest.mark.parametrize(
+    ('pattern', 'paths'),
+    [
+        ('app.*.adapters', ['app.a.adapters.x']),
+        ('app.**.tests', ['app.c.d.tests.e.tests']),
+        (
+            'app.*',
+            [
+                'app.a.adapters.x',
+                'app.b.adapters',
+                'app.b.core',
+                'app.c.d.tests.e.tests',
+            ],
+        ),
+        ('*.*.*.*', ['app.c.d.tests.e.tests']),
+        ('lib.*', []),
+    ],
+)
+def test_index_find_pattern(root_node, pattern, paths):
+    index = ImportIndex(root_node.walk())
+    results = index.find_pattern(PathPattern(pattern))
+    assert [str(node.dot_path) for node, _ in results] == paths
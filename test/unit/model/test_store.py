@@ -0,0 +1,73 @@
+import pickle
+from pathlib import Path
+
+import pytest
+
+from pytest_imports.model import DotPath, ImportInModule, ImportStore, ModuleNode
+
+IMPORTS = [
+    ImportInModule(DotPath('x.y'), line_no=1),
+    ImportInModule(DotPath('z'), line_no=2, level=1),
+]
+
+
+@pytest.fixture
+def store():
+    return ImportStore()
+
+
+def test_store_columns(store):
+    node = ModuleNode('a', DotPath('a'), Path('a'), store=store)
+    node.add_imports(IMPORTS)
+    assert len(store) == 2
+    assert store.module(node_id := store.module_ids[0]) is node
+    assert list(store.module_ids) == [node_id, node_id]
+    assert list(store.path_ids) == [DotPath('x.y').id, DotPath('z').id]
+    assert list(store.line_nos) == [1, 2]
+    assert list(store.levels) == [0, 1]
+
+
+def test_module_imports_view(store):
+    node = ModuleNode('a', DotPath('a'), Path('a'), store=store)
+    node.add_imports(IMPORTS)
+    assert len(node.imports) == 2
+    assert node.imports[1] == IMPORTS[1]
+    assert node.imports[-1] == IMPORTS[1]
+    assert node.imports[1:] == IMPORTS[1:]
+    assert node.imports == IMPORTS
+    assert node.imports != object()
+    assert repr(node.imports) == f'ModuleImports({IMPORTS})'
+    assert list(node.imports.columns()) == [
+        (DotPath('x.y').id, 1, 0),
+        (DotPath('z').id, 2, 1),
+    ]
+
+
+def test_add_imports_moves_rows(store):
+    node_a = ModuleNode('a', DotPath('a'), Path('a'), store=store)
+    node_b = ModuleNode('b', DotPath('b'), Path('b'), store=store)
+    node_a.add_imports(IMPORTS[:1])
+    node_a.add_imports(IMPORTS[1:])
+    node_b.add_imports(IMPORTS)
+    node_a.add_imports(IMPORTS)
+    assert node_a.imports == IMPORTS + IMPORTS
+    assert node_b.imports == IMPORTS
+    assert node_a.imports.rows == range(4, 8)
+    assert list(store.module_ids[:2]) == [-1, -1]
+
+
+def test_store_pickle_stores_paths_instead_of_ids(store):
+    node = ModuleNode('a', DotPath('a'), Path('a'), store=store)
+    node.add_imports(IMPORTS + IMPORTS[:1])
+    paths, positions = store.__getstate__()['_path_ids']
+    assert paths == sorted(
+        [DotPath('x.y'), DotPath('z')], key=lambda dot_path: dot_path.id
+    )
+    assert [paths[i] for i in positions] == [
+        DotPath('x.y'),
+        DotPath('z'),
+        DotPath('x.y'),
+    ]
+    loaded_node = pickle.loads(pickle.dumps(node))
+    assert loaded_node.imports == IMPORTS + IMPORTS[:1]
+    assert loaded_node._store.module(0) is loaded_node
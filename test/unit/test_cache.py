@@ -0,0 +1,135 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePath
+
+import pytest
+
+from pytest_imports.cache import (
+    CACHE_VERSION,
+    FileSignature,
+    ImportCache,
+    content_digest,
+)
+from pytest_imports.model import DotPath, ImportInModule
+
+IMPORTS = [
+    ImportInModule(DotPath('x'), line_no=1),
+    ImportInModule(DotPath(('a.b', 'c')), line_no=2, level=1),
+]
+
+
+@pytest.fixture
+def cache_file(tmp_path):
+    return tmp_path / 'cache' / 'imports.json'
+
+
+def test_signature_from_stat(tmp_path):
+    path = tmp_path / 'a.py'
+    path.write_bytes(b'import x')
+    stat = path.stat()
+    assert FileSignature.from_stat(stat) == FileSignature(
+        stat.st_mtime_ns, stat.st_size
+    )
+    assert FileSignature.from_stat(stat, b'import x').digest == content_digest(
+        b'import x'
+    )
+
+
+def test_cache_roundtrip(cache_file):
+    cache = ImportCache(cache_file)
+    signature = FileSignature(mtime_ns=1, size=2)
+    assert cache.get(PurePath('a.py'), signature) is None
+    cache.put(PurePath('a.py'), signature, IMPORTS)
+    cache.save()
+    assert ImportCache(cache_file).get(PurePath('a.py'), signature) == IMPORTS
+
+
+@pytest.mark.parametrize(
+    'signature',
+    [FileSignature(mtime_ns=3, size=2), FileSignature(mtime_ns=1, size=3)],
+)
+def test_cache_stale_entry(cache_file, signature):
+    cache = ImportCache(cache_file)
+    cache.put(PurePath('a.py'), FileSignature(mtime_ns=1, size=2), IMPORTS)
+    cache.save()
+    assert ImportCache(cache_file).get(PurePath('a.py'), signature) is None
+
+
+def test_cache_verify_hash(cache_file):
+    cache = ImportCache(cache_file, verify_hash=True)
+    cache.put(PurePath('a.py'), FileSignature(1, 2, 'abc'), IMPORTS)
+    cache.save()
+    cache = ImportCache(cache_file, verify_hash=True)
+    assert cache.get(PurePath('a.py'), FileSignature(5, 6, 'abc')) == IMPORTS
+    assert cache.get(PurePath('a.py'), FileSignature(1, 2, 'abd')) is None
+
+
+def test_cache_verify_hash_without_digest(cache_file):
+    cache = ImportCache(cache_file)
+    cache.put(PurePath('a.py'), FileSignature(1, 2), IMPORTS)
+    cache.save()
+    cache = ImportCache(cache_file, verify_hash=True)
+    assert cache.get(PurePath('a.py'), FileSignature(1, 2, 'abc')) is None
+
+
+def test_cache_drops_unused_entries(cache_file):
+    cache = ImportCache(cache_file)
+    cache.put(PurePath('a.py'), FileSignature(1, 2), IMPORTS)
+    cache.put(PurePath('b.py'), FileSignature(1, 2), IMPORTS)
+    cache.save()
+    cache = ImportCache(cache_file)
+    assert cache.get(PurePath('a.py'), FileSignature(1, 2))
+    cache.save()
+    cache = ImportCache(cache_file)
+    assert cache.get(PurePath('a.py'), FileSignature(1, 2))
+    assert cache.get(PurePath('b.py'), FileSignature(1, 2)) is None
+
+
+def test_cache_keeps_unused_entries_without_prune(cache_file):
+    cache = ImportCache(cache_file)
+    cache.put(PurePath('a.py'), FileSignature(1, 2), IMPORTS)
+    cache.put(PurePath('b.py'), FileSignature(1, 2), IMPORTS)
+    cache.save()
+    cache = ImportCache(cache_file)
+    cache.put(PurePath('a.py'), FileSignature(3, 4), [])
+    cache.save(prune=False)
+    cache = ImportCache(cache_file)
+    assert cache.get(PurePath('a.py'), FileSignature(3, 4)) == []
+    assert cache.get(PurePath('b.py'), FileSignature(1, 2)) == IMPORTS
+
+
+def test_cache_concurrent_saves(cache_file):
+    def save(i):
+        cache = ImportCache(cache_file)
+        cache.put(PurePath(f'{i}.py'), FileSignature(1, 2), IMPORTS)
+        cache.save()
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(save, range(32)))
+    assert list(cache_file.parent.iterdir()) == [cache_file]
+    # Note: The last save wins, with the entry of its own cache.
+    cache = ImportCache(cache_file)
+    assert any(cache.get(PurePath(f'{i}.py'), FileSignature(1, 2)) for i in range(32))
+
+
+def test_cache_failed_save_removes_temporary_file(cache_file, mocker):
+    cache = ImportCache(cache_file)
+    mocker.patch('pytest_imports.cache.os.replace', side_effect=OSError('full'))
+    with pytest.raises(OSError, match='full'):
+        cache.save()
+    assert not list(cache_file.parent.iterdir())
+
+
+def test_cache_ignores_other_version(cache_file):
+    cache_file.parent.mkdir()
+    cache_file.write_text(f'{{"version": {CACHE_VERSION + 1}, "entries": {{}}}}')
+    cache = ImportCache(cache_file)
+    assert cache.get(PurePath('a.py'), FileSignature(1, 2)) is None
+
+
+def test_cache_ignores_corrupt_file(cache_file, caplog):
+    cache_file.parent.mkdir()
+    cache_file.write_text('{"version"')
+    cache = ImportCache(cache_file)
+    assert cache.get(PurePath('a.py'), FileSignature(1, 2)) is None
+    assert any(record.levelno == logging.WARNING for record in caplog.records)
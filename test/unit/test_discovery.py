@@ -0,0 +1,179 @@
+import logging
+import os
+from pathlib import Path, PurePosixPath
+
+import pytest
+
+from pytest_imports import discovery
+from pytest_imports.discovery import walk_module_files
+
+
+def _make_files(base_path: Path, *relative_paths: str) -> None:
+    for relative_path in relative_paths:
+        path = base_path / relative_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('')
+
+
+def _walk(base_path: Path, **kwargs) -> list[str]:
+    return [
+        Path(entry.path).relative_to(base_path).as_posix()
+        for entry in walk_module_files(base_path, **kwargs)
+    ]
+
+
+def test_walk_module_files(tmp_path):
+    _make_files(
+        tmp_path,
+        'b.py',
+        'a/__init__.py',
+        'a/c.py',
+        'a/d.txt',
+        'a/__pycache__/c.py',
+        '.venv/lib/x.py',
+        'node_modules/y/z.py',
+        '.hidden.py',
+    )
+    (tmp_path / 'e.py').mkdir()
+    assert _walk(tmp_path) == ['b.py', 'a/__init__.py', 'a/c.py']
+
+
+def test_walk_module_files_yields_files_before_directories(tmp_path):
+    _make_files(tmp_path, 'x/y/z.py', 'x/a.py', 'x.py', 'w.py')
+    assert _walk(tmp_path) == ['w.py', 'x.py', 'x/a.py', 'x/y/z.py']
+
+
+def test_walk_module_files_reuses_stat(tmp_path):
+    _make_files(tmp_path, 'a.py')
+    (entry,) = walk_module_files(tmp_path)
+    assert entry.stat().st_mtime_ns == (tmp_path / 'a.py').stat().st_mtime_ns
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink'), reason='requires symlinks')
+def test_walk_module_files_skips_directory_symlinks(tmp_path):
+    _make_files(tmp_path, 'a/b.py')
+    (tmp_path / 'c').symlink_to(tmp_path / 'a', target_is_directory=True)
+    (tmp_path / 'd.py').symlink_to(tmp_path / 'a' / 'b.py')
+    assert _walk(tmp_path) == ['d.py', 'a/b.py']
+
+
+@pytest.mark.parametrize(
+    ('exclude_dirs', 'expected'),
+    [
+        ([], ['a/b/c.py', 'a/d/e.py', 'b/f.py', 'x/a/b/g.py']),
+        (['b'], ['a/d/e.py']),
+        (['a/b'], ['a/d/e.py', 'b/f.py', 'x/a/b/g.py']),
+        (['/a/b/'], ['a/d/e.py', 'b/f.py', 'x/a/b/g.py']),
+        (['*/b'], ['a/d/e.py', 'b/f.py']),
+        (['[ax]'], ['b/f.py']),
+    ],
+)
+def test_walk_module_files_exclude_dirs(tmp_path, exclude_dirs, expected):
+    _make_files(tmp_path, 'a/b/c.py', 'a/d/e.py', 'b/f.py', 'x/a/b/g.py')
+    assert _walk(tmp_path, exclude_dirs=exclude_dirs) == expected
+
+
+def test_walk_module_files_unreadable_directory(tmp_path, mocker, caplog):
+    _make_files(tmp_path, 'a/b.py', 'c.py')
+    scandir = os.scandir
+
+    def mock_scandir(path):
+        if Path(path).name == 'a':
+            raise PermissionError('denied')
+        return scandir(path)
+
+    mocker.patch.object(discovery.os, 'scandir', mock_scandir)
+    assert _walk(tmp_path) == ['c.py']
+    assert caplog.records[0].levelno == logging.WARNING
+
+
+@pytest.fixture
+def repo_path(tmp_path):
+    (tmp_path / '.git').mkdir()
+    (tmp_path / '.gitignore').write_text('build/\n/src/gen*\n*_pb2.py\n')
+    _make_files(
+        tmp_path,
+        'src/a/b.py',
+        'src/a/b_pb2.py',
+        'src/build/c.py',
+        'src/generated/d.py',
+        'src/gen.py',
+        'src/e/gen.py',
+        'src/e/f.py',
+        'src/e/g.py',
+        'src/e/h/i.py',
+    )
+    (tmp_path / 'src' / 'e' / '.gitignore').write_text('# comment\n\n*.py\n!f.py\nh/\n')
+    return tmp_path
+
+
+def test_walk_module_files_gitignore(repo_path):
+    assert _walk(repo_path / 'src', use_gitignore=True) == ['a/b.py', 'e/f.py']
+    assert len(_walk(repo_path / 'src')) == 9
+
+
+def test_walk_module_files_gitignore_in_base_path(repo_path):
+    (repo_path / 'src' / '.gitignore').write_text('a/\n')
+    assert _walk(repo_path / 'src', use_gitignore=True) == ['e/f.py']
+
+
+def test_walk_module_files_gitignore_outside_repository(repo_path):
+    (repo_path / '.git').rmdir()
+    assert len(_walk(repo_path / 'src', use_gitignore=True)) == 9
+
+
+@pytest.mark.parametrize(
+    ('pattern', 'path', 'is_dir', 'matches'),
+    [
+        ('foo', 'foo', False, True),
+        ('foo', 'a/foo', True, True),
+        ('foo', 'foobar', False, False),
+        ('foo/', 'a/foo', False, False),
+        ('foo/', 'a/foo', True, True),
+        ('/foo', 'a/foo', False, False),
+        ('a/foo', 'a/foo', False, True),
+        ('a/foo', 'b/a/foo', False, False),
+        ('*.py', 'a/b.py', False, True),
+        ('a/*.py', 'a/b/c.py', False, False),
+        ('a?.py', 'ab.py', False, True),
+        ('a?.py', 'a/.py', False, False),
+        ('**/foo', 'a/b/foo', False, True),
+        ('**/foo', 'foo', False, True),
+        ('a/**/b', 'a/b', False, True),
+        ('a/**/b', 'a/x/y/b', False, True),
+        ('a/**', 'a/x/y', False, True),
+        ('[abc].py', 'b.py', False, True),
+        ('[!abc].py', 'b.py', False, False),
+        ('[!abc].py', 'd.py', False, True),
+        ('[a', '[a', False, True),
+        ('\\#foo', '#foo', False, True),
+        ('\\!foo', '!foo', False, True),
+        ('foo\\*', 'foo*', False, True),
+        ('foo\\*', 'foox', False, False),
+        ('foo\\ ', 'foo ', False, True),
+        ('foo  ', 'foo', False, True),
+    ],
+)
+def test_gitignore_pattern(pattern, path, is_dir, matches):
+    gitignore_pattern = discovery._GitignorePattern.parse(pattern)
+    assert gitignore_pattern is not None
+    assert gitignore_pattern.matches(path, is_dir) is matches
+
+
+@pytest.mark.parametrize('line', ['', '   ', '# comment'])
+def test_gitignore_pattern_blank(line):
+    assert discovery._GitignorePattern.parse(line) is None
+
+
+def test_gitignore_negation():
+    gitignore = discovery._Gitignore(
+        [
+            ('', 0, pattern)
+            for line in ['*.py', '!a*.py', 'ab.py']
+            if (pattern := discovery._GitignorePattern.parse(line))
+        ]
+    )
+    assert gitignore.ignores(PurePosixPath('x.py'), is_dir=False)
+    assert not gitignore.ignores(PurePosixPath('a.py'), is_dir=False)
+    assert gitignore.ignores(PurePosixPath('ab.py'), is_dir=False)
+    assert not gitignore.ignores(PurePosixPath('x.txt'), is_dir=False)
@@ -0,0 +1,61 @@
+import pytest
+
+from pytest_imports.graph import Digraph
+
+
+@pytest.fixture
+def digraph():
+    # 0 -> 1 <-> 2 -> 3, 4 -> 3, 5
+    return Digraph([[1], [2], [1, 3], [], [3], []])
+
+
+def test_strongly_connected_components(digraph):
+    components = digraph.strongly_connected_components()
+    assert sorted(sorted(c) for c in components) == [[0], [1, 2], [3], [4], [5]]
+    position = {v: i for i, c in enumerate(components) for v in c}
+    # Each component comes after the components that it has edges to.
+    for vertex in range(len(digraph)):
+        for successor in digraph.successors(vertex):
+            assert position[successor] <= position[vertex]
+
+
+def test_strongly_connected_components_deep_graph():
+    n_vertices = 100_000
+    digraph = Digraph([[v + 1] for v in range(n_vertices - 1)] + [[0]])
+    (component,) = digraph.strongly_connected_components()
+    assert sorted(component) == list(range(n_vertices))
+
+
+@pytest.mark.parametrize(
+    ('vertex', 'targets', 'reaches'),
+    [
+        (0, [3], True),
+        (0, [0], True),
+        (1, [2], True),
+        (2, [1], True),
+        (3, [0, 1, 2, 4, 5], False),
+        (4, [1, 2], False),
+        (5, [3], False),
+        (4, [], False),
+    ],
+)
+def test_reachability(digraph, vertex, targets, reaches):
+    reachability = digraph.reachability()
+    assert reachability.reaches(vertex, reachability.mask(targets)) is reaches
+
+
+def test_next_hops(digraph):
+    assert list(digraph.next_hops([3])) == [1, 2, 3, 3, 3, -1]
+    assert list(digraph.next_hops([2, 4])) == [1, 2, 2, -1, 4, -1]
+
+
+def test_shortest_cycle():
+    # 0 -> 1 -> 2 -> 3 -> 0, 1 -> 3
+    digraph = Digraph([[1], [2, 3], [3], [0]])
+    assert digraph.shortest_cycle([3, 2, 1, 0]) == [0, 1, 3]
+
+
+def test_shortest_cycle_stays_in_component(digraph):
+    assert digraph.shortest_cycle([2, 1]) == [1, 2]
+    with pytest.raises(ValueError, match='not a strongly connected component'):
+        digraph.shortest_cycle([0, 1])
@@ -0,0 +1,63 @@
+from pathlib import Path
+
+from pytest_imports.profile import Profile
+
+
+def test_profile_phase():
+    profile = Profile()
+    with profile.phase('model', count=2):
+        pass
+    with profile.phase('model', count=1):
+        pass
+    stats = profile.phases['model']
+    assert stats.count == 3
+    assert stats.seconds > 0
+    assert stats.peak_rss_bytes is not None
+
+
+def test_profile_add_time():
+    profile = Profile()
+    profile.add_time('tree', 0.5, count=1)
+    profile.add_time('tree', 0.25, count=1)
+    assert profile.phases['tree'].seconds == 0.75
+    assert profile.phases['tree'].count == 2
+    assert profile.phases['tree'].peak_rss_bytes is None
+
+
+def test_profile_slowest():
+    profile = Profile(top_n=2)
+    for i, seconds in enumerate([0.1, 0.3, 0.2]):
+        profile.add_file(Path(f'{i}.py'), seconds)
+        profile.add_scope(f'scope{i}', seconds)
+    assert profile.slowest_files() == [(0.3, Path('1.py')), (0.2, Path('2.py'))]
+    assert profile.slowest_scopes() == [(0.3, 'scope1'), (0.2, 'scope2')]
+    assert profile.phases['parse'].count == 3
+
+
+def test_profile_summary():
+    profile = Profile()
+    profile.add_file(Path('a.py'), 0.5)
+    profile.add_scope('a', 0.25)
+    with profile.phase('rules'):
+        pass
+    lines = profile.summary_lines()
+    assert lines[0] == 'phases:'
+    assert '2/s' in lines[1]
+    assert 'peak RSS' in lines[2]
+    assert lines[-4:] == [
+        'slowest files to parse (top 10):',
+        '      0.500s  a.py',
+        'slowest rule scopes (top 10):',
+        '      0.250s  a',
+    ]
+
+
+def test_profile_to_dict():
+    profile = Profile()
+    profile.add_file(Path('a.py'), 0.5)
+    profile.add_scope('a', 0.25)
+    assert profile.to_dict() == {
+        'phases': {'parse': {'seconds': 0.5, 'count': 1, 'peak_rss_bytes': None}},
+        'slowest_files': [{'seconds': 0.5, 'path': 'a.py'}],
+        'slowest_scopes': [{'seconds': 0.25, 'scope': 'a'}],
+    }
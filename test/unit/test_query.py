@@ -1,19 +1,55 @@
+from collections.abc import Sequence
+from pathlib import Path
+
 import pytest
 
-from pytest_imports.model import DotPath
+from pytest_imports.model import (
+    DotPath,
+    FlatTree,
+    ImportInModule,
+    ModuleNode,
+    NodeRanges,
+    PathPattern,
+    RootNode,
+)
 from pytest_imports.query import (
+    Via,
+    _compile_allowlist,
     _find_matching_imports,
-    _find_matching_private_imports,
-    _find_within_parent_imports,
+    compile_rules,
+    evaluate_rules,
+    filter_rules_by_changes,
+    layers,
+    may_only_import,
     must_import,
+    must_import_transitively,
+    must_not_have_cycles,
     must_not_import,
     must_not_import_private,
+    must_not_import_transitively,
     must_not_import_within_parent,
     project,
     scope,
 )
 
 
+def _select(root_node: RootNode, path: str, exclude: Sequence[str] = ()) -> NodeRanges:
+    return root_node.flat_tree().select(
+        root_node.get(DotPath(path)), [DotPath(p) for p in exclude]
+    )
+
+
+def _find(
+    root_node: RootNode,
+    nodes: NodeRanges,
+    import_path: DotPath | PathPattern,
+    via: Via | None = None,
+) -> list[tuple[ModuleNode, ImportInModule]]:
+    return list(
+        _find_matching_imports(nodes, import_path, via, root_node.import_index())
+    )
+
+
 def test_scope_hashable():
     s = scope('foo.bar')
     assert {s: 'value'}[s] == 'value'
@@ -72,12 +108,12 @@ def test_must_not_import_private_with_path():
     [{'a.py': 'from b import x'}],
 )
 def test_find_matching_imports_flat(imports_root_node):
-    a = imports_root_node.get(DotPath('a'))
-    assert list(_find_matching_imports(a, [], DotPath('b'), None))
-    assert list(_find_matching_imports(a, [], DotPath('b.x'), None))
-    assert not list(_find_matching_imports(a, [], DotPath('c'), None))
-    assert not list(_find_matching_imports(a, [], DotPath('b.y'), None))
-    assert not list(_find_matching_imports(a, [], DotPath('b.x.y'), None))
+    a = _select(imports_root_node, 'a')
+    assert _find(imports_root_node, a, DotPath('b'))
+    assert _find(imports_root_node, a, DotPath('b.x'))
+    assert not _find(imports_root_node, a, DotPath('c'))
+    assert not _find(imports_root_node, a, DotPath('b.y'))
+    assert not _find(imports_root_node, a, DotPath('b.x.y'))
 
 
 @pytest.mark.parametrize(
@@ -85,9 +121,9 @@ def test_find_matching_imports_flat(imports_root_node):
     [{'d': {'e.py': 'import x'}}],
 )
 def test_find_matching_imports_nested(imports_root_node):
-    d = imports_root_node.get(DotPath('d'))
-    assert list(_find_matching_imports(d, [], DotPath('x'), None))
-    assert not list(_find_matching_imports(d, [], DotPath('y'), None))
+    d = _select(imports_root_node, 'd')
+    assert _find(imports_root_node, d, DotPath('x'))
+    assert not _find(imports_root_node, d, DotPath('y'))
 
 
 @pytest.mark.parametrize(
@@ -95,8 +131,8 @@ def test_find_matching_imports_nested(imports_root_node):
     [{'a.py': 'import x\nimport x.y'}],
 )
 def test_find_matching_imports_returns_line_numbers(imports_root_node):
-    a = imports_root_node.get(DotPath('a'))
-    matches = list(_find_matching_imports(a, [], DotPath('x'), None))
+    a = _select(imports_root_node, 'a')
+    matches = _find(imports_root_node, a, DotPath('x'))
     assert len(matches) == 2
     assert matches[0][1].line_no == 1
     assert matches[1][1].line_no == 2
@@ -114,8 +150,8 @@ def test_find_matching_imports_returns_line_numbers(imports_root_node):
     ],
 )
 def test_find_matching_imports_via(imports_root_node, via, n_matches):
-    a = imports_root_node.get(DotPath('a'))
-    matches = list(_find_matching_imports(a, [], DotPath('x'), via))
+    a = _select(imports_root_node, 'a')
+    matches = _find(imports_root_node, a, DotPath('x'), via)
     assert len(matches) == n_matches
 
 
@@ -124,8 +160,8 @@ def test_find_matching_imports_via(imports_root_node, via, n_matches):
     [{'r': {'a.py': 'import x', 'b.py': 'import x'}}],
 )
 def test_find_matching_imports_exclude(imports_root_node):
-    r = imports_root_node.get(DotPath('r'))
-    matches = list(_find_matching_imports(r, [DotPath('b')], DotPath('x'), None))
+    r = _select(imports_root_node, 'r', ['b'])
+    matches = _find(imports_root_node, r, DotPath('x'))
     assert len(matches) == 1
     assert 'a.py' in str(matches[0][0].file_path)
 
@@ -135,10 +171,8 @@ def test_find_matching_imports_exclude(imports_root_node):
     [{'r': {'a.py': 'import x', 'b.py': 'import x'}}],
 )
 def test_find_matching_imports_multiple_exclude(imports_root_node):
-    r = imports_root_node.get(DotPath('r'))
-    matches = list(
-        _find_matching_imports(r, [DotPath('a'), DotPath('b')], DotPath('x'), None)
-    )
+    r = _select(imports_root_node, 'r', ['a', 'b'])
+    matches = _find(imports_root_node, r, DotPath('x'))
     assert len(matches) == 0
 
 
@@ -146,49 +180,44 @@ def test_find_matching_imports_multiple_exclude(imports_root_node):
     'project_structure',
     [{'a.py': 'from b import _x'}],
 )
-def test_find_matching_private_imports_matches_private(imports_root_node):
-    a = imports_root_node.get(DotPath('a'))
-    assert list(_find_matching_private_imports(a, [], None))
+def test_must_not_import_private_matches_private(imports_root_node):
+    assert evaluate_rules(imports_root_node, {'a': must_not_import_private()})
 
 
 @pytest.mark.parametrize(
     'project_structure',
     [{'a.py': 'from b import x'}],
 )
-def test_find_matching_private_imports_ignores_public(imports_root_node):
-    a = imports_root_node.get(DotPath('a'))
-    assert not list(_find_matching_private_imports(a, [], None))
+def test_must_not_import_private_ignores_public(imports_root_node):
+    assert not evaluate_rules(imports_root_node, {'a': must_not_import_private()})
 
 
 @pytest.mark.parametrize(
     'project_structure',
     [{'a.py': 'from __future__ import annotations'}],
 )
-def test_find_matching_private_imports_ignores_future(imports_root_node):
-    a = imports_root_node.get(DotPath('a'))
-    assert not list(_find_matching_private_imports(a, [], None))
+def test_must_not_import_private_ignores_future(imports_root_node):
+    assert not evaluate_rules(imports_root_node, {'a': must_not_import_private()})
 
 
 @pytest.mark.parametrize(
     'project_structure',
     [{'a.py': 'from b import _x\nfrom c import _y'}],
 )
-def test_find_matching_private_imports_path_filter(imports_root_node):
-    a = imports_root_node.get(DotPath('a'))
-    assert len(list(_find_matching_private_imports(a, [], 'b'))) == 1
-    assert len(list(_find_matching_private_imports(a, [], 'c'))) == 1
-    assert len(list(_find_matching_private_imports(a, [], None))) == 2
+def test_must_not_import_private_path_filter(imports_root_node):
+    for path, n_failures in [('b', 1), ('c', 1), (None, 2)]:
+        rules = {'a': must_not_import_private(path)}
+        assert len(evaluate_rules(imports_root_node, rules)) == n_failures
 
 
 @pytest.mark.parametrize(
     'project_structure',
     [{'r': {'a.py': 'from b import _x', 'c.py': 'from d import y'}}],
 )
-def test_find_matching_private_imports_nested(imports_root_node):
-    r = imports_root_node.get(DotPath('r'))
-    matches = list(_find_matching_private_imports(r, [], None))
-    assert len(matches) == 1
-    assert 'a.py' in str(matches[0][0].file_path)
+def test_must_not_import_private_nested(imports_root_node):
+    failures = evaluate_rules(imports_root_node, {'r': must_not_import_private()})
+    assert len(failures) == 1
+    assert 'a.py' in failures[0]
 
 
 def test_must_not_import_within_parent():
@@ -205,57 +234,497 @@ def test_must_not_import_within_parent_relative():
     'project_structure',
     [{'pkg': {'a.py': 'from pkg.b import x', 'b.py': ''}}],
 )
-def test_find_within_parent_imports_catches_absolute(imports_root_node):
-    pkg = imports_root_node.get(DotPath('pkg'))
-    matches = list(_find_within_parent_imports(pkg, [], 'absolute'))
-    assert len(matches) == 1
-    assert 'a.py' in str(matches[0][0].file_path)
+def test_must_not_import_within_parent_catches_absolute(imports_root_node):
+    rules = {'pkg': must_not_import_within_parent(via='absolute')}
+    failures = evaluate_rules(imports_root_node, rules)
+    assert len(failures) == 1
+    assert 'a.py' in failures[0]
 
 
 @pytest.mark.parametrize(
     'project_structure',
     [{'pkg': {'a.py': 'from .b import x', 'b.py': ''}}],
 )
-def test_find_within_parent_imports_ignores_relative(imports_root_node):
-    pkg = imports_root_node.get(DotPath('pkg'))
-    assert not list(_find_within_parent_imports(pkg, [], 'absolute'))
+def test_must_not_import_within_parent_ignores_relative(imports_root_node):
+    rules = {'pkg': must_not_import_within_parent(via='absolute')}
+    assert not evaluate_rules(imports_root_node, rules)
 
 
 @pytest.mark.parametrize(
     'project_structure',
     [{'pkg': {'a.py': 'from .b import x', 'b.py': ''}}],
 )
-def test_find_within_parent_imports_catches_relative(imports_root_node):
-    pkg = imports_root_node.get(DotPath('pkg'))
-    matches = list(_find_within_parent_imports(pkg, [], 'relative'))
-    assert len(matches) == 1
+def test_must_not_import_within_parent_catches_relative(imports_root_node):
+    rules = {'pkg': must_not_import_within_parent(via='relative')}
+    assert len(evaluate_rules(imports_root_node, rules)) == 1
 
 
 @pytest.mark.parametrize(
     'project_structure',
     [{'pkg': {'a.py': 'import external'}}],
 )
-def test_find_within_parent_imports_ignores_external(imports_root_node):
-    pkg = imports_root_node.get(DotPath('pkg'))
-    assert not list(_find_within_parent_imports(pkg, [], 'absolute'))
+def test_must_not_import_within_parent_ignores_external(imports_root_node):
+    rules = {'pkg': must_not_import_within_parent(via='absolute')}
+    assert not evaluate_rules(imports_root_node, rules)
 
 
 @pytest.mark.parametrize(
     'project_structure',
     [{'a.py': 'import external'}],
 )
-def test_find_within_parent_imports_skips_top_level_modules(imports_root_node):
-    a = imports_root_node.get(DotPath('a'))
-    assert not list(_find_within_parent_imports(a, [], 'absolute'))
+def test_must_not_import_within_parent_skips_top_level_modules(imports_root_node):
+    rules = {'a': must_not_import_within_parent(via='absolute')}
+    assert not evaluate_rules(imports_root_node, rules)
 
 
 @pytest.mark.parametrize(
     'project_structure',
     [{'pkg': {'a.py': '#\n\nfrom pkg.b import x', 'b.py': 'from pkg.a import y'}}],
 )
-def test_find_within_parent_imports_returns_line_numbers(imports_root_node):
-    pkg = imports_root_node.get(DotPath('pkg'))
-    matches = list(_find_within_parent_imports(pkg, [], 'absolute'))
-    assert len(matches) == 2
-    assert matches[0][1].line_no == 3
-    assert matches[1][1].line_no == 1
+def test_must_not_import_within_parent_returns_line_numbers(imports_root_node):
+    rules = {'pkg': must_not_import_within_parent(via='absolute')}
+    failures = evaluate_rules(imports_root_node, rules)
+    assert len(failures) == 2
+    assert failures[0].endswith('a.py:3')
+    assert failures[1].endswith('b.py:1')
+
+
+@pytest.mark.parametrize(
+    ('exclude', 'via'),
+    [
+        ([], None),
+        (['b'], None),
+        (['c.d'], None),
+        (['c'], 'absolute'),
+        ([], 'relative'),
+    ],
+)
+@pytest.mark.parametrize(
+    'project_structure',
+    [
+        {
+            'r': {
+                'a.py': 'import x\nfrom .c import d',
+                'b.py': 'import x.y',
+                'c': {'__init__.py': 'from x import y', 'd.py': 'from .. import x'},
+            },
+            's.py': 'import x',
+        }
+    ],
+)
+@pytest.mark.parametrize('import_path', ['x', 'x.y', 'r', 'r.c.d', 'q'])
+def test_find_matching_imports_equals_walk(
+    imports_root_node, exclude, via, import_path
+):
+    r = _select(imports_root_node, 'r', exclude)
+    walk_matches = [
+        (module_node, import_by)
+        for module_node in r
+        for import_by in module_node.imports
+        if import_by.import_path.is_relative_to(DotPath(import_path))
+        and (via is None or (via == 'absolute') != bool(import_by.level))
+    ]
+    assert _find(imports_root_node, r, DotPath(import_path), via) == walk_matches
+
+
+@pytest.mark.parametrize(
+    'rules',
+    [
+        {'r': must_import('x')},
+        {'r': must_import('y')},
+        {'r': must_import('x', via='relative')},
+        {'r': [must_not_import('x'), must_not_import('x.y'), must_import('r.c')]},
+        {'r': must_not_import('r', via='relative')},
+        {scope('r', without='c'): must_not_import('x', via='absolute')},
+        {scope('r', without=['a', 'c.d']): must_not_import('')},
+        {project(): [must_not_import_private(), must_not_import_private('x')]},
+        {project(): must_import('x')},
+        {
+            project(): [
+                must_not_import_within_parent(via='absolute'),
+                must_not_import_within_parent(via='relative'),
+            ]
+        },
+        {'r.c.d': must_not_import('r.c'), 's': must_not_import('x.y')},
+        {
+            'r.a': [must_import_transitively('x.y'), must_import_transitively('q')],
+            scope('r', without='c'): must_not_import_transitively('x._z'),
+            project(): [must_not_import_transitively('x'), must_import('x')],
+        },
+        {
+            'r': [must_not_have_cycles(), must_import('x')],
+            scope('r', without='c.d'): must_not_have_cycles(),
+            project(): [must_not_have_cycles(), must_not_import('x')],
+        },
+        {
+            project(): [layers(['s', 'r.a', 'r', 'x']), layers(['x', 'r.c', 'r'])],
+            scope('r', without='a'): layers(['r.c.d', 'r.c', 'r.b']),
+        },
+        {
+            'r.*': [
+                must_not_import('x.*'),
+                must_import('x.y'),
+                must_not_import_private('x.*'),
+            ],
+            scope('**.c', without='d'): must_not_import('r.**'),
+            '*': [must_import('x.**.y'), must_not_import('r.[ab]')],
+        },
+        {
+            project(): [may_only_import(['x', 'r.c']), may_only_import(['r', 's'])],
+            'r.c': may_only_import(['r.*', 'x._*'], stdlib=True),
+        },
+    ],
+)
+@pytest.mark.parametrize(
+    'project_structure',
+    [
+        {
+            'r': {
+                'a.py': 'import x\nfrom .c import d\nfrom x import _z',
+                'b.py': 'import x.y',
+                'c': {
+                    '__init__.py': 'from x import y',
+                    'd.py': 'from .. import x\nfrom r.c import e\nimport s',
+                },
+            },
+            's.py': 'import x._y\nfrom r import a',
+        }
+    ],
+)
+def test_compiled_rules_equal_evaluated_rules(imports_root_node, rules):
+    failures = evaluate_rules(imports_root_node, rules)
+    assert compile_rules(rules).evaluate(imports_root_node) == failures
+
+
+@pytest.mark.parametrize(
+    'rules',
+    [
+        {'r': [must_import('q'), must_not_import('x', via='absolute')]},
+        {
+            scope('r', without='c'): [must_not_import('x'), must_import('s')],
+            's': [must_not_import('x._*'), must_not_import('r.a', via='absolute')],
+            project(): must_not_import('r.c.*'),
+        },
+    ],
+)
+@pytest.mark.parametrize(
+    'project_structure',
+    [
+        {
+            'r': {
+                'a.py': 'import x\nfrom .c import d\nfrom x import _z',
+                'b.py': 'import x.y',
+                'c': {
+                    '__init__.py': 'from x import y',
+                    'd.py': 'from .. import x\nfrom r.c import e\nimport s',
+                },
+            },
+            's.py': 'import x._y\nfrom r import a',
+        }
+    ],
+)
+def test_compiled_rules_with_index(imports_root_node, rules, mocker):
+    plan = compile_rules(rules)
+    index_spy = mocker.spy(RootNode, 'import_index')
+    failures = plan.evaluate(imports_root_node)
+    assert index_spy.call_count == 1
+    mocker.patch.object(RootNode, 'is_loaded', return_value=False)
+    assert plan.evaluate(imports_root_node) == failures
+    assert index_spy.call_count == 1
+    assert failures
+
+
+@pytest.mark.parametrize(
+    'project_structure',
+    [{'r': {'a.py': 'import x', 'b.py': '', 'c': {'d.py': ''}}}],
+)
+def test_scope_selection_is_reused(imports_root_node, mocker):
+    select_spy = mocker.spy(FlatTree, 'select')
+    rules = {
+        scope('r', without=['b', 'c']): [must_not_import('x'), must_import('y')],
+    }
+    failures = compile_rules(rules).evaluate(imports_root_node)
+    assert compile_rules(rules).evaluate(imports_root_node) == failures
+    assert evaluate_rules(imports_root_node, rules) == failures
+    assert select_spy.call_count == 1
+    imports_root_node.update_paths(Path(), [], [])
+    assert compile_rules(rules).evaluate(imports_root_node) == failures
+    assert select_spy.call_count == 2
+
+
+@pytest.mark.parametrize(
+    'project_structure',
+    [
+        {
+            'app': {
+                'a': {'adapters.py': 'import app.b.internal\nimport app.c'},
+                'b': {'adapters.py': 'import x', 'internal.py': ''},
+                'tests': {'test_a.py': 'import app.a.internal.z'},
+            },
+        }
+    ],
+)
+@pytest.mark.parametrize(
+    'evaluate',
+    [evaluate_rules, lambda root_node, rules: compile_rules(rules).evaluate(root_node)],
+)
+def test_wildcard_failures(imports_root_node, evaluate):
+    rules = {
+        'app.*.adapters': [must_not_import('app.*.internal'), must_import('app.c')],
+        'app.**.test_*': must_not_import('app.**.internal'),
+    }
+    assert evaluate(imports_root_node, rules) == [
+        '  [scope app.*.adapters] must not import app.*.internal'
+        ' — found in app/a/adapters.py:1',
+        '  [scope app.*.adapters] must import app.c — no matching import'
+        ' in app/b/adapters.py',
+        '  [scope app.**.test_*] must not import app.**.internal'
+        ' — found in app/tests/test_a.py:1',
+    ]
+
+
+@pytest.mark.parametrize(
+    'project_structure',
+    [{'r': {'a.py': 'import x.y.z\nimport x.w', 'b.py': 'import x.y'}}],
+)
+def test_find_matching_imports_pattern(imports_root_node):
+    matches = _find(
+        imports_root_node, _select(imports_root_node, 'r'), PathPattern('x.*.z')
+    )
+    assert [(str(n.dot_path), i.line_no) for n, i in matches] == [('r.a', 1)]
+
+
+@pytest.mark.parametrize(
+    'project_structure',
+    [
+        {
+            'app': {
+                'domain': {
+                    'model.py': 'import attrs\nimport os.path\nfrom . import rules',
+                    'rules.py': 'import attr\nfrom app.infra import db',
+                },
+                'infra': {'db.py': 'import sqlalchemy'},
+            },
+        }
+    ],
+)
+@pytest.mark.parametrize(
+    'evaluate',
+    [evaluate_rules, lambda root_node, rules: compile_rules(rules).evaluate(root_node)],
+)
+def test_may_only_import_failures(imports_root_node, evaluate):
+    rules = {
+        'app.domain': may_only_import(['attrs', 'app.domain'], stdlib=True),
+        'app.infra': may_only_import(['sql*']),
+    }
+    assert evaluate(imports_root_node, rules) == [
+        '  [scope app.domain] may only import attrs, app.domain, <stdlib>'
+        ' — found import of attr in app/domain/rules.py:1',
+        '  [scope app.domain] may only import attrs, app.domain, <stdlib>'
+        ' — found import of app.infra.db in app/domain/rules.py:2',
+    ]
+
+
+def test_may_only_import_without_stdlib():
+    allowlist = _compile_allowlist(may_only_import(['x.y']))
+    assert allowlist.allows(DotPath('x.y.z').id)
+    assert not allowlist.allows(DotPath('x').id)
+    assert not allowlist.allows(DotPath('os').id)
+    assert _compile_allowlist(may_only_import(['x.y'])) is allowlist
+
+
+def test_may_only_import_single_string():
+    assert may_only_import('x.y') == may_only_import(['x.y'])
+    assert may_only_import('x.y', stdlib=True).paths == ('x.y',)
+
+
+@pytest.mark.parametrize('project_structure', [{'r': {'a.py': ''}}])
+def test_wildcard_scope_not_found(imports_root_node):
+    with pytest.raises(KeyError, match=r'Found no node for path r\.x\.\*'):
+        evaluate_rules(imports_root_node, {'r.x.*': must_not_import('x')})
+
+
+@pytest.mark.parametrize(
+    'create_predicate',
+    [
+        lambda: must_import_transitively('a.*'),
+        lambda: must_not_import_transitively('a.**.b'),
+        lambda: layers(['a', 'b.*']),
+    ],
+)
+def test_wildcards_not_supported(create_predicate):
+    with pytest.raises(ValueError, match='Wildcards are not supported'):
+        create_predicate()
+
+
+@pytest.mark.parametrize('project_structure', [{'a.py': ''}])
+def test_compiled_rules_module_not_found(imports_root_node):
+    plan = compile_rules({'foobar': must_not_import('x')})
+    with pytest.raises(KeyError):
+        plan.evaluate(imports_root_node)
+
+
+@pytest.mark.parametrize(
+    ('changed_path', 'changed_keys'),
+    [
+        ('r', ['r', scope('r', without='c'), project()]),
+        ('r.b', ['r', 'r.b', scope('r', without='c'), project()]),
+        ('r.c.d', ['r', project()]),
+        ('r.e.c', ['r', scope('r', without='c'), project()]),
+        ('s', [project()]),
+    ],
+)
+def test_filter_rules_by_changes(changed_path, changed_keys):
+    keys = ['r', 'r.b', scope('r', without='c'), project(), 'x']
+    rules = {key: must_not_import('x') for key in keys}
+    changed_rules, skipped_keys = filter_rules_by_changes(
+        rules, [DotPath(changed_path)]
+    )
+    assert list(changed_rules) == changed_keys
+    assert skipped_keys == [key for key in keys if key not in changed_keys]
+
+
+@pytest.mark.parametrize(
+    'project_structure',
+    [
+        {
+            'app': {
+                '__init__.py': '',
+                'domain': {
+                    'model.py': 'from . import rules',
+                    'rules.py': 'from app.infra import db',
+                    'values.py': 'import dataclasses',
+                },
+                'infra': {'db.py': 'import app.infra.engine', 'engine.py': ''},
+            },
+        }
+    ],
+)
+@pytest.mark.parametrize(
+    'evaluate',
+    [evaluate_rules, lambda root_node, rules: compile_rules(rules).evaluate(root_node)],
+)
+def test_transitive_failures(imports_root_node, evaluate):
+    rules = {
+        'app.domain': [
+            must_not_import_transitively('app.infra.engine'),
+            must_import_transitively('sqlalchemy'),
+        ],
+        'app.domain.values': must_not_import_transitively('app.infra'),
+    }
+    assert evaluate(imports_root_node, rules) == [
+        '  [scope app.domain] must not import app.infra.engine transitively'
+        ' — found chain app.domain.model (app/domain/model.py:1)'
+        ' -> app.domain.rules (app/domain/rules.py:1)'
+        ' -> app.infra.db (app/infra/db.py:1) -> app.infra.engine',
+        '  [scope app.domain] must not import app.infra.engine transitively'
+        ' — found chain app.domain.rules (app/domain/rules.py:1)'
+        ' -> app.infra.db (app/infra/db.py:1) -> app.infra.engine',
+        '  [scope app.domain] must import sqlalchemy transitively'
+        ' — no matching import chain from app/domain/model.py',
+        '  [scope app.domain] must import sqlalchemy transitively'
+        ' — no matching import chain from app/domain/rules.py',
+        '  [scope app.domain] must import sqlalchemy transitively'
+        ' — no matching import chain from app/domain/values.py',
+    ]
+
+
+@pytest.mark.parametrize(
+    ('changed_path', 'changed_keys'),
+    [
+        ('r.a.c', ['r.*', '**.c']),
+        ('r.a.c.d', ['r.*']),
+        ('r.a.e', ['r.*']),
+        ('r.b.c.d', ['r.*']),
+        ('r', []),
+        ('s.c', ['**.c']),
+    ],
+)
+def test_filter_rules_by_changes_wildcards(changed_path, changed_keys):
+    keys = ['r.*', scope('**.c', without='d')]
+    rules = {key: must_not_import('x') for key in keys}
+    changed_rules, _ = filter_rules_by_changes(rules, [DotPath(changed_path)])
+    assert [
+        key if isinstance(key, str) else key.path for key in changed_rules
+    ] == changed_keys
+
+
+def test_filter_rules_by_changes_keeps_transitive_rules():
+    rules = {
+        'r': must_not_import('x'),
+        's': [must_not_import('x'), must_not_import_transitively('x')],
+        't': must_import_transitively('x'),
+    }
+    changed_rules, skipped_keys = filter_rules_by_changes(rules, [DotPath('u')])
+    assert list(changed_rules) == ['s', 't']
+    assert skipped_keys == ['r']
+
+
+@pytest.mark.parametrize(
+    'project_structure',
+    [
+        {
+            'a': {
+                'x.py': 'import os\nfrom a import y',
+                'y.py': 'from b.z import f',
+                'z.py': 'from a.x import g',
+            },
+            'b': {'z.py': 'import a.x'},
+        }
+    ],
+)
+@pytest.mark.parametrize(
+    'evaluate',
+    [evaluate_rules, lambda root_node, rules: compile_rules(rules).evaluate(root_node)],
+)
+def test_cycle_failures(imports_root_node, evaluate):
+    rules = {
+        'a': must_not_have_cycles(),
+        scope('a', without='y'): must_not_have_cycles(),
+        project(): must_not_have_cycles(),
+    }
+    assert evaluate(imports_root_node, rules) == [
+        '  [scope <project>] must not have cycles — found cycle'
+        ' a.x (a/x.py:2) -> a.y (a/y.py:1) -> b.z (b/z.py:1) -> a.x',
+    ]
+
+
+def test_layers():
+    assert layers(['a', 'b']).paths == ('a', 'b')
+    assert {layers(['a']): 'value'}[layers(['a'])] == 'value'
+
+
+def test_layers_single_string():
+    assert layers('a.b').paths == ('a.b',)
+
+
+@pytest.mark.parametrize(
+    'project_structure',
+    [
+        {
+            'app': {
+                '__init__.py': 'from . import api',
+                'api.py': 'from app.service import run\nfrom app.domain import model',
+                'service.py': 'from .domain import model\nfrom .api import routes',
+                'domain': {
+                    'model.py': 'import app.service\nfrom .. import api',
+                    'values.py': 'from . import model\nimport attrs',
+                },
+            },
+        }
+    ],
+)
+@pytest.mark.parametrize(
+    'evaluate',
+    [evaluate_rules, lambda root_node, rules: compile_rules(rules).evaluate(root_node)],
+)
+def test_layer_failures(imports_root_node, evaluate):
+    rules = {project(): layers(['app.api', 'app.service', 'app.domain'])}
+    assert evaluate(imports_root_node, rules) == [
+        '  [scope <project>] layer app.service must not import higher layer app.api'
+        ' — found in app/service.py:2',
+        '  [scope <project>] layer app.domain must not import higher layer'
+        ' app.service — found in app/domain/model.py:1',
+        '  [scope <project>] layer app.domain must not import higher layer app.api'
+        ' — found in app/domain/model.py:2',
+    ]
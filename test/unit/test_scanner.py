@@ -0,0 +1,71 @@
+import pytest
+
+from pytest_imports.scanner import AmbiguousSource, ScannedImport, scan_imports
+
+
+@pytest.mark.parametrize(
+    ('source', 'scanned_imports'),
+    [
+        ('', []),
+        ('import x', [ScannedImport(None, 'x', 1)]),
+        (b'import x', [ScannedImport(None, 'x', 1)]),
+        ('\n\nimport x.y as z', [ScannedImport(None, 'x.y', 3)]),
+        (
+            'import a, b',
+            [ScannedImport(None, 'a', 1), ScannedImport(None, 'b', 1)],
+        ),
+        ('from x import y', [ScannedImport('x', 'y', 1)]),
+        ('from . import y', [ScannedImport('', 'y', 1, level=1)]),
+        ('from ... import y', [ScannedImport('', 'y', 1, level=3)]),
+        ('from .x.y import *', [ScannedImport('x.y', '*', 1, level=1)]),
+        (
+            'from x import (\n    a,\n    b as c,\n)',
+            [ScannedImport('x', 'a', 2), ScannedImport('x', 'b', 3)],
+        ),
+        ('from x import (a)', [ScannedImport('x', 'a', 1)]),
+        (
+            'import x; import y',
+            [ScannedImport(None, 'x', 1), ScannedImport(None, 'y', 1)],
+        ),
+        (
+            'from x import *; import y',
+            [ScannedImport('x', '*', 1), ScannedImport(None, 'y', 1)],
+        ),
+        ('def f():\n    import x', [ScannedImport(None, 'x', 2)]),
+        ('x = "import y"', []),
+        ("x = '''\nimport y\n'''", []),
+        ('# import y', []),
+        ('raise X from e', []),
+        ('imports = from_ = 1', []),
+        ('import ﬁle', [ScannedImport(None, 'file', 1)]),
+    ],
+)
+def test_scan_imports(source, scanned_imports):
+    assert scan_imports(source) == scanned_imports
+
+
+@pytest.mark.parametrize(
+    'source',
+    [
+        'if x: import y',
+        'x = 1; import y',
+        'x = 1\\\nimport y',
+        'x = (yield\n     from y)\nimport z',
+        'import x.',
+        'import x y',
+        'import x as',
+        'from import x',
+        'from x import',
+        'from x import 1',
+        'from x import *, y',
+        'from x import (a, b',
+        'from x import (a b)',
+        'from x import a b',
+        'import a\rimport b',
+        'import x\x00',
+        b'# coding: invalid-codec\nimport x',
+    ],
+)
+def test_scan_imports_ambiguous(source):
+    with pytest.raises(AmbiguousSource):
+        scan_imports(source)